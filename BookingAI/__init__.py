@@ -1,26 +1,88 @@
+import os
 from flask import Flask, render_template
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
-from flasgger import Swagger
+from .database.engine import database_uri, engine_options, configure_engine
 
 db = SQLAlchemy()
 jwt = JWTManager()
 
-def create_app():
+def create_app(test_config=None):
     app = Flask(__name__, template_folder='templates', static_folder='static')
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///appointments.db'
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri()  # DATABASE_URL, or the local SQLite file
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
     app.config['JWT_SECRET_KEY'] = 'super-secret'  # Change this in production!
+    app.config['SEARCH_CACHE_BACKEND'] = 'memory'  # 'memory', 'sqlite' or 'none'
+    app.config['SEARCH_CACHE_TTL'] = 30
+    app.config['SEARCH_CACHE_MAX_ENTRIES'] = 1024
+    app.config['SEARCH_CACHE_PATH'] = 'search_cache.sqlite'
+    app.config['OUTBOX_TRANSPORT'] = 'console'  # 'console' or 'fake'
+    app.config['OUTBOX_WORKERS'] = 2
+    app.config['OUTBOX_BATCH_SIZE'] = 50
+    app.config['OUTBOX_MAX_ATTEMPTS'] = 5
+    app.config['OUTBOX_AUTOSTART'] = True  # background delivery workers; tests turn it off
+    app.config['EVENT_HISTORY_SIZE'] = 256
+    app.config['EVENT_HEARTBEAT_SECONDS'] = 15
+    app.config['CALL_SESSION_BACKEND'] = 'memory'  # 'memory' or 'sqlite'
+    app.config['CALL_SESSION_MAX'] = 10000
+    app.config['CALL_SESSION_IDLE_TTL'] = 1800
+    app.config['CALL_SESSION_PATH'] = 'call_sessions.sqlite'
+    app.config['CALL_HISTORY_LIMIT'] = 20
+    app.config['TRANSCRIPT_FLUSH_TURNS'] = 100
+    app.config['TRANSCRIPT_FLUSH_INTERVAL'] = 5.0
+    app.config['TRANSCRIPT_MAX_BUFFER'] = 10000
+    app.config['TRANSCRIPT_AUTOSTART'] = False
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:600000'
+    app.config['PASSWORD_HASH_WORKERS'] = 2  # 0 hashes inline on the request thread
+    app.config['PASSWORD_HASH_MAX_PENDING'] = 32
+    app.config['PASSWORD_HASH_RETRY_AFTER'] = 1
+    app.config['IDENTITY_CACHE_TTL'] = 30  # 0 memoises per request only
+    app.config['IDENTITY_CACHE_MAX_ENTRIES'] = 4096
+    app.config['SQLITE_JOURNAL_MODE'] = 'WAL'
+    app.config['SQLITE_SYNCHRONOUS'] = 'NORMAL'
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = 5000
+    app.config['SQLITE_MMAP_SIZE'] = 256 * 1024 * 1024
+    app.config['DB_POOL_SIZE'] = 10
+    app.config['DB_MAX_OVERFLOW'] = 20
+    app.config['DB_POOL_RECYCLE'] = 1800  # server databases only
+    app.config['DB_POOL_PRE_PING'] = True  # server databases only
+    # Fast start: API docs built on first hit, routes registered on the first
+    # request and no create_all at boot; run `flask init-db` to create tables
+    app.config['FAST_START'] = os.environ.get('BOOKINGAI_FAST_START') == '1'
+    app.config['METRICS_ENABLED'] = False  # per-route histograms at /metrics
+    app.config['METRICS_SLOW_QUERIES'] = 10
+    app.config['PROFILE_SAMPLE_RATE'] = 0.0  # share of requests run under cProfile
+    app.config['PROFILE_THRESHOLD_MS'] = 500
+    app.config['PROFILE_DIR'] = 'profiles'
+
+    if test_config:
+        app.config.update(test_config)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
 
     db.init_app(app)
     jwt.init_app(app)
+
+    from .cli import register_commands
+    register_commands(app)
+
+    if app.config['FAST_START']:
+        from .fast_start import LazySwagger, DeferredRoutes
+        LazySwagger(app)
+        app.wsgi_app = DeferredRoutes(app)
+        with app.app_context():
+            configure_engine(db.engine, app.config)
+        return app
+
+    from flasgger import Swagger
     Swagger(app)
 
     with app.app_context():
+        configure_engine(db.engine, app.config)
         from .database.models import User, ServiceProvider, Availability, Appointment, Message, Feedback
         from .routes import init_routes
         
-        init_routes(app)
+        # Tables first: init_routes starts the outbox workers
         db.create_all()
+        init_routes(app)
 
     return app
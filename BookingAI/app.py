@@ -1,6 +1,8 @@
 from . import create_app
 
-app = create_app()
+# The served app also flushes call transcripts periodically; every app
+# drains the notification outbox in background workers
+app = create_app({'TRANSCRIPT_AUTOSTART': True})
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=3001, debug=False)
@@ -0,0 +1,107 @@
+"""
+Search and history latency on a multi-year dataset before and after moving
+past slots and appointments to the archive tables.
+
+    python -m BookingAI.benchmarks.bench_archive --providers 100 --years 3
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from .. import create_app, db
+from ..database.models import ServiceProvider, Availability, Appointment
+from ..database.seed import generate_dataset, SERVICE_TYPES
+from ..services.archive import archive_history
+from .stats import percentile
+
+
+def measure(app, requests, queries):
+    client = app.test_client()
+    results = {}
+    for name, (url, token) in requests.items():
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        client.get(url(queries[0]), headers=headers)
+        latencies = []
+        for query in queries:
+            started = time.perf_counter()
+            response = client.get(url(query), headers=headers)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.status_code
+        results[name] = latencies
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--providers', type=int, default=100)
+    parser.add_argument('--years', type=int, default=3, help='years of history before today')
+    parser.add_argument('--future-days', type=int, default=60)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=365 * args.years)
+    slots = ((today - start).days + args.future_days) * 8
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'archive.db')}",
+            'OUTBOX_AUTOSTART': False,
+            'SEARCH_CACHE_BACKEND': 'none'
+        })
+        with app.app_context():
+            seeding = time.perf_counter()
+            generate_dataset(users=args.providers * 10, providers=args.providers, slots_per_provider=slots,
+                             messages=0, feedback_ratio=0.05, start=start)
+            seeding = time.perf_counter() - seeding
+            provider = db.session.get(ServiceProvider, 1)
+            customer_id = db.session.scalar(
+                db.select(Appointment.user_id).group_by(Appointment.user_id)
+                .order_by(db.func.count().desc()).limit(1)
+            )
+            requests = {
+                'search from today': (lambda query: f"/api/availability?service_type={query[0]}"
+                                                    f"&start_date={query[1]:%Y-%m-%d}&limit=20", None),
+                'search next week': (lambda query: f"/api/availability?service_type={query[0]}"
+                                                   f"&start_date={query[1]:%Y-%m-%d}"
+                                                   f"&end_date={query[1] + timedelta(days=7):%Y-%m-%d}&limit=20", None),
+                'provider slot history': (lambda query: '/api/providers/availability',
+                                          create_access_token(identity=provider.user_id)),
+                'appointment history': (lambda query: '/api/appointments?limit=20',
+                                        create_access_token(identity=customer_id)),
+            }
+            total_slots = Availability.query.count()
+        queries = [(rng.choice(SERVICE_TYPES), today + timedelta(days=rng.randrange(args.future_days)))
+                   for _ in range(args.queries)]
+
+        print(f"{args.providers} providers x {slots} slots over {args.years} years + {args.future_days} days "
+              f"({total_slots} slots, seeded in {seeding:.1f} s)")
+        before = measure(app, requests, queries)
+        with app.app_context():
+            started = time.perf_counter()
+            stats = archive_history(today, batch_size=args.batch_size)
+            elapsed = time.perf_counter() - started
+            live = Availability.query.count()
+            db.engine.dispose()
+        after = measure(app, requests, queries)
+
+        print(f"  archived {stats['availabilities']} slots and {stats['appointments']} appointments in {elapsed:.1f} s, "
+              f"{stats['batches']} batches, longest {stats['longest_batch'] * 1e3:.0f} ms; {live} slots live")
+        for name in requests:
+            print(f"  {name:<22} p50 {percentile(before[name], 0.50) * 1e3:8.2f} -> "
+                  f"{percentile(after[name], 0.50) * 1e3:8.2f} ms   "
+                  f"p95 {percentile(before[name], 0.95) * 1e3:8.2f} -> {percentile(after[name], 0.95) * 1e3:8.2f} ms")
+        with app.app_context():
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
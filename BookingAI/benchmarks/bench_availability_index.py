@@ -0,0 +1,96 @@
+"""
+Overlap-check latency: database range query vs. the in-memory interval index.
+
+    python -m BookingAI.benchmarks.bench_availability_index --sizes 10000 100000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from .. import create_app, db
+from ..database.models import User, ServiceProvider, Availability
+from ..services.availability_index import AvailabilityIndex
+
+SLOT_LENGTH = timedelta(minutes=30)
+BASE_TIME = datetime(2030, 1, 1, 8)
+
+
+def seed_provider(size):
+    user = User(email=f'bench-{size}@example.com', password_hash='x', full_name='Bench Provider')
+    db.session.add(user)
+    db.session.flush()
+    provider = ServiceProvider(user_id=user.id, service_type='bench')
+    db.session.add(provider)
+    db.session.flush()
+
+    # One 30 minute slot every hour, leaving a 30 minute gap after each.
+    rows = [{
+        'provider_id': provider.id,
+        'start_time': BASE_TIME + timedelta(hours=i),
+        'end_time': BASE_TIME + timedelta(hours=i) + SLOT_LENGTH,
+        'is_booked': False
+    } for i in range(size)]
+    db.session.execute(insert(Availability), rows)
+    db.session.commit()
+    return provider.id
+
+
+def db_overlap(provider_id, start, end):
+    return Availability.query.filter(
+        Availability.provider_id == provider_id,
+        Availability.start_time < end,
+        Availability.end_time > start
+    ).first()
+
+
+def measure(fn, probes):
+    started = time.perf_counter()
+    for start, end in probes:
+        fn(start, end)
+    return (time.perf_counter() - started) / len(probes) * 1e6
+
+
+def run(size, probe_count, seed):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'OUTBOX_AUTOSTART': False})
+    rng = random.Random(seed)
+    with app.app_context():
+        provider_id = seed_provider(size)
+        probes = []
+        for _ in range(probe_count):
+            start = BASE_TIME + timedelta(minutes=rng.randrange(size * 60))
+            probes.append((start, start + SLOT_LENGTH))
+
+        index = AvailabilityIndex()
+        started = time.perf_counter()
+        index.find_overlap(provider_id, BASE_TIME, BASE_TIME)
+        load_ms = (time.perf_counter() - started) * 1e3
+
+        db_us = measure(lambda s, e: db_overlap(provider_id, s, e), probes)
+        index_us = measure(lambda s, e: index.find_overlap(provider_id, s, e), probes)
+
+        mismatches = sum(
+            (db_overlap(provider_id, s, e) is None) != (index.find_overlap(provider_id, s, e) is None)
+            for s, e in probes[:200]
+        )
+        db.drop_all()
+
+    print(f"{size:>8} slots | load {load_ms:8.1f} ms | db {db_us:9.1f} us/check | "
+          f"index {index_us:6.2f} us/check | speedup {db_us / index_us:8.1f}x | mismatches {mismatches}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--probes', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        run(size, args.probes, args.seed)
+
+
+if __name__ == '__main__':
+    main()
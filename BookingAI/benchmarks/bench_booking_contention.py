@@ -0,0 +1,114 @@
+"""
+Concurrent bookings against one hot slot and against distinct slots.
+
+    python -m BookingAI.benchmarks.bench_booking_contention --threads 16 --rounds 20
+"""
+import argparse
+import io
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+
+from .. import create_app, db
+from ..database.models import User, ServiceProvider, Availability, Appointment
+
+
+def seed(threads, slots):
+    provider_user = User(email='provider@example.com', password_hash='x', full_name='Dr. Provider')
+    provider = ServiceProvider(user=provider_user, service_type='bench')
+    patients = [User(email=f'patient{i}@example.com', password_hash='x', full_name=f'Patient {i}')
+                for i in range(threads)]
+    db.session.add_all([provider] + patients)
+    db.session.flush()
+    start = datetime(2030, 1, 1, 9)
+    slot_ids = db.session.scalars(
+        insert(Availability).returning(Availability.id, sort_by_parameter_order=True),
+        [{
+            'provider_id': provider.id,
+            'start_time': start + timedelta(hours=i),
+            'end_time': start + timedelta(hours=i, minutes=30)
+        } for i in range(slots)]
+    ).all()
+    db.session.commit()
+    return slot_ids, [create_access_token(identity=patient.id) for patient in patients]
+
+
+def fire(app, tokens, slot_for_thread):
+    barrier = threading.Barrier(len(tokens))
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def worker(index, token):
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        barrier.wait()
+        status = client.post('/api/appointments/book', headers=headers, json={
+            'slot_id': slot_for_thread(index)
+        }).status_code
+        with lock:
+            statuses[status] += 1
+
+    threads = [threading.Thread(target=worker, args=(i, token)) for i, token in enumerate(tokens)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+            'SEARCH_CACHE_BACKEND': 'none',
+            'OUTBOX_AUTOSTART': False
+        })
+        with app.app_context():
+            slot_ids, tokens = seed(args.threads, args.rounds * (args.threads + 1))
+
+        results = {'same slot': [0.0, Counter(), 0], 'different slots': [0.0, Counter(), 0]}
+        next_slot = iter(slot_ids)
+        with redirect_stdout(io.StringIO()):
+            for _ in range(args.rounds):
+                hot = next(next_slot)
+                elapsed, statuses = fire(app, tokens, lambda i: hot)
+                results['same slot'][0] += elapsed
+                results['same slot'][1].update(statuses)
+                results['same slot'][2] += statuses[201] == 1
+
+                own = [next(next_slot) for _ in tokens]
+                elapsed, statuses = fire(app, tokens, lambda i: own[i])
+                results['different slots'][0] += elapsed
+                results['different slots'][1].update(statuses)
+                results['different slots'][2] += statuses[201] == len(tokens)
+
+        with app.app_context():
+            appointments = Appointment.query.count()
+            double_booked = db.session.query(Appointment.availability_id).group_by(
+                Appointment.availability_id
+            ).having(db.func.count() > 1).count()
+            db.engine.dispose()
+
+    requests = args.threads * args.rounds
+    print(f"{args.threads} threads x {args.rounds} rounds ({requests} bookings per scenario)")
+    for name, (elapsed, statuses, correct_rounds) in results.items():
+        print(f"  {name:<16} {requests / elapsed:8.0f} req/s  statuses {dict(sorted(statuses.items()))}  "
+              f"correct rounds {correct_rounds}/{args.rounds}")
+    print(f"  appointments {appointments}, double-booked slots {double_booked}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Posting a provider's schedule one slot per request vs. the bulk endpoint.
+
+    python -m BookingAI.benchmarks.bench_bulk_availability --weeks 12
+    python -m BookingAI.benchmarks.bench_bulk_availability --database-uri sqlite:////tmp/bench.db
+"""
+import argparse
+import os
+import time
+
+from .. import create_app, db
+from ..services.recurrence import expand_recurrence
+
+
+def provider_client(app, email):
+    client = app.test_client()
+    client.post('/api/users/register', json={'email': email, 'password': 'secret', 'full_name': email})
+    token = client.post('/api/users/login', json={'email': email, 'password': 'secret'}).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/api/providers/register', headers=headers, json={'service_type': 'bench'})
+    return client, headers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--weeks', type=int, default=12)
+    parser.add_argument('--slot-minutes', type=int, default=30)
+    parser.add_argument('--database-uri', default='sqlite://')
+    args = parser.parse_args()
+
+    rule = {
+        'days': 'weekdays',
+        'start_time': '09:00',
+        'end_time': '17:00',
+        'slot_minutes': args.slot_minutes,
+        'start_date': '2030-01-07',
+        'weeks': args.weeks
+    }
+    slots = [{'start_time': start.isoformat(), 'end_time': end.isoformat()} for start, end in expand_recurrence(rule)]
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': args.database_uri, 'OUTBOX_AUTOSTART': False})
+    try:
+        client, headers = provider_client(app, 'one-by-one@example.com')
+        started = time.perf_counter()
+        for slot in slots:
+            response = client.post('/api/providers/availability', headers=headers, json=slot)
+            assert response.status_code == 201, response.get_json()
+        one_by_one = time.perf_counter() - started
+
+        client, headers = provider_client(app, 'explicit@example.com')
+        started = time.perf_counter()
+        response = client.post('/api/providers/availability/bulk', headers=headers, json={'slots': slots})
+        explicit = time.perf_counter() - started
+        assert response.get_json()['created'] == len(slots), response.get_json()
+
+        client, headers = provider_client(app, 'recurrence@example.com')
+        started = time.perf_counter()
+        response = client.post('/api/providers/availability/bulk', headers=headers, json={'recurrence': rule})
+        recurrence = time.perf_counter() - started
+        assert response.get_json()['created'] == len(slots), response.get_json()
+    finally:
+        with app.app_context():
+            db.drop_all()
+        if args.database_uri.startswith('sqlite:////'):
+            os.remove(args.database_uri[len('sqlite:///'):])
+
+    print(f"{len(slots)} slots ({args.weeks} weeks, weekdays 9-17, {args.slot_minutes} minute slots)")
+    for name, seconds in (('one-by-one', one_by_one), ('bulk explicit', explicit), ('bulk recurrence', recurrence)):
+        print(f"  {name:<16} {seconds * 1e3:9.1f} ms  {len(slots) / seconds:10.0f} slots/s  "
+              f"{one_by_one / seconds:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Call-request notifications: per-agent fan-out on write vs. topic broadcasts
+read through each agent's subscription.
+
+    python -m BookingAI.benchmarks.bench_call_broadcast --agents 100 500 --requests 50
+"""
+import argparse
+import time
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from .. import create_app, db
+from ..database.models import User, ServiceProvider, Message, Broadcast
+from ..services.inbox import publish_broadcast, visible_broadcasts
+
+
+def seed_agents(count):
+    user_ids = db.session.scalars(
+        insert(User).returning(User.id, sort_by_parameter_order=True),
+        [{'email': f'agent{i}@example.com', 'password_hash': 'x', 'full_name': f'Agent {i}'} for i in range(count + 1)]
+    ).all()
+    requester, agent_user_ids = user_ids[0], user_ids[1:]
+    db.session.execute(insert(ServiceProvider), [
+        {'user_id': user_id, 'service_type': 'bench', 'created_at': datetime(2000, 1, 1)}
+        for user_id in agent_user_ids
+    ])
+    db.session.commit()
+    return requester, agent_user_ids
+
+
+def fan_out_on_write(requester, requests):
+    started = time.perf_counter()
+    for i in range(requests):
+        for user_id in ServiceProvider.query.with_entities(ServiceProvider.user_id).filter_by(service_type='bench'):
+            db.session.add(Message(
+                sender_user_id=requester,
+                recipient_user_id=user_id[0],
+                message_type='call_request',
+                content=f'New call request {i}'
+            ))
+        db.session.commit()
+    return (time.perf_counter() - started) / requests
+
+
+def fan_out_on_read(requester, requests):
+    started = time.perf_counter()
+    for i in range(requests):
+        publish_broadcast('bench', f'New call request {i}', 'call_request', sender_user_id=requester)
+        db.session.commit()
+    return (time.perf_counter() - started) / requests
+
+
+def timed_reads(read, reads):
+    started = time.perf_counter()
+    for _ in range(reads):
+        rows = read()
+    return (time.perf_counter() - started) / reads, len(rows)
+
+
+def run(agents, requests, reads):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'OUTBOX_AUTOSTART': False, 'SEARCH_CACHE_BACKEND': 'none'})
+    with app.app_context():
+        requester, agent_user_ids = seed_agents(agents)
+        write_legacy = fan_out_on_write(requester, requests)
+        write_broadcast = fan_out_on_read(requester, requests)
+
+        agent = agent_user_ids[agents // 2]
+        read_legacy, legacy_rows = timed_reads(lambda: Message.query.filter(
+            Message.recipient_user_id == agent
+        ).order_by(Message.created_at.desc()).all(), reads)
+        read_broadcast, broadcast_rows = timed_reads(lambda: visible_broadcasts(agent).order_by(
+            Broadcast.created_at.desc()
+        ).all(), reads)
+        stored = (Message.query.count(), Broadcast.query.count())
+        db.drop_all()
+
+    print(f"{agents} agents, {requests} call requests -> rows stored: fan-out {stored[0]}, broadcast {stored[1]}")
+    print(f"  write per call request  fan-out {write_legacy * 1e3:8.2f} ms   broadcast {write_broadcast * 1e3:8.2f} ms   "
+          f"{write_legacy / write_broadcast:6.1f}x")
+    print(f"  agent inbox read        fan-out {read_legacy * 1e3:8.2f} ms   broadcast {read_broadcast * 1e3:8.2f} ms   "
+          f"({legacy_rows} vs {broadcast_rows} rows)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--agents', type=int, nargs='+', default=[100, 500])
+    parser.add_argument('--requests', type=int, default=50)
+    parser.add_argument('--reads', type=int, default=50)
+    args = parser.parse_args()
+
+    for agents in args.agents:
+        run(agents, args.requests, args.reads)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+AI call session stores: memory per session and lookup latency.
+
+Compares the old unbounded dict-of-sessions against the bounded in-memory
+store with a windowed history and the shared SQLite store.
+
+    python -m BookingAI.benchmarks.bench_call_sessions --sessions 1000 10000 --turns 200
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+from ..services.call_sessions import MemorySessionStore, SQLiteSessionStore, new_session, append_turn
+
+TURN_TEXT = "I'd like to schedule an appointment for March 15th at 2 PM if that works."
+
+
+def legacy_session(turns):
+    session = {
+        'phone_number': '555-0100',
+        'department': 'dentist',
+        'history': [],
+        'voice_enabled': True,
+        'start_time': datetime.utcnow()
+    }
+    for _ in range(turns):
+        session['history'].append({'role': 'user', 'content': TURN_TEXT, 'timestamp': datetime.utcnow()})
+    return session
+
+
+def windowed_session(turns, history_limit):
+    session = new_session('555-0100', 'dentist')
+    for _ in range(turns):
+        append_turn(session, 'user', TURN_TEXT, history_limit)
+    return session
+
+
+def heap_per_session(build, sessions):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return store, (after - before) / sessions
+
+
+def lookup_latency(get, call_ids, lookups):
+    samples = [random.choice(call_ids) for _ in range(lookups)]
+    started = time.perf_counter()
+    for call_id in samples:
+        get(call_id)
+    return (time.perf_counter() - started) / lookups
+
+
+def run(sessions, turns, history_limit, lookups, tmp):
+    call_ids = [f'call-{i}' for i in range(sessions)]
+
+    def build_legacy():
+        return {call_id: legacy_session(turns) for call_id in call_ids}
+
+    def build_memory():
+        store = MemorySessionStore(max_sessions=sessions)
+        for call_id in call_ids:
+            store.save(call_id, windowed_session(turns, history_limit))
+        return store
+
+    legacy, legacy_bytes = heap_per_session(build_legacy, sessions)
+    memory, memory_bytes = heap_per_session(build_memory, sessions)
+
+    path = os.path.join(tmp, f'sessions-{sessions}.sqlite')
+    shared = SQLiteSessionStore(path, max_sessions=sessions)
+    for call_id in call_ids:
+        shared.save(call_id, windowed_session(turns, history_limit))
+    shared_bytes = os.path.getsize(path) / sessions
+
+    print(f"{sessions} sessions x {turns} turns (history window {history_limit})")
+    print(f"  unbounded dict     {legacy_bytes / 1024:8.1f} KiB/session   "
+          f"lookup {lookup_latency(legacy.get, call_ids, lookups) * 1e6:8.2f} us")
+    print(f"  memory store       {memory_bytes / 1024:8.1f} KiB/session   "
+          f"lookup {lookup_latency(memory.get, call_ids, lookups) * 1e6:8.2f} us")
+    print(f"  sqlite store       {shared_bytes / 1024:8.1f} KiB/session (file)   "
+          f"lookup {lookup_latency(shared.get, call_ids, lookups) * 1e6:8.2f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--turns', type=int, default=200)
+    parser.add_argument('--history-limit', type=int, default=20)
+    parser.add_argument('--lookups', type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for sessions in args.sessions:
+            run(sessions, args.turns, args.history_limit, args.lookups, tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Concurrent bookings and availability searches against file-backed SQLite
+with the driver defaults vs. the tuned engine (WAL, synchronous=NORMAL,
+busy timeout, mmap, pooled connections).
+
+    python -m BookingAI.benchmarks.bench_database_engine --writers 8 --readers 8 --seconds 5
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import insert
+
+from .. import create_app, db
+from ..database.models import User, ServiceProvider, Availability
+from .stats import percentile
+
+PROFILES = {
+    # What create_app used before: no pragmas, rollback journal, pysqlite's 5 s timeout
+    'driver defaults': {
+        'SQLALCHEMY_ENGINE_OPTIONS': {},
+        'SQLITE_JOURNAL_MODE': 'DELETE',
+        'SQLITE_SYNCHRONOUS': 'FULL',
+        'SQLITE_BUSY_TIMEOUT_MS': 5000,
+        'SQLITE_MMAP_SIZE': 0
+    },
+    'tuned': {},
+}
+
+
+def seed(providers, slots_per_provider, patients):
+    users = [User(email=f'provider{i}@example.com', password_hash='x', full_name=f'Provider {i}')
+             for i in range(providers)]
+    profiles = [ServiceProvider(user=user, service_type=f'type{i % 4}') for i, user in enumerate(users)]
+    people = [User(email=f'patient{i}@example.com', password_hash='x', full_name=f'Patient {i}')
+              for i in range(patients)]
+    db.session.add_all(profiles + people)
+    db.session.flush()
+    start = datetime(2030, 1, 1, 8)
+    slot_ids = db.session.scalars(
+        insert(Availability).returning(Availability.id, sort_by_parameter_order=True),
+        [{
+            'provider_id': profile.id,
+            'start_time': start + timedelta(hours=i),
+            'end_time': start + timedelta(hours=i, minutes=30)
+        } for profile in profiles for i in range(slots_per_provider)]
+    ).all()
+    db.session.commit()
+    return slot_ids, [create_access_token(identity=person.id) for person in people]
+
+
+def run(app, slot_ids, tokens, readers, seconds):
+    deadline = time.perf_counter() + seconds
+    latencies = {'book': [], 'search': []}
+    statuses = {'book': Counter(), 'search': Counter()}
+    lock = threading.Lock()
+    slots = iter(slot_ids)
+
+    def record(kind, started, status):
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies[kind].append(elapsed)
+            statuses[kind][status] += 1
+
+    def writer(token):
+        client = app.test_client()
+        headers = {'Authorization': f'Bearer {token}'}
+        while time.perf_counter() < deadline:
+            with lock:
+                slot_id = next(slots, None)
+            if slot_id is None:
+                return
+            started = time.perf_counter()
+            status = client.post('/api/appointments/book', headers=headers, json={'slot_id': slot_id}).status_code
+            record('book', started, status)
+
+    def reader(index):
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            status = client.get(f'/api/availability?service_type=type{index % 4}&limit=50').status_code
+            record('search', started, status)
+
+    threads = [threading.Thread(target=writer, args=(token,)) for token in tokens]
+    threads += [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started, latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--providers', type=int, default=200)
+    parser.add_argument('--slots', type=int, default=200, help='slots per provider')
+    args = parser.parse_args()
+
+    print(f"{args.writers} booking threads + {args.readers} search threads for {args.seconds:.0f} s, "
+          f"{args.providers} providers x {args.slots} slots")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, overrides in PROFILES.items():
+            app = create_app({
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, name.replace(' ', '_'))}.db",
+                'OUTBOX_AUTOSTART': False,
+                'SEARCH_CACHE_BACKEND': 'none',
+                **overrides
+            })
+            with app.app_context():
+                slot_ids, tokens = seed(args.providers, args.slots, args.writers)
+            elapsed, latencies, statuses = run(app, slot_ids, tokens, args.readers, args.seconds)
+            with app.app_context():
+                db.engine.dispose()
+
+            print(f"  {name}")
+            for kind in ('book', 'search'):
+                samples = latencies[kind]
+                if not samples:
+                    continue
+                print(f"    {kind:<7} {statuses[kind][200] + statuses[kind][201]:7d} ok  {len(samples) / elapsed:8.0f} req/s   "
+                      f"p50 {percentile(samples, 0.50) * 1e3:7.2f} ms   p95 {percentile(samples, 0.95) * 1e3:7.2f} ms   "
+                      f"p99 {percentile(samples, 0.99) * 1e3:7.2f} ms   statuses {dict(sorted(statuses[kind].items()))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Date/time extraction for AI call utterances: the old regex + strptime path
+vs. the precompiled parser, cold and with its LRU cache warm.
+
+    python -m BookingAI.benchmarks.bench_datetime_parser --phrases 5000 --distinct 500
+"""
+import argparse
+import random
+import re
+import time
+from datetime import datetime
+
+from ..services import datetime_parser
+from ..services.datetime_parser import parse_datetime
+
+LEGACY_DATE = re.compile(r'(\d{1,2}(?:st|nd|rd|th)?\s+(?:january|february|march|april|may|june|july|august|september|october|november|december))')
+LEGACY_TIME = re.compile(r'(\d{1,2}(?::\d{2})?\s*(?:am|pm))')
+
+TEMPLATES = (
+    "I'd like to schedule for {day}{ordinal} {month} at {hour} {meridiem}",
+    "can I book {day} {month} at {hour}:{minute} {meridiem}",
+    "book me in on {month} {day}{ordinal} at {hour}{meridiem}",
+    "I need an appointment {relative} {part}",
+    "schedule something {relative} at {hour}",
+    "{modifier} {weekday} at {hour}:{minute} {meridiem} please",
+    "could you book {weekday} {part}",
+    "make an appointment in {count} days at noon",
+)
+MONTHS = ('january', 'february', 'march', 'april', 'may', 'june', 'july', 'august', 'september', 'october',
+          'november', 'december')
+
+
+def legacy_parse(message):
+    message = message.lower()
+    date_match = LEGACY_DATE.search(message)
+    time_match = LEGACY_TIME.search(message)
+    if not (date_match and time_match):
+        return None
+    try:
+        return datetime.strptime(f"{date_match.group(1)} {time_match.group(1)}", "%d %B %I:%M %p")
+    except ValueError:
+        return None
+
+
+def utterances(distinct, total, seed=11):
+    rng = random.Random(seed)
+    pool = [rng.choice(TEMPLATES).format(
+        day=rng.randint(1, 28),
+        ordinal=rng.choice(('', 'st', 'th')),
+        month=rng.choice(MONTHS),
+        hour=rng.randint(1, 12),
+        minute=rng.choice(('00', '15', '30', '45')),
+        meridiem=rng.choice(('am', 'pm', 'PM')),
+        relative=rng.choice(('today', 'tomorrow', 'day after tomorrow')),
+        part=rng.choice(('morning', 'afternoon', 'evening')),
+        modifier=rng.choice(('next', 'this', 'coming')),
+        weekday=rng.choice(('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday')),
+        count=rng.randint(2, 9)
+    ) for _ in range(distinct)]
+    # Callers repeat themselves: draw the workload from a smaller pool
+    return [rng.choice(pool) for _ in range(total)]
+
+
+def throughput(parse, phrases):
+    started = time.perf_counter()
+    results = [parse(phrase) for phrase in phrases]
+    return len(phrases) / (time.perf_counter() - started), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--phrases', type=int, default=5000)
+    parser.add_argument('--distinct', type=int, default=500)
+    args = parser.parse_args()
+
+    phrases = utterances(args.distinct, args.phrases)
+    reference = datetime(2026, 10, 16, 9)
+
+    legacy_rate, legacy_results = throughput(legacy_parse, phrases)
+
+    def uncached(phrase):
+        datetime_parser.cache_clear()
+        return parse_datetime(phrase, reference)
+
+    cold_rate, results = throughput(uncached, phrases)
+    datetime_parser.cache_clear()
+    first_rate, _ = throughput(lambda phrase: parse_datetime(phrase, reference), phrases)
+    warm_rate, _ = throughput(lambda phrase: parse_datetime(phrase, reference), phrases)
+    info = datetime_parser.cache_info()
+
+    understood = sum(parsed.date is not None and (parsed.time or parsed.day_part) is not None for parsed in results)
+    print(f"{args.phrases} utterances ({args.distinct} distinct)")
+    print(f"  regex + strptime   {legacy_rate:10.0f} utterances/s   "
+          f"understood {sum(result is not None for result in legacy_results)}/{args.phrases}")
+    print(f"  parser, no cache   {cold_rate:10.0f} utterances/s   understood {understood}/{args.phrases}")
+    print(f"  parser, first pass {first_rate:10.0f} utterances/s")
+    print(f"  parser, warm cache {warm_rate:10.0f} utterances/s   "
+          f"cache hits {info.hits}, misses {info.misses}")
+
+
+if __name__ == '__main__':
+    main()
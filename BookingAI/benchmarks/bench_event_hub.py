@@ -0,0 +1,89 @@
+"""
+Idle push-channel subscribers held by one process and publish-to-delivery latency.
+
+Each client is a thread blocked in Subscription.wait, which is what an open
+/api/events connection costs under a threaded server.
+
+    python -m BookingAI.benchmarks.bench_event_hub --clients 100 1000 5000 --events 2000
+"""
+import argparse
+import random
+import threading
+import time
+import tracemalloc
+
+from ..services.event_hub import EventHub, user_channel
+from .stats import percentile
+
+
+def run(clients, events, heartbeat):
+    hub = EventHub()
+    latencies = []
+    latency_lock = threading.Lock()
+    delivered = threading.Semaphore(0)
+    stopping = threading.Event()
+    ready = threading.Barrier(clients + 1)
+
+    def client(user_id):
+        subscription = hub.subscribe([user_channel(user_id)])
+        ready.wait()
+        while not stopping.is_set():
+            received = subscription.wait(heartbeat)
+            now = time.perf_counter()
+            for event in received:
+                with latency_lock:
+                    latencies.append(now - event.data['sent'])
+                delivered.release()
+        subscription.close()
+
+    tracemalloc.start()
+    threading.stack_size(256 * 1024)
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(user_id,), daemon=True) for user_id in range(clients)]
+    for thread in threads:
+        thread.start()
+    ready.wait()
+    connect_seconds = time.perf_counter() - started
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Let the idle subscribers settle, then measure one publish at a time
+    time.sleep(0.2)
+    for _ in range(events):
+        hub.publish(user_channel(random.randrange(clients)), 'message', {'sent': time.perf_counter()})
+        delivered.acquire()
+
+    started = time.perf_counter()
+    for _ in range(events):
+        hub.publish(user_channel(random.randrange(clients)), 'message', {'sent': time.perf_counter()})
+    for _ in range(events):
+        delivered.acquire()
+    burst_seconds = time.perf_counter() - started
+
+    stopping.set()
+    for user_id in range(clients):
+        hub.publish(user_channel(user_id), 'shutdown', {'sent': time.perf_counter()})
+    for thread in threads:
+        thread.join()
+
+    sequential = latencies[:events]
+    print(f"{clients} idle clients connected in {connect_seconds:.2f}s, "
+          f"{heap / clients / 1024:.1f} KiB Python heap per client")
+    print(f"  publish -> delivery    p50 {percentile(sequential, 0.50) * 1e6:8.0f} us   "
+          f"p95 {percentile(sequential, 0.95) * 1e6:8.0f} us   max {max(sequential) * 1e6:8.0f} us")
+    print(f"  burst of {events} events  {events / burst_seconds:8.0f} deliveries/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--heartbeat', type=float, default=15.0)
+    args = parser.parse_args()
+
+    for clients in args.clients:
+        run(clients, args.events, args.heartbeat)
+
+
+if __name__ == '__main__':
+    main()
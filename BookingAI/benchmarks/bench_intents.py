@@ -0,0 +1,75 @@
+"""
+AI call intent matching: the keyword if/elif chain vs. the compiled matcher.
+
+The intent table is padded with synthetic intents to show how each approach
+scales with the number of phrases.
+
+    python -m BookingAI.benchmarks.bench_intents --phrases 10000 --extra-intents 0 25 100
+"""
+import argparse
+import random
+import time
+
+from ..services.intents import INTENTS, Intent, IntentMatcher, match_intent
+from .intent_corpus import CORPUS, BOUNDARY_FIXES, benchmark_phrases
+
+
+def padded_intents(extra, seed=7):
+    rng = random.Random(seed)
+    synthetic = [
+        Intent(f'synthetic_{i}', len(INTENTS) + i, tuple(
+            ''.join(rng.choice('bcdfghjklmnpqrstvwxz') for _ in range(7)) for _ in range(4)
+        ))
+        for i in range(extra)
+    ]
+    return list(INTENTS) + synthetic
+
+
+def keyword_chain(intents):
+    chain = [(intent.name, intent.phrases) for intent in sorted(intents, key=lambda intent: intent.priority)]
+
+    def match(message):
+        message = message.lower()
+        for name, words in chain:
+            if any(word in message for word in words):
+                return name
+        return 'default'
+    return match
+
+
+def throughput(match, phrases, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for phrase in phrases:
+            match(phrase)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return len(phrases) / best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--phrases', type=int, default=10000)
+    parser.add_argument('--extra-intents', type=int, nargs='+', default=[0, 25, 100])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    agree = sum(match_intent(text) == expected for text, expected in CORPUS)
+    fixed = sum(match_intent(text) == expected for text, _, expected in BOUNDARY_FIXES)
+    print(f"regression corpus: {agree}/{len(CORPUS)} agree with the keyword chain, "
+          f"{fixed}/{len(BOUNDARY_FIXES)} word-boundary fixes")
+
+    phrases = benchmark_phrases(args.phrases)
+    for extra in args.extra_intents:
+        intents = padded_intents(extra)
+        keywords = sum(len(intent.phrases) for intent in intents)
+        legacy = throughput(keyword_chain(intents), phrases, args.repeat)
+        compiled = throughput(IntentMatcher(intents).match, phrases, args.repeat)
+        print(f"{len(intents)} intents / {keywords} phrases, {args.phrases} utterances")
+        print(f"  keyword chain     {legacy:10.0f} utterances/s")
+        print(f"  compiled matcher  {compiled:10.0f} utterances/s   {compiled / legacy:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+End-to-end load test: concurrent virtual users register and log in, then
+search availability, book, message and leave feedback. Reports latency
+percentiles, throughput and SQL statements per endpoint.
+
+    python -m BookingAI.benchmarks.bench_load --users 16 --iterations 10 --output load.json
+    python -m BookingAI.benchmarks.bench_load --baseline load.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+
+from .. import create_app, db
+from ..database.models import User, ServiceProvider, Availability
+from .stats import percentile
+
+SERVICE_TYPES = ['dentist', 'physio', 'optician', 'dermatology', 'cardiology', 'pediatrics']
+
+
+def seed(providers, slots_per_provider, start):
+    users = [User(email=f'provider{i}@example.com', password_hash='x', full_name=f'Provider {i}')
+             for i in range(providers)]
+    profiles = [ServiceProvider(user=user, service_type=SERVICE_TYPES[i % len(SERVICE_TYPES)])
+                for i, user in enumerate(users)]
+    db.session.add_all(profiles)
+    db.session.flush()
+    rows = []
+    for profile in profiles:
+        for i in range(slots_per_provider):
+            # Eight half-hour slots per working day
+            slot_start = start + timedelta(days=i // 8, hours=9 + i % 8)
+            rows.append({'provider_id': profile.id, 'start_time': slot_start, 'end_time': slot_start + timedelta(minutes=30)})
+    db.session.execute(insert(Availability), rows)
+    db.session.commit()
+    return [profile.user_id for profile in profiles]
+
+
+class Recorder:
+    """
+    Per-endpoint latencies, statuses and SQL statement counts. Statements are
+    attributed to the endpoint the executing thread is currently calling.
+    """
+
+    def __init__(self, engine):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.statements = defaultdict(int)
+        self._current = threading.local()
+        self._lock = threading.Lock()
+        event.listen(engine, 'before_cursor_execute', self._count)
+
+    def _count(self, *args):
+        label = getattr(self._current, 'label', None)
+        if label is not None:
+            self._current.statements += 1
+
+    def call(self, label, send):
+        self._current.label = label
+        self._current.statements = 0
+        started = time.perf_counter()
+        response = send()
+        elapsed = time.perf_counter() - started
+        self._current.label = None
+        with self._lock:
+            self.latencies[label].append(elapsed)
+            self.statuses[label][response.status_code] += 1
+            self.statements[label] += self._current.statements
+        return response
+
+    def summary(self, elapsed):
+        endpoints = {}
+        for label, samples in self.latencies.items():
+            endpoints[label] = {
+                'requests': len(samples),
+                'throughput': len(samples) / elapsed,
+                'p50_ms': percentile(samples, 0.50) * 1e3,
+                'p95_ms': percentile(samples, 0.95) * 1e3,
+                'p99_ms': percentile(samples, 0.99) * 1e3,
+                'sql_per_request': self.statements[label] / len(samples),
+                'statuses': {str(status): count for status, count in sorted(self.statuses[label].items())}
+            }
+        return endpoints
+
+
+def virtual_user(app, recorder, index, iterations, provider_user_ids, window, seed_value):
+    rng = random.Random(seed_value + index)
+    client = app.test_client()
+    email = f'vu{index}@example.com'
+
+    recorder.call('POST /api/users/register', lambda: client.post('/api/users/register', json={
+        'email': email, 'password': 'secret', 'full_name': f'Virtual User {index}'
+    }))
+    login = recorder.call('POST /api/users/login', lambda: client.post('/api/users/login', json={
+        'email': email, 'password': 'secret'
+    }))
+    if login.status_code != 200:
+        return
+    headers = {'Authorization': f"Bearer {login.get_json()['access_token']}"}
+
+    for _ in range(iterations):
+        day = window[0] + timedelta(days=rng.randrange((window[1] - window[0]).days))
+        query = {
+            'service_type': rng.choice(SERVICE_TYPES),
+            'start_date': day.isoformat(),
+            'end_date': (day + timedelta(days=7)).isoformat(),
+            'preferred_time': rng.choice(['morning', 'afternoon']),
+            'limit': 20
+        }
+        search = recorder.call('GET /api/availability', lambda: client.get('/api/availability', query_string=query))
+        slots = search.get_json().get('available_slots', []) if search.status_code == 200 else []
+
+        appointment_id = None
+        if slots:
+            slot = rng.choice(slots)
+            booking = recorder.call('POST /api/appointments/book', lambda: client.post(
+                '/api/appointments/book', headers=headers, json={'slot_id': slot['id']}
+            ))
+            if booking.status_code == 201:
+                appointment_id = booking.get_json()['appointment_id']
+
+        recorder.call('POST /api/messages', lambda: client.post('/api/messages', headers=headers, json={
+            'receiver_id': rng.choice(provider_user_ids),
+            'content': 'Looking forward to my appointment'
+        }))
+        recorder.call('GET /api/messages', lambda: client.get('/api/messages?limit=20', headers=headers))
+        recorder.call('POST /api/feedback', lambda: client.post('/api/feedback', headers=headers, json={
+            'appointment_id': appointment_id,
+            'rating': rng.randint(1, 5),
+            'comment': 'Quick and easy',
+            'feedback_type': 'appointment'
+        }))
+
+
+def compare(current, baseline):
+    print(f"  vs. baseline ({baseline.get('started_at', 'unknown')})")
+    for label, stats in current['endpoints'].items():
+        before = baseline['endpoints'].get(label)
+        if before is None:
+            continue
+        p95_change = (stats['p95_ms'] / before['p95_ms'] - 1) * 100 if before['p95_ms'] else 0.0
+        throughput_change = (stats['throughput'] / before['throughput'] - 1) * 100 if before['throughput'] else 0.0
+        print(f"    {label:<30} p95 {p95_change:+7.1f}%   throughput {throughput_change:+7.1f}%   "
+              f"sql/req {stats['sql_per_request'] - before['sql_per_request']:+6.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=16, help='concurrent virtual users')
+    parser.add_argument('--iterations', type=int, default=10, help='search/book/message/feedback rounds per user')
+    parser.add_argument('--providers', type=int, default=300)
+    parser.add_argument('--slots', type=int, default=400, help='slots per provider')
+    parser.add_argument('--hash-method', help='PASSWORD_HASH_METHOD, e.g. pbkdf2:sha256:1000 for quicker runs')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args()
+
+    start = datetime(2030, 1, 7)
+    window = (start, start + timedelta(days=args.slots // 8))
+    with tempfile.TemporaryDirectory() as tmp:
+        config = {
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'load.db')}",
+            'OUTBOX_TRANSPORT': 'fake',
+            # Measure the request path alone, as earlier runs did
+            'OUTBOX_AUTOSTART': False
+        }
+        if args.hash_method:
+            config['PASSWORD_HASH_METHOD'] = args.hash_method
+        app = create_app(config)
+        with app.app_context():
+            seeding = time.perf_counter()
+            provider_user_ids = seed(args.providers, args.slots, start)
+            seeding = time.perf_counter() - seeding
+            recorder = Recorder(db.engine)
+        # Start the hashing pool before timing so process spawn is not counted
+        hasher = app.extensions['password_hasher']
+        hasher.verify(hasher.hash('warmup'), 'warmup')
+
+        threads = [
+            threading.Thread(target=virtual_user, args=(
+                app, recorder, i, args.iterations, provider_user_ids, window, args.seed
+            ))
+            for i in range(args.users)
+        ]
+        started_at = datetime.utcnow().isoformat(timespec='seconds')
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        hasher.shutdown()
+        with app.app_context():
+            db.engine.dispose()
+
+    results = {
+        'started_at': started_at,
+        'python': sys.version.split()[0],
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+        'elapsed_seconds': elapsed,
+        'requests_per_second': sum(len(samples) for samples in recorder.latencies.values()) / elapsed,
+        'endpoints': recorder.summary(elapsed)
+    }
+
+    print(f"{args.users} virtual users x {args.iterations} iterations, "
+          f"{args.providers} providers x {args.slots} slots (seeded in {seeding:.1f} s)")
+    print(f"  {results['requests_per_second']:.0f} req/s overall in {elapsed:.1f} s")
+    for label, stats in results['endpoints'].items():
+        print(f"    {label:<30} {stats['requests']:6d} req  {stats['throughput']:7.1f} req/s   "
+              f"p50 {stats['p50_ms']:8.2f} ms   p95 {stats['p95_ms']:8.2f} ms   p99 {stats['p99_ms']:8.2f} ms   "
+              f"sql/req {stats['sql_per_request']:5.2f}   statuses {stats['statuses']}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
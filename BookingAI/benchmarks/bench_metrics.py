@@ -0,0 +1,57 @@
+"""
+Per-request overhead of the instrumentation: metrics disabled, enabled, and
+enabled with sampled cProfile.
+
+    python -m BookingAI.benchmarks.bench_metrics --requests 2000
+"""
+import argparse
+import tempfile
+import time
+
+from .. import create_app, db
+from .stats import percentile
+
+
+def measure(app, requests):
+    client = app.test_client()
+    for _ in range(50):
+        client.get('/api/availability?service_type=dentist')
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        client.get('/api/availability?service_type=dentist')
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--sample-rate', type=float, default=0.01)
+    args = parser.parse_args()
+
+    print(f"{args.requests} searches through the test client, search cache off")
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        for name, config in (
+            ('disabled', {}),
+            ('metrics', {'METRICS_ENABLED': True}),
+            (f'metrics + {args.sample_rate:.0%} profiled', {
+                'METRICS_ENABLED': True,
+                'PROFILE_SAMPLE_RATE': args.sample_rate,
+                'PROFILE_THRESHOLD_MS': 0,
+                'PROFILE_DIR': tmp
+            }),
+        ):
+            app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'OUTBOX_AUTOSTART': False, 'SEARCH_CACHE_BACKEND': 'none', **config})
+            latencies = measure(app, args.requests)
+            with app.app_context():
+                db.engine.dispose()
+            mean = sum(latencies) / len(latencies)
+            baseline = baseline or mean
+            print(f"  {name:<24} mean {mean * 1e6:8.1f} us ({(mean / baseline - 1) * 100:+5.1f}%)   "
+                  f"p50 {percentile(latencies, 0.50) * 1e6:8.1f} us   p99 {percentile(latencies, 0.99) * 1e6:8.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+Next N free slots after a time: the old global ORDER BY start_time query,
+the same query scoped by service type, and the per-provider merge engine.
+
+    python -m BookingAI.benchmarks.bench_next_available --providers 1000 --slots 10000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from .. import create_app, db
+from ..database.models import User, ServiceProvider, Availability
+from ..database.seed import generate_dataset, SERVICE_TYPES
+from ..services.next_available import next_free_slots
+from .stats import percentile
+
+
+def global_query(after, limit, service_type):
+    # What process_user_message ran before: every provider, any service type
+    return Availability.query.filter(
+        Availability.start_time > after,
+        Availability.is_booked == False
+    ).order_by(Availability.start_time).limit(limit).all()
+
+
+def scoped_query(after, limit, service_type):
+    return db.session.query(
+        Availability.id, Availability.provider_id, User.full_name, ServiceProvider.service_type,
+        Availability.start_time, Availability.end_time
+    ).join(
+        ServiceProvider, ServiceProvider.id == Availability.provider_id
+    ).join(
+        User, User.id == ServiceProvider.user_id
+    ).filter(
+        ServiceProvider.service_type == service_type,
+        Availability.start_time >= after,
+        Availability.is_booked == False
+    ).order_by(Availability.start_time, Availability.id).limit(limit).all()
+
+
+def merge_engine(after, limit, service_type):
+    return next_free_slots(after, limit, service_type)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--providers', type=int, default=1000)
+    parser.add_argument('--slots', type=int, default=10000, help='slots per provider')
+    parser.add_argument('--booked-ratio', type=float, default=0.3)
+    parser.add_argument('--queries', type=int, default=100)
+    parser.add_argument('--limit', type=int, default=3, help='free slots to return')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    start = datetime(2030, 1, 1)
+    days = args.slots // 8
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'next.db')}", 'OUTBOX_AUTOSTART': False})
+        with app.app_context():
+            seeding = time.perf_counter()
+            generate_dataset(users=args.providers * 2, providers=args.providers, slots_per_provider=args.slots,
+                             booked_ratio=args.booked_ratio, messages=0, feedback_ratio=0, start=start)
+            seeding = time.perf_counter() - seeding
+            queries = [
+                (start + timedelta(days=rng.randrange(days), hours=rng.randrange(24)), rng.choice(SERVICE_TYPES))
+                for _ in range(args.queries)
+            ]
+
+            print(f"{args.providers} providers x {args.slots} slots (seeded in {seeding:.1f} s), "
+                  f"next {args.limit} free slots at {args.queries} random times")
+            for name, search in (
+                ('global query, unscoped', global_query),
+                ('global query, scoped', scoped_query),
+                ('per-provider merge', merge_engine),
+            ):
+                search(queries[0][0], args.limit, queries[0][1])  # warm the page cache
+                latencies = []
+                for after, service_type in queries:
+                    started = time.perf_counter()
+                    search(after, args.limit, service_type)
+                    latencies.append(time.perf_counter() - started)
+                print(f"  {name:<24} p50 {percentile(latencies, 0.50) * 1e3:9.2f} ms   "
+                      f"p95 {percentile(latencies, 0.95) * 1e3:9.2f} ms")
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
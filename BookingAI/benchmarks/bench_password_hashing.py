@@ -0,0 +1,98 @@
+"""
+Login throughput and tail latency with password hashing inline on the request
+thread vs. on the bounded process pool.
+
+    python -m BookingAI.benchmarks.bench_password_hashing --threads 16 --logins 10 --workers 4
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from werkzeug.security import generate_password_hash
+
+from .. import create_app, db
+from ..database.models import User
+from .stats import percentile
+
+
+def seed(users, method):
+    # Every user shares one hash so seeding does not dominate the run
+    password_hash = generate_password_hash('secret', method)
+    db.session.add_all([
+        User(email=f'user{i}@example.com', password_hash=password_hash, full_name=f'User {i}')
+        for i in range(users)
+    ])
+    db.session.commit()
+
+
+def storm(app, threads, logins):
+    barrier = threading.Barrier(threads)
+    latencies = []
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def worker(index):
+        client = app.test_client()
+        barrier.wait()
+        for _ in range(logins):
+            started = time.perf_counter()
+            status = client.post('/api/users/login', json={
+                'email': f'user{index}@example.com',
+                'password': 'secret'
+            }).status_code
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[status] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started, latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=10, help='logins per thread')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--max-pending', type=int, default=32)
+    parser.add_argument('--method', default='pbkdf2:sha256:600000')
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads x {args.logins} logins, {args.method}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, workers in (('inline', 0), (f'pool ({args.workers} workers)', args.workers)):
+            app = create_app({
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, f'{workers}.db')}",
+                'OUTBOX_AUTOSTART': False,
+                'SEARCH_CACHE_BACKEND': 'none',
+                'PASSWORD_HASH_METHOD': args.method,
+                'PASSWORD_HASH_WORKERS': workers,
+                'PASSWORD_HASH_MAX_PENDING': args.max_pending
+            })
+            hasher = app.extensions['password_hasher']
+            with app.app_context():
+                seed(args.threads, args.method)
+            if workers:
+                # Start the pool before timing so process spawn is not counted
+                hasher.verify(generate_password_hash('warmup', 'pbkdf2:sha256:1'), 'warmup')
+
+            elapsed, latencies, statuses = storm(app, args.threads, args.logins)
+            hasher.shutdown()
+            with app.app_context():
+                db.engine.dispose()
+
+            print(f"  {name:<20} {statuses[200] / elapsed:8.1f} logins/s   p50 {percentile(latencies, 0.50) * 1e3:8.1f} ms   "
+                  f"p95 {percentile(latencies, 0.95) * 1e3:8.1f} ms   p99 {percentile(latencies, 0.99) * 1e3:8.1f} ms   "
+                  f"statuses {dict(sorted(statuses.items()))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Ranked provider search from the rating aggregates vs. grouping the raw
+feedback table per request, plus the cost of the full rebuild.
+
+    python -m BookingAI.benchmarks.bench_ratings --providers 1000 --slots 200
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import func, select
+
+from .. import create_app, db
+from ..database.models import User, ServiceProvider, Appointment, Feedback
+from ..database.seed import generate_dataset, SERVICE_TYPES
+from ..services.ratings import rebuild_ratings, ranked_providers_query
+from .stats import percentile
+
+
+def raw_feedback_query(service_type, limit):
+    # What the ranking costs without the aggregate table
+    average = func.avg(Feedback.rating)
+    return select(
+        ServiceProvider.id, User.full_name, ServiceProvider.service_type, average, func.count(Feedback.id)
+    ).join(
+        Appointment, Appointment.id == Feedback.appointment_id
+    ).join(
+        ServiceProvider, ServiceProvider.id == Appointment.provider_id
+    ).join(
+        User, User.id == ServiceProvider.user_id
+    ).where(
+        Feedback.rating.between(1, 5), ServiceProvider.service_type == service_type
+    ).group_by(
+        ServiceProvider.id, User.full_name, ServiceProvider.service_type
+    ).order_by(average.desc(), func.count(Feedback.id).desc(), ServiceProvider.id).limit(limit)
+
+
+def measure(build, queries, limit):
+    latencies = []
+    for i in range(queries):
+        statement = build(SERVICE_TYPES[i % len(SERVICE_TYPES)], limit)
+        started = time.perf_counter()
+        db.session.execute(statement).all()
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--providers', type=int, default=1000)
+    parser.add_argument('--slots', type=int, default=200, help='slots per provider')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'ratings.db')}", 'OUTBOX_AUTOSTART': False})
+        with app.app_context():
+            generate_dataset(users=args.providers * 5, providers=args.providers, slots_per_provider=args.slots,
+                             messages=0)
+            feedback = db.session.scalar(select(func.count(Feedback.id)))
+
+            started = time.perf_counter()
+            rated = rebuild_ratings()
+            rebuild = time.perf_counter() - started
+
+            print(f"{args.providers} providers, {feedback} ratings, top {args.limit} per service type")
+            print(f"  rebuild-ratings        {rebuild * 1e3:9.1f} ms for {rated} providers")
+            for name, build in (
+                ('raw feedback GROUP BY', raw_feedback_query),
+                ('rating aggregates', lambda service_type, limit: ranked_providers_query(service_type, 1, limit)),
+            ):
+                latencies = measure(build, args.queries, args.limit)
+                print(f"  {name:<22} p50 {percentile(latencies, 0.50) * 1e3:8.2f} ms   "
+                      f"p95 {percentile(latencies, 0.95) * 1e3:8.2f} ms")
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
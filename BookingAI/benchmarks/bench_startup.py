@@ -0,0 +1,67 @@
+"""
+Cold start: fresh interpreter importing BookingAI.app up to the first served
+request, with the default boot vs. BOOKINGAI_FAST_START=1.
+
+    python -m BookingAI.benchmarks.bench_startup --runs 5 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from .. import create_app, db
+
+# Runs in a fresh interpreter so nothing is imported yet
+PROBE = """
+import json, time
+started = time.perf_counter()
+import BookingAI.app
+booted = time.perf_counter()
+response = BookingAI.app.app.test_client().get('/api/availability')
+served = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({'boot': booted - started, 'first_request': served - booted, 'total': served - started}))
+"""
+
+
+def probe(database_url, fast_start):
+    env = dict(os.environ, DATABASE_URL=database_url, BOOKINGAI_FAST_START='1' if fast_start else '0')
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=root, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--output', help='write the medians as JSON to this file')
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        # Fast start expects the schema to exist, as after `flask init-db`
+        app = create_app({'SQLALCHEMY_DATABASE_URI': database_url, 'OUTBOX_AUTOSTART': False})
+        with app.app_context():
+            db.engine.dispose()
+
+        print(f"median of {args.runs} cold starts")
+        for name, fast_start in (('default', False), ('fast start', True)):
+            samples = [probe(database_url, fast_start) for _ in range(args.runs)]
+            medians = {key: statistics.median(sample[key] for sample in samples) for key in samples[0]}
+            results[name] = medians
+            print(f"  {name:<12} boot {medians['boot'] * 1e3:7.1f} ms   first request {medians['first_request'] * 1e3:7.1f} ms   "
+                  f"import to first response {medians['total'] * 1e3:7.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'runs': args.runs, 'python': sys.version.split()[0], 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
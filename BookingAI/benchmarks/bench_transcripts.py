@@ -0,0 +1,80 @@
+"""
+Persisting AI call transcripts: one INSERT + commit per turn vs. the batched
+transcript writer.
+
+    python -m BookingAI.benchmarks.bench_transcripts --calls 200 --turns 20 --flush-turns 100
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from .. import create_app, db
+from ..database.models import CallTranscript
+from ..services.transcripts import TranscriptWriter
+from .stats import percentile
+
+
+def turns(calls, per_call):
+    for seq in range(1, per_call + 1):
+        for call in range(calls):
+            yield f'call-{call}', seq, 'user' if seq % 2 else 'assistant', f'Turn {seq} of call {call}'
+
+
+def per_turn_commits(app, workload):
+    latencies = []
+    with app.app_context():
+        for call_id, seq, role, content in workload:
+            started = time.perf_counter()
+            db.session.add(CallTranscript(call_id=call_id, seq=seq, role=role, content=content))
+            db.session.commit()
+            latencies.append(time.perf_counter() - started)
+    return latencies, 0.0
+
+
+def batched(app, workload, flush_turns):
+    writer = TranscriptWriter(app, flush_turns=flush_turns)
+    latencies = []
+    for call_id, seq, role, content in workload:
+        started = time.perf_counter()
+        writer.append(call_id, seq, role, content)
+        latencies.append(time.perf_counter() - started)
+    started = time.perf_counter()
+    writer.close()
+    return latencies, time.perf_counter() - started
+
+
+def report(name, latencies, tail_seconds, total):
+    elapsed = sum(latencies) + tail_seconds
+    print(f"  {name:<18} {total / elapsed:10.0f} turns/s   per-turn p50 {percentile(latencies, 0.50) * 1e6:8.1f} us   "
+          f"p95 {percentile(latencies, 0.95) * 1e6:8.1f} us   max {max(latencies) * 1e3:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--turns', type=int, default=20)
+    parser.add_argument('--flush-turns', type=int, default=100)
+    args = parser.parse_args()
+
+    total = args.calls * args.turns
+    print(f"{args.calls} calls x {args.turns} turns, file-backed SQLite")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, run in (
+            ('insert per turn', lambda app: per_turn_commits(app, turns(args.calls, args.turns))),
+            ('batched writer', lambda app: batched(app, turns(args.calls, args.turns), args.flush_turns)),
+        ):
+            app = create_app({
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, name.replace(' ', '_'))}.db",
+                'OUTBOX_AUTOSTART': False,
+                'SEARCH_CACHE_BACKEND': 'none'
+            })
+            latencies, tail_seconds = run(app)
+            with app.app_context():
+                assert CallTranscript.query.count() == total
+                db.engine.dispose()
+            report(name, latencies, tail_seconds, total)
+
+
+if __name__ == '__main__':
+    main()
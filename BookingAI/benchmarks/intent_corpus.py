@@ -0,0 +1,104 @@
+"""
+Regression corpus for the AI call intent matcher, shared by the tests and
+the benchmark, together with the keyword chain process_user_message used
+before the compiled matcher.
+"""
+
+LEGACY_KEYWORDS = (
+    ('schedule', ['schedule', 'book', 'appointment', 'make an appointment']),
+    ('confirm', ['yes', 'confirm', 'sure', 'okay', 'fine']),
+    ('reschedule', ['reschedule', 'change time', 'different time', 'another time']),
+    ('hours', ['hours', 'open', 'close', 'when are you open']),
+    ('emergency', ['emergency', 'urgent', 'immediately', 'right now']),
+    ('help', ['help', 'what can you do', 'how can you help']),
+    ('end_call', ['goodbye', 'bye', 'end call', 'hang up']),
+)
+
+
+def legacy_intent(message):
+    message = message.lower()
+    for name, words in LEGACY_KEYWORDS:
+        if any(word in message for word in words):
+            return name
+    return 'default'
+
+
+# (utterance, intent) pairs on which the keyword chain and the compiled
+# matcher must agree, including the examples the assistant itself suggests
+CORPUS = (
+    ("I'd like to schedule for March 15th at 2 PM", 'schedule'),
+    ("Can I book an appointment for tomorrow?", 'schedule'),
+    ("I want to make an appointment", 'schedule'),
+    ("Book me in for 15 march at 10:30 am please", 'schedule'),
+    ("I need an appointment with the dentist", 'schedule'),
+    ("I would like to make a booking", 'schedule'),
+    ("Can I get booked in for monday", 'schedule'),
+    ("Do you have any appointments on Friday?", 'schedule'),
+    ("Is my booking still on?", 'schedule'),
+    ("My appointment was rescheduled twice", 'schedule'),
+    ("Yes", 'confirm'),
+    ("yes please", 'confirm'),
+    ("Sure, that works", 'confirm'),
+    ("Okay", 'confirm'),
+    ("That's fine", 'confirm'),
+    ("Please confirm it", 'confirm'),
+    ("Confirmed, thanks", 'confirm'),
+    ("I'm just confirming", 'confirm'),
+    ("Can I change time?", 'reschedule'),
+    ("I need a different time", 'reschedule'),
+    ("Could we do another time", 'reschedule'),
+    ("What are your hours?", 'hours'),
+    ("When are you open", 'hours'),
+    ("What time do you close on Saturday", 'hours'),
+    ("Are you open on Sundays?", 'hours'),
+    ("What are your opening times?", 'hours'),
+    ("Is the clinic closed today?", 'hours'),
+    ("What time does it close on Fridays", 'hours'),
+    ("This is an emergency", 'emergency'),
+    ("It's urgent", 'emergency'),
+    ("I need a doctor right now", 'emergency'),
+    ("Please send someone immediately", 'emergency'),
+    ("I need to see someone urgently", 'emergency'),
+    ("Help", 'help'),
+    ("What can you do", 'help'),
+    ("How can you help me", 'help'),
+    ("You helped me last time", 'help'),
+    ("Goodbye", 'end_call'),
+    ("ok bye", 'end_call'),
+    ("Please end call", 'end_call'),
+    ("I'm going to hang up now", 'end_call'),
+    ("Hello there", 'default'),
+    ("Who is my doctor?", 'default'),
+    ("", 'default'),
+    ("Yes, book it", 'schedule'),
+    ("I need help, it is urgent", 'emergency'),
+    ("Okay, what are your hours", 'confirm'),
+)
+
+# Utterances the substring chain got wrong because keywords matched inside
+# other words, or missed because an inflection drops the keyword's final
+# letter ("scheduling", "emergencies"); the compiled matcher only matches
+# whole words and phrases, and lists those inflections itself.
+# (utterance, legacy intent, intended intent)
+BOUNDARY_FIXES = (
+    ("I'd like to reschedule for March 20th at 3 PM", 'schedule', 'reschedule'),
+    ("Can you measure my blood pressure?", 'confirm', 'default'),
+    ("Can you define the procedure?", 'confirm', 'default'),
+    ("My eyes hurt", 'confirm', 'default'),
+    ("Is there a clinic closer to me?", 'hours', 'default'),
+    ("I found you on facebook", 'schedule', 'default'),
+    ("That was helpful", 'help', 'default'),
+    ("I'm scheduling a check-up for my son", 'default', 'schedule'),
+    ("Could we do some rescheduling?", 'default', 'reschedule'),
+    ("Do you take emergencies?", 'default', 'emergency'),
+)
+
+
+def benchmark_phrases(count):
+    """
+    `count` utterances cycling through the corpus, with enough variation in
+    length to resemble real call transcripts.
+    """
+    base = [text for text, _ in CORPUS] + [text for text, _, _ in BOUNDARY_FIXES]
+    padding = " and I was also wondering about the parking situation near your building"
+    return [base[i % len(base)] + padding * (i % 3) for i in range(count)]
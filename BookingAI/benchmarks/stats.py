@@ -0,0 +1,14 @@
+"""
+Statistics helpers shared by the benchmarks.
+"""
+
+
+def percentile(samples, fraction):
+    """
+    Nearest-rank percentile of `samples`, e.g. fraction=0.95 for p95, or
+    None when there are no samples.
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
@@ -0,0 +1,73 @@
+import time
+from datetime import datetime, timedelta
+
+import click
+
+from . import db
+
+
+def register_commands(app):
+
+    @app.cli.command('init-db')
+    def init_db():
+        """Create any missing database tables."""
+        from .database import models  # noqa: F401 - registers the tables
+        db.create_all()
+        click.echo('Initialized the database.')
+
+    @app.cli.command('seed-data')
+    @click.option('--users', default=10000, show_default=True, help='Users, providers included.')
+    @click.option('--providers', default=1000, show_default=True)
+    @click.option('--slots-per-provider', default=1000, show_default=True)
+    @click.option('--booked-ratio', default=0.3, show_default=True, help='Share of slots with an appointment.')
+    @click.option('--messages', default=50000, show_default=True)
+    @click.option('--feedback-ratio', default=0.5, show_default=True, help='Share of appointments with feedback.')
+    @click.option('--start', default='2030-01-01', show_default=True, help='Date of the first slot.')
+    @click.option('--seed', default=42, show_default=True, help='Same seed, same dataset.')
+    @click.option('--batch-size', default=5000, show_default=True, help='Rows per INSERT batch.')
+    @click.option('--keep-indexes', is_flag=True, help='Maintain indexes during the load instead of rebuilding them.')
+    def seed_data(users, providers, slots_per_provider, booked_ratio, messages, feedback_ratio, start, seed,
+                  batch_size, keep_indexes):
+        """Bulk-insert a deterministic synthetic dataset."""
+        from .database.seed import generate_dataset
+        db.create_all()
+        try:
+            stats = generate_dataset(
+                users=users,
+                providers=providers,
+                slots_per_provider=slots_per_provider,
+                booked_ratio=booked_ratio,
+                messages=messages,
+                feedback_ratio=feedback_ratio,
+                seed=seed,
+                batch_size=batch_size,
+                start=datetime.fromisoformat(start),
+                defer_indexes=not keep_indexes
+            )
+        except ValueError as exc:
+            raise click.BadParameter(str(exc))
+        for line in stats.report():
+            click.echo(line)
+
+    @app.cli.command('rebuild-ratings')
+    def rebuild_ratings_command():
+        """Recompute the provider rating aggregates from all feedback."""
+        from .services.ratings import rebuild_ratings
+        db.create_all()
+        started = time.perf_counter()
+        providers = rebuild_ratings()
+        click.echo(f'Rebuilt ratings for {providers} providers in {time.perf_counter() - started:.2f} s.')
+
+    @app.cli.command('archive-history')
+    @click.option('--older-than-days', default=30, show_default=True, help='Archive what ended this many days ago.')
+    @click.option('--batch-size', default=1000, show_default=True, help='Rows moved per transaction.')
+    @click.option('--pause', default=0.0, show_default=True, help='Seconds to sleep between batches.')
+    def archive_history_command(older_than_days, batch_size, pause):
+        """Move past appointments and slots into the archive tables."""
+        from .services.archive import archive_history
+        db.create_all()
+        started = time.perf_counter()
+        stats = archive_history(datetime.utcnow() - timedelta(days=older_than_days), batch_size, pause)
+        click.echo(f"Archived {stats['appointments']} appointments and {stats['availabilities']} slots "
+                   f"in {stats['batches']} batches, {time.perf_counter() - started:.2f} s "
+                   f"(longest batch {stats['longest_batch'] * 1e3:.0f} ms).")
@@ -0,0 +1,78 @@
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+DEFAULT_DATABASE_URI = 'sqlite:///appointments.db'
+
+
+def database_uri():
+    """
+    Database URI from the DATABASE_URL environment variable, falling back to
+    the local SQLite file.
+    """
+    return os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URI)
+
+
+def is_sqlite_file(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def engine_options(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the configured database.
+
+    File-backed SQLite gets a small connection pool and a driver-level busy
+    timeout; in-memory SQLite keeps Flask-SQLAlchemy's single shared
+    connection. Server databases get a sized pool with pre-ping and
+    recycling so connections dropped by the server are replaced quietly.
+    """
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    backend = make_url(uri).get_backend_name()
+    if backend == 'sqlite':
+        if not is_sqlite_file(uri):
+            return {}
+        return {
+            'pool_size': config.get('DB_POOL_SIZE', 10),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 20),
+            'connect_args': {
+                'timeout': config.get('SQLITE_BUSY_TIMEOUT_MS', 5000) / 1000,
+                'check_same_thread': False
+            }
+        }
+    return {
+        'pool_size': config.get('DB_POOL_SIZE', 10),
+        'max_overflow': config.get('DB_MAX_OVERFLOW', 20),
+        'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True)
+    }
+
+
+def configure_engine(engine, config):
+    """
+    Apply the SQLITE_* pragmas to every new connection of a file-backed
+    SQLite engine: WAL lets searches read while a booking writes,
+    synchronous=NORMAL is durable under WAL without an fsync per commit,
+    busy_timeout makes writers wait for the lock instead of failing with
+    "database is locked", and mmap_size serves reads from the page cache.
+    """
+    if engine.dialect.name != 'sqlite' or not is_sqlite_file(str(engine.url)):
+        return
+
+    pragmas = [
+        f"PRAGMA journal_mode={config.get('SQLITE_JOURNAL_MODE', 'WAL')}",
+        f"PRAGMA synchronous={config.get('SQLITE_SYNCHRONOUS', 'NORMAL')}",
+        f"PRAGMA busy_timeout={int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+        f"PRAGMA mmap_size={int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+    ]
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
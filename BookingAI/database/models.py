@@ -1,6 +1,22 @@
 from datetime import datetime
 from .. import db
 
+# Hour ranges [start, end) for the preferred_time filter of /api/availability
+DAY_PARTS = {
+    'morning': (6, 12),
+    'afternoon': (12, 17),
+    'evening': (17, 22),
+}
+
+def day_part_for(start_time):
+    for name, (first_hour, end_hour) in DAY_PARTS.items():
+        if first_hour <= start_time.hour < end_hour:
+            return name
+    return 'night'
+
+def _default_day_part(context):
+    return day_part_for(context.get_current_parameters()['start_time'])
+
 class User(db.Model):
     __tablename__ = 'users'
 
@@ -12,6 +28,8 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     is_provider = db.Column(db.Boolean, default=False)
+    # Denormalised count of unread direct messages, maintained by services.inbox
+    unread_message_count = db.Column(db.Integer, default=0, nullable=False)
 
     service_provider = db.relationship("ServiceProvider", uselist=False, back_populates="user")
     appointments = db.relationship("Appointment", back_populates="user", cascade="all, delete-orphan")
@@ -28,7 +46,7 @@ class ServiceProvider(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    service_type = db.Column(db.String(50), nullable=False)
+    service_type = db.Column(db.String(50), nullable=False, index=True)
     bio = db.Column(db.Text, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -43,12 +61,17 @@ class ServiceProvider(db.Model):
 
 class Availability(db.Model):
     __tablename__ = 'availabilities'
+    __table_args__ = (
+        db.Index('ix_availabilities_provider_booked_start', 'provider_id', 'is_booked', 'start_time'),
+        db.Index('ix_availabilities_booked_day_part_start', 'is_booked', 'day_part', 'start_time'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     provider_id = db.Column(db.Integer, db.ForeignKey('service_providers.id'), nullable=False)
     start_time = db.Column(db.DateTime, nullable=False)
     end_time = db.Column(db.DateTime, nullable=False)
     is_booked = db.Column(db.Boolean, default=False, nullable=False)
+    day_part = db.Column(db.String(10), default=_default_day_part, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -60,6 +83,9 @@ class Availability(db.Model):
 
 class Appointment(db.Model):
     __tablename__ = 'appointments'
+    __table_args__ = (
+        db.Index('ix_appointments_user_start', 'user_id', 'start_time'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -103,11 +129,16 @@ class CallRequest(db.Model):
 
 class Message(db.Model):
     __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('ix_messages_recipient_created', 'recipient_user_id', 'created_at'),
+        db.Index('ix_messages_sender_created', 'sender_user_id', 'created_at'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     sender_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
     recipient_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    related_appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'), nullable=True)
+    related_appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'), nullable=True, index=True)
+    call_request_id = db.Column(db.Integer, db.ForeignKey('call_requests.id'), nullable=True)
     
     message_type = db.Column(db.String, nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -129,7 +160,7 @@ class Feedback(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'), nullable=True)
+    appointment_id = db.Column(db.Integer, db.ForeignKey('appointments.id'), nullable=True, index=True)
     call_request_id = db.Column(db.Integer, db.ForeignKey('call_requests.id'))
     
     rating = db.Column(db.Integer, nullable=True)
@@ -143,4 +174,144 @@ class Feedback(db.Model):
     appointment = db.relationship("Appointment", back_populates="related_feedback")
 
     def __repr__(self):
-        return f"<Feedback(id={self.id}, user_id={self.user_id}, rating={self.rating}, type='{self.feedback_type}')>" 
\ No newline at end of file
+        return f"<Feedback(id={self.id}, user_id={self.user_id}, rating={self.rating}, type='{self.feedback_type}')>"
+
+class OutboxMessage(db.Model):
+    __tablename__ = 'notification_outbox'
+    __table_args__ = (
+        db.Index('ix_notification_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    channel = db.Column(db.String(20), default='email', nullable=False)
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+
+    status = db.Column(db.String(10), default='pending', nullable=False)  # pending, sending, sent, dead
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    claimed_by = db.Column(db.String(36), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<OutboxMessage(id={self.id}, to='{self.recipient}', status='{self.status}', attempts={self.attempts})>"
+
+class Broadcast(db.Model):
+    __tablename__ = 'broadcasts'
+    __table_args__ = (
+        db.Index('ix_broadcasts_topic_created', 'topic', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    topic = db.Column(db.String(50), nullable=False)  # service_type of the subscribed agents
+    sender_user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    call_request_id = db.Column(db.Integer, db.ForeignKey('call_requests.id'), nullable=True)
+    message_type = db.Column(db.String, nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    sender = db.relationship("User")
+
+    def __repr__(self):
+        return f"<Broadcast(id={self.id}, topic='{self.topic}', type='{self.message_type}')>"
+
+class BroadcastReadMarker(db.Model):
+    __tablename__ = 'broadcast_read_markers'
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'topic', name='uq_broadcast_read_markers_user_topic'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    topic = db.Column(db.String(50), nullable=False)
+    last_read_id = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<BroadcastReadMarker(user_id={self.user_id}, topic='{self.topic}', last_read_id={self.last_read_id})>"
+
+class CallTranscript(db.Model):
+    __tablename__ = 'call_transcripts'
+    __table_args__ = (
+        db.UniqueConstraint('call_id', 'seq', name='uq_call_transcripts_call_seq'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    call_id = db.Column(db.String(36), nullable=False)
+    seq = db.Column(db.Integer, nullable=False)  # turn number within the call, from 1
+    role = db.Column(db.String(20), nullable=False)  # 'user', 'assistant' or 'system'
+    content = db.Column(db.Text, nullable=False)
+    department = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CallTranscript(call_id='{self.call_id}', seq={self.seq}, role='{self.role}')>"
+
+class ProviderRating(db.Model):
+    __tablename__ = 'provider_ratings'
+    __table_args__ = (
+        db.Index('ix_provider_ratings_avg_count', 'rating_avg', 'rating_count'),
+    )
+
+    # Maintained by services.ratings from feedback linked to an appointment
+    provider_id = db.Column(db.Integer, db.ForeignKey('service_providers.id'), primary_key=True)
+    rating_count = db.Column(db.Integer, default=0, nullable=False)
+    rating_sum = db.Column(db.Integer, default=0, nullable=False)
+    rating_avg = db.Column(db.Float, default=0.0, nullable=False)
+    stars_1 = db.Column(db.Integer, default=0, nullable=False)
+    stars_2 = db.Column(db.Integer, default=0, nullable=False)
+    stars_3 = db.Column(db.Integer, default=0, nullable=False)
+    stars_4 = db.Column(db.Integer, default=0, nullable=False)
+    stars_5 = db.Column(db.Integer, default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<ProviderRating(provider_id={self.provider_id}, count={self.rating_count}, avg={self.rating_avg:.2f})>"
+
+class ArchivedAvailability(db.Model):
+    __tablename__ = 'availabilities_archive'
+    __table_args__ = (
+        db.Index('ix_availabilities_archive_provider_start', 'provider_id', 'start_time'),
+    )
+
+    # Rows moved out of availabilities by services.archive, ids preserved
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    provider_id = db.Column(db.Integer, nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    is_booked = db.Column(db.Boolean, default=False, nullable=False)
+    day_part = db.Column(db.String(10), nullable=False)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ArchivedAvailability(id={self.id}, provider_id={self.provider_id}, start='{self.start_time}')>"
+
+class ArchivedAppointment(db.Model):
+    __tablename__ = 'appointments_archive'
+    __table_args__ = (
+        db.Index('ix_appointments_archive_user_start', 'user_id', 'start_time'),
+        db.Index('ix_appointments_archive_provider_start', 'provider_id', 'start_time'),
+    )
+
+    # Rows moved out of appointments by services.archive, ids preserved
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    provider_id = db.Column(db.Integer, nullable=False)
+    availability_id = db.Column(db.Integer, nullable=False)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String, nullable=False)
+    urgency_level = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<ArchivedAppointment(id={self.id}, user_id={self.user_id}, start='{self.start_time}')>"
@@ -0,0 +1,196 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, select
+from werkzeug.security import generate_password_hash
+
+from .. import db
+from .models import User, ServiceProvider, Availability, Appointment, Message, Feedback, ProviderRating, day_part_for
+from ..services.ratings import rebuild_ratings
+
+SERVICE_TYPES = ['dentist', 'physio', 'optician', 'dermatology', 'cardiology', 'pediatrics', 'general', 'therapy']
+SEED_PASSWORD = 'password'
+# Tables whose secondary indexes are dropped during the load and rebuilt after
+DEFERRED_INDEX_TABLES = (Availability, Message)
+
+
+class LoadStats:
+
+    def __init__(self):
+        self.rows = {}
+        self.seconds = {}
+
+    def add(self, table, rows, seconds):
+        self.rows[table] = self.rows.get(table, 0) + rows
+        self.seconds[table] = self.seconds.get(table, 0.0) + seconds
+
+    def report(self):
+        lines = []
+        for table, rows in self.rows.items():
+            seconds = self.seconds[table]
+            lines.append(f"{table:<18} {rows:>10} rows {seconds:8.2f} s {rows / seconds if seconds else 0:>10.0f} rows/s")
+        total_rows = sum(self.rows.values())
+        total_seconds = sum(self.seconds.values())
+        lines.append(f"{'total':<18} {total_rows:>10} rows {total_seconds:8.2f} s "
+                     f"{total_rows / total_seconds if total_seconds else 0:>10.0f} rows/s")
+        return lines
+
+
+def batched(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(stats, model, rows, returning=False):
+    started = time.perf_counter()
+    statement = insert(model)
+    if returning:
+        ids = db.session.scalars(statement.returning(model.id, sort_by_parameter_order=True), rows).all()
+    else:
+        db.session.execute(statement, rows)
+        ids = None
+    db.session.commit()
+    stats.add(model.__tablename__, len(rows), time.perf_counter() - started)
+    return ids
+
+
+def _timed(stats, table, action):
+    started = time.perf_counter()
+    action()
+    stats.add(table, 0, time.perf_counter() - started)
+
+
+def generate_dataset(users=10000, providers=1000, slots_per_provider=1000, booked_ratio=0.3,
+                     messages=50000, feedback_ratio=0.5, seed=42, batch_size=5000,
+                     start=datetime(2030, 1, 1), defer_indexes=True):
+    """
+    Insert a synthetic dataset with Core executemany INSERTs in batches of
+    `batch_size` rows, committing each batch.
+
+    The same `seed` produces the same rows, except for the salt of the one
+    password hash every generated user shares (the password is
+    SEED_PASSWORD). `providers` of the `users` become service providers with
+    `slots_per_provider` half-hour slots each, eight per working day from
+    `start`. About `booked_ratio` of the slots are booked by a random
+    non-provider user, and about `feedback_ratio` of those appointments get
+    feedback. With `defer_indexes` the secondary indexes of the
+    availabilities and messages tables are dropped for the load and rebuilt
+    afterwards, which is faster than maintaining them row by row.
+
+    Provider rating aggregates are rebuilt from the generated feedback at
+    the end.
+
+    Returns a LoadStats with rows and seconds per table; index rebuilds are
+    counted in the table's time.
+    """
+    if providers > users:
+        raise ValueError('providers cannot exceed users')
+    if providers == users and booked_ratio:
+        raise ValueError('booking needs at least one user who is not a provider')
+
+    rng = random.Random(seed)
+    stats = LoadStats()
+    password_hash = generate_password_hash(SEED_PASSWORD)
+    created_at = datetime(start.year, start.month, start.day) - timedelta(days=30)
+    # Offset e-mails so that seeding twice into one database does not collide
+    offset = db.session.scalar(select(func.coalesce(func.max(User.id), 0)))
+    # Index DDL runs on its own connection; release the session's read lock
+    db.session.commit()
+
+    deferred = [index for model in DEFERRED_INDEX_TABLES for index in model.__table__.indexes] if defer_indexes else []
+    for index in deferred:
+        _timed(stats, index.table.name, lambda: index.drop(db.engine))
+
+    try:
+        user_ids = []
+        for batch in batched(({
+            'email': f'seed{offset + n}@example.com',
+            'password_hash': password_hash,
+            'full_name': f'Seed User {offset + n}',
+            'phone_number': f'555{rng.randrange(10 ** 7):07d}',
+            'created_at': created_at,
+            'updated_at': created_at,
+            'is_provider': n < providers,
+            'unread_message_count': 0
+        } for n in range(users)), batch_size):
+            user_ids.extend(_insert(stats, User, batch, returning=True))
+        provider_user_ids, customer_ids = user_ids[:providers], user_ids[providers:]
+
+        provider_ids = []
+        for batch in batched(({
+            'user_id': user_id,
+            'service_type': rng.choice(SERVICE_TYPES),
+            'bio': None,
+            'created_at': created_at,
+            'updated_at': created_at
+        } for user_id in provider_user_ids), batch_size):
+            provider_ids.extend(_insert(stats, ServiceProvider, batch, returning=True))
+
+        def slots():
+            for provider_id in provider_ids:
+                for i in range(slots_per_provider):
+                    slot_start = start + timedelta(days=i // 8, hours=9 + i % 8)
+                    yield {
+                        'provider_id': provider_id,
+                        'start_time': slot_start,
+                        'end_time': slot_start + timedelta(minutes=30),
+                        'is_booked': rng.random() < booked_ratio,
+                        'day_part': day_part_for(slot_start),
+                        'created_at': created_at,
+                        'updated_at': created_at
+                    }
+
+        for batch in batched(slots(), batch_size):
+            slot_ids = _insert(stats, Availability, batch, returning=True)
+            appointments = [{
+                'user_id': rng.choice(customer_ids),
+                'provider_id': slot['provider_id'],
+                'availability_id': slot_id,
+                'start_time': slot['start_time'],
+                'end_time': slot['end_time'],
+                'status': 'confirmed',
+                'urgency_level': rng.choice((0, 0, 0, 1, 2)),
+                'created_at': created_at,
+                'updated_at': created_at
+            } for slot_id, slot in zip(slot_ids, batch) if slot['is_booked']]
+            if not appointments:
+                continue
+            appointment_ids = _insert(stats, Appointment, appointments, returning=True)
+            feedback = [{
+                'user_id': appointment['user_id'],
+                'appointment_id': appointment_id,
+                'rating': rng.choices((1, 2, 3, 4, 5), weights=(1, 1, 3, 6, 9))[0],
+                'comment': None,
+                'feedback_type': 'appointment',
+                'created_at': appointment['end_time'],
+                'updated_at': appointment['end_time']
+            } for appointment_id, appointment in zip(appointment_ids, appointments) if rng.random() < feedback_ratio]
+            if feedback:
+                _insert(stats, Feedback, feedback)
+
+        for batch in batched(({
+            'sender_user_id': rng.choice(user_ids),
+            'recipient_user_id': rng.choice(user_ids),
+            'message_type': 'direct',
+            'content': f'Seed message {n}',
+            'is_read': True,
+            'created_at': created_at + timedelta(seconds=n),
+            'updated_at': created_at + timedelta(seconds=n)
+        } for n in range(messages)), batch_size):
+            _insert(stats, Message, batch)
+    finally:
+        for index in deferred:
+            _timed(stats, index.table.name, lambda: index.create(db.engine))
+
+    # Feedback went in around record_rating, so build the aggregates in bulk
+    started = time.perf_counter()
+    rated = rebuild_ratings()
+    stats.add(ProviderRating.__tablename__, rated, time.perf_counter() - started)
+    return stats
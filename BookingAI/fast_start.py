@@ -0,0 +1,83 @@
+import importlib.util
+import os
+import threading
+
+from flask import Blueprint, jsonify
+
+
+class LazySwagger:
+    """
+    Serves the Flasgger UI and spec without importing Flasgger at startup.
+
+    The routes Flasgger would register (/apidocs/, /apispec_1.json and the
+    UI's static files) are declared up front under the same 'flasgger'
+    blueprint name, so the UI template's url_for calls resolve. Flasgger is
+    imported and the spec built on the first hit of a docs route.
+    """
+
+    def __init__(self, app, uiversion=3):
+        self.app = app
+        self._swagger = None
+        self._lock = threading.Lock()
+
+        # find_spec locates the package without executing its __init__
+        package_dir = importlib.util.find_spec('flasgger').submodule_search_locations[0]
+        blueprint = Blueprint(
+            'flasgger',
+            __name__,
+            template_folder=os.path.join(package_dir, f'ui{uiversion}', 'templates'),
+            static_folder=os.path.join(package_dir, f'ui{uiversion}', 'static'),
+            static_url_path='/flasgger_static'
+        )
+        blueprint.add_url_rule('/apidocs/', 'apidocs', self.docs)
+        blueprint.add_url_rule('/apispec_1.json', 'apispec_1', self.spec)
+        blueprint.add_url_rule('/oauth2-redirect.html', 'oauth_redirect', self.oauth_redirect)
+        app.register_blueprint(blueprint)
+
+    def swagger(self):
+        with self._lock:
+            if self._swagger is None:
+                from flasgger import Swagger
+                swagger = Swagger()
+                swagger.app = self.app
+                swagger.load_config(self.app)
+                self._swagger = swagger
+            return self._swagger
+
+    def docs(self):
+        from flasgger.base import APIDocsView
+        return APIDocsView.as_view('apidocs', view_args={'config': self.swagger().config})()
+
+    def spec(self):
+        return jsonify(self.swagger().get_apispecs('apispec_1'))
+
+    def oauth_redirect(self):
+        from flasgger.base import OAuthRedirect
+        return OAuthRedirect.as_view('oauth_redirect')()
+
+
+class DeferredRoutes:
+    """
+    WSGI wrapper that imports and registers the API routes when the first
+    request arrives instead of while the worker boots.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.wsgi_app = app.wsgi_app
+        self.ready = False
+        self._lock = threading.Lock()
+
+    def ensure_routes(self):
+        if self.ready:
+            return
+        with self._lock:
+            if not self.ready:
+                with self.app.app_context():
+                    from .routes import init_routes
+                    init_routes(self.app)
+                self.ready = True
+
+    def __call__(self, environ, start_response):
+        self.ensure_routes()
+        return self.wsgi_app(environ, start_response)
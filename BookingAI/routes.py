@@ -1,18 +1,79 @@
-from flask import request, jsonify, send_from_directory, render_template
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import request, jsonify, send_from_directory, render_template, Response, stream_with_context
 from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
 from . import db
-from .database.models import User, ServiceProvider, Availability, Appointment, Message, Feedback, CallRequest
-from .services.email_service import send_email
+from .database.models import User, ServiceProvider, Availability, Appointment, Message, Feedback, CallRequest, Broadcast, DAY_PARTS
+from .services.outbox import create_outbox, enqueue_email
+from .services.password_hashing import create_password_hasher, HashingOverloaded
+from .services.identity import create_identity_resolver
+from .services.metrics import create_request_metrics
+from .services.call_sessions import create_call_session_store, new_session, append_turn
+from .services.transcripts import create_transcript_writer, iter_transcripts
+from .services.intents import match_intent
+from .services.datetime_parser import parse_datetime, requested_window
+from .services.event_hub import EventHub, user_channel, topic_channel
+from .services.inbox import (
+    publish_broadcast, create_message, mark_message_read, mark_broadcasts_read, inbox_query, unread_count,
+    visible_broadcasts
+)
+from .services.availability_index import AvailabilityIndex
+from .services.pagination import encode_cursor, after_cursor
+from .services.search_cache import SearchCache, create_search_cache
+from .services.recurrence import expand_recurrence, find_conflicts, MAX_BULK_SLOTS
+from .services.ratings import record_rating, ranked_providers_query, valid_rating, STARS
+from .services.next_available import next_free_slots, has_providers
+from .services.archive import slot_history_query, appointment_history_query
 from datetime import datetime, timezone, time, timedelta
+import atexit
+import json
 import os
 import uuid
 import re
 
-# In-memory storage for active calls
-active_calls = {}
+# Upper bound for the `limit` parameter of paginated endpoints
+MAX_PAGE_SIZE = 1000
+# Rows fetched per round trip when streaming NDJSON results
+STREAM_BATCH_SIZE = 500
 
 def init_routes(app):
+    password_hasher = create_password_hasher(app.config)
+    app.extensions['password_hasher'] = password_hasher
+    identities = create_identity_resolver(app.config)
+    app.extensions['identities'] = identities
+    request_metrics = create_request_metrics(app.config)
+    app.extensions['request_metrics'] = request_metrics
+    if request_metrics:
+        request_metrics.install(app, db.engine)
+    availability_index = AvailabilityIndex()
+    app.extensions['availability_index'] = availability_index
+    search_cache = create_search_cache(app.config)
+    app.extensions['search_cache'] = search_cache
+    if request_metrics and search_cache:
+        request_metrics.add_value('search_cache_hits_total', 'Availability searches answered from the cache.',
+                                  lambda: search_cache.hits)
+        request_metrics.add_value('search_cache_misses_total', 'Availability searches not found in the cache.',
+                                  lambda: search_cache.misses)
+        request_metrics.add_value('search_cache_invalidations_total', 'Writes that invalidated cached searches.',
+                                  lambda: search_cache.invalidations)
+        request_metrics.add_value('search_cache_entries', 'Searches currently cached.',
+                                  lambda: len(search_cache.backend), kind='gauge')
+    outbox = create_outbox(app)
+    app.extensions['outbox'] = outbox
+    if app.config.get('OUTBOX_AUTOSTART'):
+        outbox.start()
+    event_hub = EventHub(app.config.get('EVENT_HISTORY_SIZE', 256))
+    app.extensions['event_hub'] = event_hub
+    call_sessions = create_call_session_store(app.config)
+    app.extensions['call_sessions'] = call_sessions
+    history_limit = app.config.get('CALL_HISTORY_LIMIT', 20)
+    transcripts = create_transcript_writer(app)
+    app.extensions['transcripts'] = transcripts
+    if app.config.get('TRANSCRIPT_AUTOSTART'):
+        transcripts.start()
+        # Write out buffered turns when the process exits
+        atexit.register(transcripts.close)
+
     @app.route('/')
     def serve_index():
         return render_template('index.html')
@@ -21,6 +82,17 @@ def init_routes(app):
     def serve_static_files(path):
         return send_from_directory(app.static_folder, path)
 
+    if request_metrics:
+        @app.route('/metrics', methods=['GET'])
+        def export_metrics():
+            return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    @app.errorhandler(HashingOverloaded)
+    def hashing_overloaded(error):
+        response = jsonify({'message': 'Server is busy, please retry shortly'})
+        response.headers['Retry-After'] = str(error.retry_after)
+        return response, 503
+
     @app.route('/api/users/register', methods=['POST'])
     def register_user():
         data = request.get_json()
@@ -35,7 +107,7 @@ def init_routes(app):
         if User.query.filter_by(email=email).first():
             return jsonify({'message': 'Email already exists'}), 409
 
-        hashed_password = generate_password_hash(password)
+        hashed_password = password_hasher.hash(password)
         new_user = User(
             email=email,
             password_hash=hashed_password,
@@ -57,9 +129,17 @@ def init_routes(app):
             return jsonify({'message': 'Missing email or password'}), 400
 
         user = User.query.filter_by(email=email).first()
-        if not user or not check_password_hash(user.password_hash, password):
+        if not user or not password_hasher.verify(user.password_hash, password):
             return jsonify({'message': 'Invalid email or password'}), 401
 
+        # Upgrade hashes made with older parameters while the password is at hand
+        if password_hasher.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = password_hasher.hash(password)
+                db.session.commit()
+            except HashingOverloaded:
+                db.session.rollback()
+
         access_token = create_access_token(identity=user.id)
         return jsonify({
             'access_token': access_token,
@@ -73,7 +153,7 @@ def init_routes(app):
         user_id = get_jwt_identity()
         data = request.get_json()
         
-        if ServiceProvider.query.filter_by(user_id=user_id).first():
+        if identities.provider(user_id):
             return jsonify({'message': 'User is already registered as a service provider'}), 409
 
         new_provider = ServiceProvider(
@@ -83,12 +163,36 @@ def init_routes(app):
         )
         db.session.add(new_provider)
         db.session.commit()
+        identities.invalidate(user_id)
 
         return jsonify({
             'message': 'Service provider registered successfully',
             'provider_id': new_provider.id
         }), 201
 
+    @app.route('/api/providers/ranked', methods=['GET'])
+    def ranked_providers():
+        service_type = request.args.get('service_type')
+
+        limit = request.args.get('limit', '20')
+        if not limit.isdigit() or int(limit) < 1:
+            return jsonify({'message': 'limit must be a positive integer'}), 400
+        limit = min(int(limit), MAX_PAGE_SIZE)
+
+        min_ratings = request.args.get('min_ratings', '1')
+        if not min_ratings.isdigit():
+            return jsonify({'message': 'min_ratings must be a non-negative integer'}), 400
+
+        rows = db.session.execute(ranked_providers_query(service_type, int(min_ratings), limit)).all()
+        return jsonify({'providers': [{
+            'provider_id': row.provider_id,
+            'provider_name': row.provider_name,
+            'service_type': row.service_type,
+            'average_rating': round(row.rating_avg, 2),
+            'rating_count': row.rating_count,
+            'histogram': {str(star): getattr(row, f'stars_{star}') for star in STARS}
+        } for row in rows]}), 200
+
     @app.route('/api/providers/availability', methods=['POST', 'GET'])
     @jwt_required()
     def manage_availability():
@@ -98,7 +202,7 @@ def init_routes(app):
 
     def add_availability_slot():
         user_id = get_jwt_identity()
-        provider = ServiceProvider.query.filter_by(user_id=user_id).first()
+        provider = identities.provider(user_id)
         if not provider:
             return jsonify({'message': 'User is not a service provider'}), 403
 
@@ -109,42 +213,96 @@ def init_routes(app):
         if start_time >= end_time:
             return jsonify({'message': 'Start time must be before end time'}), 400
 
-        # Check for overlapping slots
-        overlapping = Availability.query.filter(
-            Availability.provider_id == provider.id,
-            Availability.start_time < end_time,
-            Availability.end_time > start_time
-        ).first()
-
-        if overlapping:
-            return jsonify({'message': 'Time slot overlaps with existing availability'}), 409
+        with availability_index.provider_lock(provider.provider_id):
+            # Check for overlapping slots
+            if availability_index.find_overlap(provider.provider_id, start_time, end_time) is not None:
+                return jsonify({'message': 'Time slot overlaps with existing availability'}), 409
 
-        new_slot = Availability(
-            provider_id=provider.id,
-            start_time=start_time,
-            end_time=end_time
-        )
-        db.session.add(new_slot)
-        db.session.commit()
+            new_slot = Availability(
+                provider_id=provider.provider_id,
+                start_time=start_time,
+                end_time=end_time
+            )
+            db.session.add(new_slot)
+            db.session.commit()
+            availability_index.add(provider.provider_id, new_slot.id, start_time, end_time)
+        if search_cache:
+            search_cache.invalidate(provider_id=provider.provider_id, service_type=provider.service_type)
 
         return jsonify({
             'message': 'Availability slot added successfully',
             'slot_id': new_slot.id
         }), 201
 
+    @app.route('/api/providers/availability/bulk', methods=['POST'])
+    @jwt_required()
+    def add_availability_slots_bulk():
+        user_id = get_jwt_identity()
+        provider = identities.provider(user_id)
+        if not provider:
+            return jsonify({'message': 'User is not a service provider'}), 403
+
+        data = request.get_json()
+        atomic = bool(data.get('atomic', False))
+        try:
+            if data.get('recurrence'):
+                candidates = expand_recurrence(data['recurrence'])
+            elif data.get('slots'):
+                if len(data['slots']) > MAX_BULK_SLOTS:
+                    return jsonify({'message': f'At most {MAX_BULK_SLOTS} slots per request'}), 400
+                candidates = sorted(
+                    (datetime.fromisoformat(slot['start_time']), datetime.fromisoformat(slot['end_time']))
+                    for slot in data['slots']
+                )
+            else:
+                return jsonify({'message': 'Provide either recurrence or slots'}), 400
+        except (KeyError, TypeError, ValueError) as exc:
+            return jsonify({'message': f'Invalid request: {exc}'}), 400
+
+        with availability_index.provider_lock(provider.provider_id):
+            accepted, conflicts = find_conflicts(
+                candidates,
+                lambda start, end: availability_index.find_overlap(provider.provider_id, start, end)
+            )
+            if not accepted or (atomic and conflicts):
+                return jsonify({
+                    'message': 'No availability slots added',
+                    'created': 0,
+                    'slot_ids': [],
+                    'conflicts': conflicts
+                }), 409 if conflicts else 400
+
+            slot_ids = db.session.scalars(
+                insert(Availability).returning(Availability.id, sort_by_parameter_order=True),
+                [{'provider_id': provider.provider_id, 'start_time': start, 'end_time': end} for start, end in accepted]
+            ).all()
+            db.session.commit()
+            for slot_id, (start, end) in zip(slot_ids, accepted):
+                availability_index.add(provider.provider_id, slot_id, start, end)
+        if search_cache:
+            search_cache.invalidate(provider_id=provider.provider_id, service_type=provider.service_type)
+
+        return jsonify({
+            'message': 'Availability slots added successfully',
+            'created': len(slot_ids),
+            'slot_ids': slot_ids,
+            'conflicts': conflicts
+        }), 201
+
     def get_availability_slots():
         user_id = get_jwt_identity()
-        provider = ServiceProvider.query.filter_by(user_id=user_id).first()
+        provider = identities.provider(user_id)
         if not provider:
             return jsonify({'message': 'User is not a service provider'}), 403
 
-        slots = Availability.query.filter_by(provider_id=provider.id).all()
+        # Archived past slots are included
+        slots = db.session.execute(slot_history_query(provider.provider_id)).all()
         return jsonify({
             'slots': [{
                 'id': slot.id,
                 'start_time': slot.start_time.isoformat(),
                 'end_time': slot.end_time.isoformat(),
-                'is_booked': slot.is_booked
+                'is_booked': bool(slot.is_booked)
             } for slot in slots]
         }), 200
 
@@ -156,13 +314,24 @@ def init_routes(app):
         end_date = request.args.get('end_date')
         preferred_time = request.args.get('preferred_time')  # 'morning', 'afternoon', 'evening'
 
-        query = Availability.query.filter_by(is_booked=False)
+        # One joined projection instead of lazy-loading provider and user per slot
+        query = db.session.query(
+            Availability.id,
+            Availability.provider_id,
+            User.full_name,
+            ServiceProvider.service_type,
+            Availability.start_time,
+            Availability.end_time
+        ).join(
+            ServiceProvider, Availability.provider_id == ServiceProvider.id
+        ).join(
+            User, ServiceProvider.user_id == User.id
+        ).filter(Availability.is_booked == False)
 
         if provider_id:
-            query = query.filter_by(provider_id=provider_id)
+            query = query.filter(Availability.provider_id == provider_id)
         elif service_type:
-            provider_ids = [p.id for p in ServiceProvider.query.filter_by(service_type=service_type)]
-            query = query.filter(Availability.provider_id.in_(provider_ids))
+            query = query.filter(ServiceProvider.service_type == service_type)
 
         if start_date:
             start_dt = datetime.fromisoformat(start_date)
@@ -170,32 +339,104 @@ def init_routes(app):
         if end_date:
             end_dt = datetime.fromisoformat(end_date)
             query = query.filter(Availability.end_time <= end_dt)
+        if preferred_time in DAY_PARTS:
+            query = query.filter(Availability.day_part == preferred_time)
+
+        cursor = request.args.get('cursor')
+        if cursor:
+            try:
+                query = query.filter(after_cursor(Availability.start_time, Availability.id, cursor))
+            except ValueError:
+                return jsonify({'message': 'Invalid cursor'}), 400
+
+        limit = request.args.get('limit')
+        if limit is not None:
+            if not limit.isdigit() or int(limit) < 1:
+                return jsonify({'message': 'limit must be a positive integer'}), 400
+            limit = min(int(limit), MAX_PAGE_SIZE)
+
+        query = query.order_by(Availability.start_time, Availability.id)
+
+        def slot_json(row):
+            slot_id, slot_provider_id, provider_name, slot_service_type, start_time, end_time = row
+            return {
+                'id': slot_id,
+                'provider_id': slot_provider_id,
+                'provider_name': provider_name,
+                'service_type': slot_service_type,
+                'start_time': start_time.isoformat(),
+                'end_time': end_time.isoformat()
+            }
 
-        slots = query.all()
-
-        if preferred_time:
-            def is_preferred_time(slot):
-                hour = slot.start_time.hour
-                if preferred_time == 'morning':
-                    return 6 <= hour < 12
-                elif preferred_time == 'afternoon':
-                    return 12 <= hour < 17
-                elif preferred_time == 'evening':
-                    return 17 <= hour < 22
-                return True
+        streaming = request.args.get('format') == 'ndjson'
+        cache_scope = SearchCache.scope_for(provider_id, service_type)
+        cache_params = {
+            'provider_id': provider_id,
+            'service_type': None if provider_id else service_type,
+            'start_date': start_date,
+            'end_date': end_date,
+            'preferred_time': preferred_time if preferred_time in DAY_PARTS else None,
+            'cursor': cursor,
+            'limit': limit
+        }
+        # Keyed before the query: a write invalidating the scope meanwhile
+        # leaves the result under the old generation rather than the new one
+        cache_key = search_cache.key(cache_scope, cache_params) if search_cache and not streaming else None
+        if cache_key:
+            cached = search_cache.get(cache_scope, cache_params, key=cache_key)
+            if cached is not None:
+                return jsonify(cached), 200
+
+        if streaming:
+            if limit is not None:
+                query = query.limit(limit)
+
+            def generate():
+                for row in query.yield_per(STREAM_BATCH_SIZE):
+                    yield json.dumps(slot_json(row)) + '\n'
+
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        if limit is None:
+            payload = {'available_slots': [slot_json(row) for row in query.all()]}
+        else:
+            rows = query.limit(limit + 1).all()
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                next_cursor = encode_cursor(rows[-1].start_time, rows[-1].id)
+            payload = {
+                'available_slots': [slot_json(row) for row in rows],
+                'next_cursor': next_cursor
+            }
 
-            slots = [slot for slot in slots if is_preferred_time(slot)]
+        if cache_key:
+            search_cache.set(cache_scope, cache_params, payload, key=cache_key)
+        return jsonify(payload), 200
 
-        return jsonify({
-            'available_slots': [{
-                'id': slot.id,
-                'provider_id': slot.provider_id,
-                'provider_name': slot.provider.user.full_name,
-                'service_type': slot.provider.service_type,
-                'start_time': slot.start_time.isoformat(),
-                'end_time': slot.end_time.isoformat()
-            } for slot in slots]
-        }), 200
+    @app.route('/api/availability/next', methods=['GET'])
+    def next_available_slots():
+        service_type = request.args.get('service_type')
+        after = request.args.get('after')
+        try:
+            after = datetime.fromisoformat(after) if after else datetime.utcnow()
+        except ValueError:
+            return jsonify({'message': 'after must be an ISO 8601 date or datetime'}), 400
+
+        limit = request.args.get('limit', '3')
+        if not limit.isdigit() or int(limit) < 1:
+            return jsonify({'message': 'limit must be a positive integer'}), 400
+        limit = min(int(limit), MAX_PAGE_SIZE)
+
+        return jsonify({'available_slots': [{
+            'id': slot_id,
+            'provider_id': slot_provider_id,
+            'provider_name': provider_name,
+            'service_type': slot_service_type,
+            'start_time': start_time.isoformat(),
+            'end_time': end_time.isoformat()
+        } for slot_id, slot_provider_id, provider_name, slot_service_type, start_time, end_time
+            in next_free_slots(after, limit, service_type)]}), 200
 
     @app.route('/api/appointments/book', methods=['POST'])
     @jwt_required()
@@ -208,10 +449,19 @@ def init_routes(app):
         if not slot_id:
             return jsonify({'message': 'Missing slot_id'}), 400
 
-        slot = Availability.query.get(slot_id)
-        if not slot:
-            return jsonify({'message': 'Invalid slot_id'}), 404
-        if slot.is_booked:
+        # Claim the slot atomically so concurrent bookings cannot both pass a
+        # read-then-write check; exactly one UPDATE matches is_booked = false.
+        slot = db.session.execute(
+            update(Availability)
+            .where(Availability.id == slot_id, Availability.is_booked == False)
+            .values(is_booked=True, updated_at=datetime.utcnow())
+            .returning(Availability.id, Availability.provider_id, Availability.start_time, Availability.end_time)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if slot is None:
+            db.session.rollback()
+            if db.session.get(Availability, slot_id) is None:
+                return jsonify({'message': 'Invalid slot_id'}), 404
             return jsonify({'message': 'Slot is already booked'}), 409
 
         appointment = Appointment(
@@ -222,26 +472,73 @@ def init_routes(app):
             end_time=slot.end_time,
             urgency_level=urgency_level
         )
-
-        slot.is_booked = True
         db.session.add(appointment)
-        db.session.commit()
 
-        # Send confirmation emails
-        user = User.query.get(user_id)
-        provider = slot.provider.user
+        # Queue confirmation emails in the booking transaction
+        provider = identities.by_provider_id(slot.provider_id)
+        user = identities.user(user_id)
         
         user_msg = f"Your appointment has been confirmed for {slot.start_time}"
         provider_msg = f"New appointment scheduled for {slot.start_time}"
         
-        send_email(user.email, "Appointment Confirmation", user_msg)
-        send_email(provider.email, "New Appointment", provider_msg)
+        enqueue_email(user.email, "Appointment Confirmation", user_msg)
+        enqueue_email(provider.email, "New Appointment", provider_msg)
+
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({'message': 'Slot is already booked'}), 409
+        outbox.wake()
+
+        availability_index.mark_booked(slot.provider_id, slot.id)
+        if search_cache:
+            search_cache.invalidate(provider_id=slot.provider_id, service_type=provider.service_type)
 
         return jsonify({
             'message': 'Appointment booked successfully',
             'appointment_id': appointment.id
         }), 201
 
+    @app.route('/api/appointments', methods=['GET'])
+    @jwt_required()
+    def get_appointments():
+        user_id = get_jwt_identity()
+
+        limit = request.args.get('limit')
+        if limit is not None:
+            if not limit.isdigit() or int(limit) < 1:
+                return jsonify({'message': 'limit must be a positive integer'}), 400
+            limit = min(int(limit), MAX_PAGE_SIZE)
+
+        # Live and archived appointments, newest first; one extra row tells
+        # whether another page exists
+        try:
+            statement = appointment_history_query(user_id, limit=limit + 1 if limit else None,
+                                                  cursor=request.args.get('cursor'))
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor'}), 400
+        rows = db.session.execute(statement).all()
+
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].start_time, rows[-1].id)
+
+        return jsonify({
+            'appointments': [{
+                'id': row.id,
+                'provider_id': row.provider_id,
+                'provider_name': row.provider_name,
+                'service_type': row.service_type,
+                'start_time': row.start_time.isoformat(),
+                'end_time': row.end_time.isoformat(),
+                'status': row.status,
+                'urgency_level': row.urgency_level
+            } for row in rows],
+            'next_cursor': next_cursor
+        }), 200
+
     @app.route('/api/appointments/call', methods=['POST'])
     @jwt_required()
     def schedule_call_appointment():
@@ -268,27 +565,32 @@ def init_routes(app):
             status='pending'
         )
         db.session.add(call_request)
-        db.session.commit()
-
-        # Notify available agents
-        available_agents = ServiceProvider.query.filter_by(service_type=service_type).all()
-        for agent in available_agents:
-            message = Message(
-                sender_id=user_id,
-                receiver_id=agent.user_id,
-                content=f"New call request from {call_request.user.full_name} for {service_type} service",
-                call_request_id=call_request.id
-            )
-            db.session.add(message)
-
-        db.session.commit()
+        db.session.flush()
+
+        # Notify available agents: one broadcast on the service_type topic,
+        # picked up by each agent's inbox at read time
+        publish_broadcast(
+            service_type,
+            f"New call request from {call_request.user.full_name} for {service_type} service",
+            'call_request',
+            sender_user_id=user_id,
+            call_request_id=call_request.id
+        )
 
-        # Send confirmation email to user
-        send_email(
-            to=call_request.user.email,
-            subject="Call Request Received",
-            body=f"Your call request has been received. An agent will contact you at {preferred_time} on {preferred_date}."
+        # Queue confirmation email to user
+        enqueue_email(
+            call_request.user.email,
+            "Call Request Received",
+            f"Your call request has been received. An agent will contact you at {preferred_time} on {preferred_date}."
         )
+        db.session.commit()
+        outbox.wake()
+        event_hub.publish(topic_channel(service_type), 'call_request', {
+            'call_request_id': call_request.id,
+            'service_type': service_type,
+            'preferred_time': preferred_time,
+            'preferred_date': preferred_date
+        })
 
         return jsonify({
             'message': 'Call request scheduled successfully',
@@ -299,7 +601,7 @@ def init_routes(app):
     @jwt_required()
     def accept_call_request(call_id):
         agent_id = get_jwt_identity()
-        agent = ServiceProvider.query.filter_by(user_id=agent_id).first()
+        agent = identities.provider(agent_id)
         
         if not agent:
             return jsonify({'message': 'User is not a service provider'}), 403
@@ -311,24 +613,32 @@ def init_routes(app):
 
         call_request.status = 'accepted'
         call_request.agent_id = agent_id
-        db.session.commit()
 
         # Notify user
-        message = Message(
-            sender_id=agent_id,
-            receiver_id=call_request.user_id,
-            content=f"Your call request has been accepted by {agent.user.full_name}. They will call you at the scheduled time.",
+        create_message(
+            call_request.user_id,
+            f"Your call request has been accepted by {agent.full_name}. They will call you at the scheduled time.",
+            'call_accepted',
+            sender_user_id=agent_id,
             call_request_id=call_id
         )
-        db.session.add(message)
-        db.session.commit()
 
-        # Send email notification
-        send_email(
-            to=call_request.user.email,
-            subject="Call Request Accepted",
-            body=f"Your call request has been accepted by {agent.user.full_name}. They will call you at the scheduled time."
+        # Queue email notification
+        enqueue_email(
+            call_request.user.email,
+            "Call Request Accepted",
+            f"Your call request has been accepted by {agent.full_name}. They will call you at the scheduled time."
         )
+        db.session.commit()
+        outbox.wake()
+        event_hub.publish(user_channel(call_request.user_id), 'call_request_accepted', {
+            'call_request_id': call_id,
+            'agent_name': agent.full_name
+        })
+        event_hub.publish(topic_channel(call_request.service_type), 'call_request_updated', {
+            'call_request_id': call_id,
+            'status': 'accepted'
+        })
 
         return jsonify({'message': 'Call request accepted successfully'}), 200
 
@@ -343,17 +653,19 @@ def init_routes(app):
 
         call_request.status = 'completed'
         call_request.completed_at = datetime.now(timezone.utc)
-        db.session.commit()
 
         # Notify user
-        message = Message(
-            sender_id=agent_id,
-            receiver_id=call_request.user_id,
-            content="Your call has been completed. Please provide feedback on your experience.",
+        create_message(
+            call_request.user_id,
+            "Your call has been completed. Please provide feedback on your experience.",
+            'call_completed',
+            sender_user_id=agent_id,
             call_request_id=call_id
         )
-        db.session.add(message)
         db.session.commit()
+        event_hub.publish(user_channel(call_request.user_id), 'call_request_completed', {
+            'call_request_id': call_id
+        })
 
         return jsonify({'message': 'Call marked as completed'}), 200
 
@@ -361,22 +673,147 @@ def init_routes(app):
     @jwt_required()
     def get_messages():
         user_id = get_jwt_identity()
-        messages = Message.query.filter(
-            (Message.sender_id == user_id) | (Message.receiver_id == user_id)
-        ).order_by(Message.created_at.desc()).all()
+
+        limit = request.args.get('limit')
+        if limit is not None:
+            if not limit.isdigit() or int(limit) < 1:
+                return jsonify({'message': 'limit must be a positive integer'}), 400
+            limit = min(int(limit), MAX_PAGE_SIZE)
+
+        # Fetch one extra row to know whether another page exists
+        try:
+            statement = inbox_query(user_id, limit=limit + 1 if limit else None, cursor=request.args.get('cursor'))
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor'}), 400
+        rows = db.session.execute(statement).all()
+
+        next_cursor = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1].created_at, rows[-1].sort_id)
+
+        messages = []
+        for row in rows:
+            item = {
+                'id': row.id,
+                'kind': row.kind,
+                'sender_id': row.sender_id,
+                'sender_name': row.sender_name,
+                'receiver_id': row.receiver_id,
+                'receiver_name': row.receiver_name,
+                'content': row.content,
+                'created_at': row.created_at.isoformat(),
+                'is_read': bool(row.is_read),
+                'call_request_id': row.call_request_id
+            }
+            if row.topic:
+                item['topic'] = row.topic
+            messages.append(item)
+
+        return jsonify({'messages': messages, 'next_cursor': next_cursor}), 200
+
+    @app.route('/api/messages/unread_count', methods=['GET'])
+    @jwt_required()
+    def get_unread_count():
+        return jsonify({'unread_count': unread_count(get_jwt_identity())}), 200
+
+    @app.route('/api/messages/<int:message_id>/read', methods=['PUT'])
+    @jwt_required()
+    def mark_message_as_read(message_id):
+        user_id = get_jwt_identity()
+        if not mark_message_read(user_id, message_id):
+            return jsonify({'message': 'Message not found'}), 404
+        return jsonify({'message': 'Message marked as read'}), 200
+
+    @app.route('/api/broadcasts/<int:broadcast_id>/read', methods=['PUT'])
+    @jwt_required()
+    def mark_broadcast_read(broadcast_id):
+        user_id = get_jwt_identity()
+        # Only broadcasts in the caller's inbox may move its read marker
+        visible = visible_broadcasts(user_id).filter(Broadcast.id == broadcast_id).first()
+        if not visible:
+            return jsonify({'message': 'Broadcast not found'}), 404
+        broadcast, _ = visible
+
+        last_read_id = mark_broadcasts_read(user_id, broadcast.topic, broadcast.id)
+        return jsonify({'topic': broadcast.topic, 'last_read_id': last_read_id}), 200
+
+    def event_subscription(user_id, last_event_id):
+        # Channels are fixed for the lifetime of the connection; a provider
+        # changing service_type picks up the new topic on reconnect
+        channels = [user_channel(user_id)]
+        provider = identities.provider(user_id)
+        if provider:
+            channels.append(topic_channel(provider.service_type))
+        db.session.remove()
+        return event_hub.subscribe(channels, last_event_id=last_event_id)
+
+    def requested_last_event_id():
+        value = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        if value is None:
+            return None
+        if not value.isdigit():
+            raise ValueError(value)
+        return int(value)
+
+    def event_json(event):
+        return {'id': event.id, 'type': event.type, 'data': event.data}
+
+    @app.route('/api/events', methods=['GET'])
+    @jwt_required(locations=['headers', 'query_string'])
+    def stream_events():
+        try:
+            last_event_id = requested_last_event_id()
+        except ValueError:
+            return jsonify({'message': 'Invalid last event id'}), 400
+
+        subscription = event_subscription(get_jwt_identity(), last_event_id)
+        heartbeat = app.config.get('EVENT_HEARTBEAT_SECONDS', 15)
+
+        def generate():
+            try:
+                yield f"retry: {app.config.get('EVENT_RETRY_MILLISECONDS', 3000)}\n\n"
+                if subscription.resync:
+                    yield "event: resync\ndata: {}\n\n"
+                while True:
+                    events = subscription.wait(heartbeat)
+                    if not events:
+                        # Comment line keeps proxies from closing an idle stream
+                        yield ": keep-alive\n\n"
+                    for event in events:
+                        yield f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data)}\n\n"
+            finally:
+                subscription.close()
+
+        return Response(generate(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+
+    @app.route('/api/events/poll', methods=['GET'])
+    @jwt_required(locations=['headers', 'query_string'])
+    def poll_events():
+        try:
+            last_event_id = requested_last_event_id()
+        except ValueError:
+            return jsonify({'message': 'Invalid last event id'}), 400
+
+        timeout = request.args.get('timeout', '25')
+        try:
+            timeout = min(max(float(timeout), 0.0), 60.0)
+        except ValueError:
+            return jsonify({'message': 'timeout must be a number'}), 400
+
+        subscription = event_subscription(get_jwt_identity(), last_event_id)
+        try:
+            events = subscription.wait(timeout)
+        finally:
+            subscription.close()
 
         return jsonify({
-            'messages': [{
-                'id': msg.id,
-                'sender_id': msg.sender_id,
-                'sender_name': msg.sender.full_name,
-                'receiver_id': msg.receiver_id,
-                'receiver_name': msg.receiver.full_name,
-                'content': msg.content,
-                'created_at': msg.created_at.isoformat(),
-                'is_read': msg.is_read,
-                'call_request_id': msg.call_request_id
-            } for msg in messages]
+            'events': [event_json(event) for event in events],
+            'last_event_id': events[-1].id if events else last_event_id,
+            'resync': subscription.resync
         }), 200
 
     @app.route('/api/messages', methods=['POST'])
@@ -392,22 +829,32 @@ def init_routes(app):
         if not all([receiver_id, content]):
             return jsonify({'message': 'Missing required fields'}), 400
 
-        message = Message(
-            sender_id=user_id,
-            receiver_id=receiver_id,
-            content=content,
+        receiver = db.session.get(User, receiver_id)
+        if not receiver:
+            return jsonify({'message': 'Receiver not found'}), 404
+
+        message = create_message(
+            receiver_id,
+            content,
+            'direct',
+            sender_user_id=user_id,
             call_request_id=call_request_id
         )
-        db.session.add(message)
-        db.session.commit()
 
-        # Send email notification
-        receiver = User.query.get(receiver_id)
-        send_email(
-            to=receiver.email,
-            subject="New Message",
-            body=f"You have received a new message: {content}"
+        # Queue email notification
+        enqueue_email(
+            receiver.email,
+            "New Message",
+            f"You have received a new message: {content}"
         )
+        db.session.commit()
+        outbox.wake()
+        event_hub.publish(user_channel(receiver_id), 'message', {
+            'message_id': message.id,
+            'sender_id': user_id,
+            'content': content,
+            'call_request_id': call_request_id
+        })
 
         return jsonify({
             'message': 'Message sent successfully',
@@ -420,6 +867,10 @@ def init_routes(app):
         user_id = get_jwt_identity()
         data = request.get_json()
         
+        # Feedback may come without a rating, but a rating must be 1-5 stars
+        if data.get('rating') is not None and not valid_rating(data['rating']):
+            return jsonify({'message': 'Rating must be a whole number from 1 to 5'}), 400
+        
         feedback = Feedback(
             user_id=user_id,
             appointment_id=data.get('appointment_id'),
@@ -429,6 +880,7 @@ def init_routes(app):
         )
         
         db.session.add(feedback)
+        record_rating(feedback.appointment_id, feedback.rating)
         db.session.commit()
         
         return jsonify({
@@ -446,21 +898,13 @@ def init_routes(app):
             return jsonify({'message': 'Phone number and department are required'}), 400
         
         call_id = str(uuid.uuid4())
-        active_calls[call_id] = {
-            'phone_number': phone_number,
-            'department': department,
-            'history': [],
-            'voice_enabled': True,
-            'start_time': datetime.utcnow()
-        }
+        session = new_session(phone_number, department)
         
         greeting = f"Hello! I'm your AI assistant for the {department} department. I can help you schedule or reschedule appointments, answer questions, or assist with any other inquiries. How may I help you today?"
         
-        active_calls[call_id]['history'].append({
-            'role': 'assistant',
-            'content': greeting,
-            'timestamp': datetime.utcnow()
-        })
+        append_turn(session, 'assistant', greeting, history_limit)
+        record_turn(call_id, session)
+        call_sessions.save(call_id, session)
         
         return jsonify({
             'call_id': call_id,
@@ -469,7 +913,8 @@ def init_routes(app):
 
     @app.route('/api/call/<call_id>/interact', methods=['POST'])
     def interact_with_ai(call_id):
-        if call_id not in active_calls:
+        session = call_sessions.get(call_id)
+        if session is None:
             return jsonify({'message': 'Call session not found'}), 404
         
         data = request.get_json()
@@ -479,77 +924,121 @@ def init_routes(app):
             return jsonify({'message': 'Message is required'}), 400
         
         # Add user message to history
-        active_calls[call_id]['history'].append({
-            'role': 'user',
-            'content': user_message,
-            'timestamp': datetime.utcnow()
-        })
+        append_turn(session, 'user', user_message, history_limit)
+        record_turn(call_id, session)
         
         # Process the message
-        response = process_user_message(user_message, active_calls[call_id]['department'])
+        response = process_user_message(user_message, session['department'])
         
         # Add AI response to history
-        active_calls[call_id]['history'].append({
-            'role': 'assistant',
-            'content': response['message'],
-            'timestamp': datetime.utcnow()
-        })
+        append_turn(session, 'assistant', response['message'], history_limit)
+        record_turn(call_id, session)
         
         # Check for long silence
-        if len(active_calls[call_id]['history']) > 2:
-            last_user_message = next((msg for msg in reversed(active_calls[call_id]['history']) 
+        if len(session['history']) > 2:
+            last_user_message = next((msg for msg in reversed(session['history']) 
                                     if msg['role'] == 'user'), None)
             if last_user_message:
-                time_since_last_message = datetime.utcnow() - last_user_message['timestamp']
+                time_since_last_message = datetime.utcnow() - datetime.fromisoformat(last_user_message['timestamp'])
                 if time_since_last_message.total_seconds() > 30:  # 30 seconds of silence
                     response['message'] += "\nI notice you've been quiet for a while. Are you still there? I'm here to help you schedule an appointment or answer any questions you might have."
         
+        # Saving also refreshes the session's idle timeout
+        call_sessions.save(call_id, session)
+        
         return jsonify(response)
 
     @app.route('/api/call/<call_id>/end', methods=['POST'])
     def end_ai_call(call_id):
-        if call_id not in active_calls:
+        session = call_sessions.get(call_id)
+        if session is None:
             return jsonify({'message': 'Call session not found'}), 404
         
-        # Store call history in database
-        call_history = active_calls[call_id]
-        call_history['end_time'] = datetime.utcnow()
-        call_history['status'] = 'completed'
+        session['end_time'] = datetime.utcnow().isoformat()
+        session['status'] = 'completed'
         
-        # TODO: Store call history in database
+        # Store call history in database; turns were buffered as the call went on.
+        # A failed flush keeps the turns buffered, so the call can still end.
+        try:
+            transcripts.flush()
+        except Exception:
+            app.logger.exception("Failed to flush call transcripts")
         
         # Remove from active calls
-        del active_calls[call_id]
+        call_sessions.delete(call_id)
         
         return jsonify({'message': 'Call ended successfully'})
 
+    @app.route('/api/call/transcripts', methods=['GET'])
+    @jwt_required()
+    def export_call_transcripts():
+        # Calls are anonymous, so only agents may read them, and only the
+        # calls to their own department
+        provider = identities.provider(get_jwt_identity())
+        if not provider:
+            return jsonify({'message': 'User is not a service provider'}), 403
+
+        call_id = request.args.get('call_id')
+        after_id = request.args.get('after_id')
+        if after_id is not None:
+            if not after_id.isdigit():
+                return jsonify({'message': 'after_id must be a non-negative integer'}), 400
+            after_id = int(after_id)
+
+        # Include turns of calls still in progress
+        transcripts.flush()
+
+        def generate():
+            for turn in iter_transcripts(call_id, after_id, STREAM_BATCH_SIZE, department=provider.service_type):
+                yield json.dumps({
+                    'id': turn.id,
+                    'call_id': turn.call_id,
+                    'seq': turn.seq,
+                    'role': turn.role,
+                    'content': turn.content,
+                    'department': turn.department,
+                    'created_at': turn.created_at.isoformat()
+                }) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    def record_turn(call_id, session):
+        turn = session['history'][-1]
+        transcripts.append(
+            call_id,
+            session['turns'],
+            turn['role'],
+            turn['content'],
+            department=session['department'],
+            created_at=datetime.fromisoformat(turn['timestamp'])
+        )
+
     def process_user_message(message, department):
         message = message.lower()
+        intent = match_intent(message)
         
         # Appointment scheduling
-        if any(word in message for word in ['schedule', 'book', 'appointment', 'make an appointment']):
-            # Extract date and time using regex
-            date_match = re.search(r'(\d{1,2}(?:st|nd|rd|th)?\s+(?:january|february|march|april|may|june|july|august|september|october|november|december))', message)
-            time_match = re.search(r'(\d{1,2}(?::\d{2})?\s*(?:am|pm))', message)
+        if intent == 'schedule':
+            # Extract date and time, resolving relative days against today
+            parsed = parse_datetime(message, datetime.utcnow())
+            window = requested_window(parsed)
             
-            if date_match and time_match:
-                date = date_match.group(1)
-                time = time_match.group(1)
-                
-                # Check if the requested time slot is available
-                requested_datetime = datetime.strptime(f"{date} {time}", "%d %B %I:%M %p")
+            if window:
+                requested_datetime, window_end = window
+                date = requested_datetime.strftime("%B %d")
+                time = requested_datetime.strftime("%I:%M %p") if parsed.time else parsed.day_part
+                when = f"{date} at {time}" if parsed.time else f"{date} in the {time}"
                 
+                # Departments that name a service type only offer its providers
+                service_type = department if department and has_providers(department) else None
+
                 # Check for availability
-                available_slots = Availability.query.filter(
-                    Availability.start_time >= requested_datetime,
-                    Availability.start_time < requested_datetime + timedelta(hours=1),
-                    Availability.is_booked == False
-                ).all()
+                available_slots = next_free_slots(requested_datetime, 1, service_type, before=window_end)
                 
                 if available_slots:
                     # Slot is available
                     return {
-                        'message': f"I've found an available slot for {date} at {time}. Would you like me to confirm this appointment for you?",
+                        'message': f"I've found an available slot for {when}. Would you like me to confirm this appointment for you?",
                         'appointment_scheduled': True,
                         'appointment_details': {
                             'date': date,
@@ -559,22 +1048,20 @@ def init_routes(app):
                     }
                 else:
                     # Find next available slots
-                    next_available = Availability.query.filter(
-                        Availability.start_time > requested_datetime,
-                        Availability.is_booked == False
-                    ).order_by(Availability.start_time).limit(3).all()
+                    next_available = next_free_slots(requested_datetime, 3, service_type)
                     
                     if next_available:
-                        alternative_times = [slot.start_time.strftime("%B %d at %I:%M %p") for slot in next_available]
+                        alternative_times = [start_time.strftime("%B %d at %I:%M %p")
+                                             for _, _, _, _, start_time, _ in next_available]
                         return {
-                            'message': f"I apologize, but {date} at {time} is not available. However, I can offer you these alternative times:\n" +
+                            'message': f"I apologize, but {when} is not available. However, I can offer you these alternative times:\n" +
                                      "\n".join([f"- {time}" for time in alternative_times]) +
                                      "\nWould you like to schedule for any of these times instead?",
                             'alternative_slots': alternative_times
                         }
                     else:
                         return {
-                            'message': f"I apologize, but I couldn't find any available slots near {date} at {time}. Would you like me to check availability for a different date or time?"
+                            'message': f"I apologize, but I couldn't find any available slots near {when}. Would you like me to check availability for a different date or time?"
                         }
             else:
                 return {
@@ -582,32 +1069,32 @@ def init_routes(app):
                 }
         
         # Confirm appointment
-        elif any(word in message for word in ['yes', 'confirm', 'sure', 'okay', 'fine']):
+        elif intent == 'confirm':
             return {
                 'message': "Great! I'll confirm your appointment. You'll receive a confirmation email shortly. Is there anything else you need help with?",
                 'appointment_confirmed': True
             }
         
         # Reschedule request
-        elif any(word in message for word in ['reschedule', 'change time', 'different time', 'another time']):
+        elif intent == 'reschedule':
             return {
                 'message': "I can help you reschedule your appointment. Could you please tell me your preferred new date and time? For example, you could say 'I'd like to reschedule for March 20th at 3 PM'."
             }
         
         # Hours inquiry
-        elif any(word in message for word in ['hours', 'open', 'close', 'when are you open']):
+        elif intent == 'hours':
             return {
                 'message': f"Our {department} department is open Monday through Friday from 9 AM to 5 PM, and Saturday from 9 AM to 1 PM. We're closed on Sundays and major holidays."
             }
         
         # Emergency handling
-        elif any(word in message for word in ['emergency', 'urgent', 'immediately', 'right now']):
+        elif intent == 'emergency':
             return {
                 'message': "I understand this is an emergency. For immediate medical attention, please call our emergency line at 911 or visit the nearest emergency room. Would you like me to connect you with our emergency services?"
             }
         
         # Help request
-        elif any(word in message for word in ['help', 'what can you do', 'how can you help']):
+        elif intent == 'help':
             return {
                 'message': f"I can help you with several things in the {department} department:\n"
                           f"1. Schedule appointments\n"
@@ -619,7 +1106,7 @@ def init_routes(app):
             }
         
         # End call
-        elif any(word in message for word in ['goodbye', 'bye', 'end call', 'hang up']):
+        elif intent == 'end_call':
             return {
                 'message': "Thank you for calling. Is there anything else you need help with before we end the call?"
             }
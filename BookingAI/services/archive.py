@@ -0,0 +1,169 @@
+import time
+from datetime import datetime
+
+from sqlalchemy import DateTime, delete, exists, func, insert, literal, select, union_all
+
+from .. import db
+from ..database.models import (
+    User, ServiceProvider, Availability, Appointment, Message, Feedback, ArchivedAvailability, ArchivedAppointment
+)
+from .pagination import before_cursor
+
+# A confirmed appointment that has ended took place
+COMPLETED_STATUSES = ('confirmed', 'completed')
+
+
+def archivable_appointments(cutoff, below_id):
+    """
+    Completed appointments that ended before `cutoff`. Appointments with
+    feedback or messages attached stay live so those foreign keys keep
+    pointing at a row.
+    """
+    return (
+        Appointment.end_time < cutoff,
+        Appointment.status.in_(COMPLETED_STATUSES),
+        ~exists().where(Feedback.appointment_id == Appointment.id),
+        ~exists().where(Message.related_appointment_id == Appointment.id),
+        Appointment.id < below_id
+    )
+
+
+def archivable_slots(cutoff, below_id):
+    """
+    Slots that ended before `cutoff` and no live appointment points at.
+    """
+    return (
+        Availability.end_time < cutoff,
+        ~exists().where(Appointment.availability_id == Availability.id),
+        Availability.id < below_id
+    )
+
+
+def _move_batch(model, archive, conditions, after_id, batch_size):
+    """
+    Copy up to `batch_size` rows with id > `after_id` into the archive table
+    and delete them, in one short transaction. Returns the last id looked
+    at (None when nothing is left) and the number of rows moved.
+    """
+    ids = db.session.scalars(
+        select(model.id)
+        .where(model.id > after_id, *conditions)
+        .order_by(model.id)
+        .limit(batch_size)
+    ).all()
+    if not ids:
+        db.session.rollback()
+        return None, 0
+
+    # Both statements re-check the conditions, so a row changed since the
+    # SELECT is left alone. SQLite takes its database-wide write lock at the
+    # INSERT, so the DELETE sees the rows the INSERT copied
+    live = model.__table__
+    columns = [column.name for column in live.columns]
+    moved = db.session.execute(insert(archive).from_select(
+        columns + ['archived_at'],
+        select(*live.columns, literal(datetime.utcnow(), DateTime)).where(live.c.id.in_(ids), *conditions)
+    )).rowcount
+    db.session.execute(
+        delete(model).where(model.id.in_(ids), *conditions).execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return ids[-1], moved
+
+
+def archive_history(cutoff, batch_size=1000, pause=0.0):
+    """
+    Move completed appointments and then slots that ended before `cutoff`
+    into the archive tables, `batch_size` rows per transaction.
+
+    Each batch holds the write lock only for one INSERT ... SELECT and one
+    DELETE, and `pause` seconds between batches give waiting writers their
+    turn. Ids are kept, so archived rows read the same through the history
+    queries. Safe to interrupt and rerun. Returns rows moved per table,
+    the number of batches and the longest batch in seconds.
+
+    Other processes' slot caches (availability index, search cache) may
+    list archived slots until they are invalidated or expire; booking one
+    answers 404.
+    """
+    # SQLite hands out max(id) + 1, so keeping the newest row of each table
+    # live stops a new row from reusing an archived id
+    newest = {
+        model: db.session.scalar(select(func.coalesce(func.max(model.id), 0)))
+        for model in (Appointment, Availability)
+    }
+    stats = {'appointments': 0, 'availabilities': 0, 'batches': 0, 'longest_batch': 0.0}
+    for model, archive, conditions in (
+        (Appointment, ArchivedAppointment, archivable_appointments(cutoff, newest[Appointment])),
+        (Availability, ArchivedAvailability, archivable_slots(cutoff, newest[Availability])),
+    ):
+        after_id = 0
+        while True:
+            started = time.perf_counter()
+            after_id, moved = _move_batch(model, archive, conditions, after_id, batch_size)
+            if after_id is None:
+                break
+            stats[model.__tablename__] += moved
+            stats['batches'] += 1
+            stats['longest_batch'] = max(stats['longest_batch'], time.perf_counter() - started)
+            if pause:
+                time.sleep(pause)
+    return stats
+
+
+def slot_history_query(provider_id):
+    """
+    All slots of a provider, live and archived, by start time.
+    """
+    live = select(
+        Availability.id, Availability.start_time, Availability.end_time, Availability.is_booked
+    ).where(Availability.provider_id == provider_id)
+    archived = select(
+        ArchivedAvailability.id, ArchivedAvailability.start_time, ArchivedAvailability.end_time,
+        ArchivedAvailability.is_booked
+    ).where(ArchivedAvailability.provider_id == provider_id)
+    history = union_all(live, archived).subquery()
+    return select(history).order_by(history.c.start_time, history.c.id)
+
+
+def _newest_first(statement, start_time, row_id, limit, cursor):
+    if cursor:
+        statement = statement.where(before_cursor(start_time, row_id, cursor))
+    statement = statement.order_by(start_time.desc(), row_id.desc())
+    if limit is not None:
+        statement = statement.limit(limit)
+    # Wrap so every branch keeps its own ORDER BY/LIMIT inside the UNION
+    return select(statement.subquery())
+
+
+def appointment_history_query(user_id, limit=None, cursor=None):
+    """
+    A page of the user's appointments, live and archived, newest first.
+
+    Each table is read through its (user_id, start_time) index with the
+    keyset condition and limit pushed down, so a page costs O(2 * limit)
+    index reads however much history has been archived. Malformed cursors
+    raise ValueError.
+    """
+    def branch(model):
+        statement = select(
+            model.id.label('id'),
+            model.provider_id.label('provider_id'),
+            User.full_name.label('provider_name'),
+            ServiceProvider.service_type.label('service_type'),
+            model.start_time.label('start_time'),
+            model.end_time.label('end_time'),
+            model.status.label('status'),
+            model.urgency_level.label('urgency_level')
+        ).join(
+            ServiceProvider, ServiceProvider.id == model.provider_id
+        ).join(
+            User, User.id == ServiceProvider.user_id
+        ).where(model.user_id == user_id)
+        return _newest_first(statement, model.start_time, model.id, limit, cursor)
+
+    history = union_all(branch(Appointment), branch(ArchivedAppointment)).subquery()
+    statement = select(history).order_by(history.c.start_time.desc(), history.c.id.desc())
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
@@ -0,0 +1,181 @@
+import bisect
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from .. import db
+from ..database.models import Availability
+
+
+def load_provider_slots(provider_id):
+    """
+    Fetch (id, start_time, end_time, is_booked) rows for one provider.
+    """
+    return db.session.query(
+        Availability.id,
+        Availability.start_time,
+        Availability.end_time,
+        Availability.is_booked
+    ).filter(Availability.provider_id == provider_id).all()
+
+
+class ProviderIntervals:
+    """
+    Availability intervals of a single provider kept sorted by start time.
+
+    Overlap checks bisect on the start times and then walk backwards only
+    while a slot could still reach the candidate, which is bounded by the
+    longest slot length seen. For the non-overlapping slots that
+    add_availability_slot produces this inspects one or two entries.
+    """
+
+    def __init__(self, rows=()):
+        self.starts = []
+        self.ends = []
+        self.ids = []
+        self.booked = {}
+        self.max_length = timedelta(0)
+
+        for slot_id, start, end, is_booked in sorted(rows, key=lambda row: (row[1], row[0])):
+            self.starts.append(start)
+            self.ends.append(end)
+            self.ids.append(slot_id)
+            self.booked[slot_id] = bool(is_booked)
+            self.max_length = max(self.max_length, end - start)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def find_overlap(self, start, end):
+        """
+        Return the id of a slot overlapping [start, end), or None.
+        """
+        i = bisect.bisect_left(self.starts, end) - 1
+        horizon = start - self.max_length
+        while i >= 0 and self.starts[i] > horizon:
+            if self.ends[i] > start:
+                return self.ids[i]
+            i -= 1
+        return None
+
+    def add(self, slot_id, start, end, is_booked=False):
+        if slot_id in self.booked:
+            return
+        pos = bisect.bisect_right(self.starts, start)
+        self.starts.insert(pos, start)
+        self.ends.insert(pos, end)
+        self.ids.insert(pos, slot_id)
+        self.booked[slot_id] = bool(is_booked)
+        self.max_length = max(self.max_length, end - start)
+
+    def snapshot(self):
+        return {
+            slot_id: (start, end, self.booked[slot_id])
+            for slot_id, start, end in zip(self.ids, self.starts, self.ends)
+        }
+
+
+class AvailabilityIndex:
+    """
+    Per-provider interval index loaded lazily from the availabilities table.
+
+    The database stays the source of truth: a provider is loaded on first
+    use, updated by the write paths after they commit, and can be dropped
+    with invalidate() or verified with check_consistency(). The index is
+    process-local, so writes made by other processes are only seen after an
+    invalidate.
+    """
+
+    def __init__(self, loader=load_provider_slots):
+        self._loader = loader
+        self._providers = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _provider_lock(self, provider_id):
+        with self._lock:
+            lock = self._locks.get(provider_id)
+            if lock is None:
+                lock = self._locks[provider_id] = threading.RLock()
+            return lock
+
+    @contextmanager
+    def provider_lock(self, provider_id):
+        """
+        Serialise check-then-insert sequences for one provider.
+        """
+        with self._provider_lock(provider_id):
+            yield
+
+    def _intervals(self, provider_id):
+        intervals = self._providers.get(provider_id)
+        if intervals is None:
+            with self._provider_lock(provider_id):
+                intervals = self._providers.get(provider_id)
+                if intervals is None:
+                    intervals = ProviderIntervals(self._loader(provider_id))
+                    self._providers[provider_id] = intervals
+        return intervals
+
+    def is_loaded(self, provider_id):
+        return provider_id in self._providers
+
+    def find_overlap(self, provider_id, start, end):
+        intervals = self._intervals(provider_id)
+        with self._provider_lock(provider_id):
+            return intervals.find_overlap(start, end)
+
+    def add(self, provider_id, slot_id, start, end, is_booked=False):
+        # Providers that were never loaded will pick the row up on first use.
+        intervals = self._providers.get(provider_id)
+        if intervals is None:
+            return
+        with self._provider_lock(provider_id):
+            intervals.add(slot_id, start, end, is_booked)
+
+    def mark_booked(self, provider_id, slot_id, is_booked=True):
+        intervals = self._providers.get(provider_id)
+        if intervals is None:
+            return
+        with self._provider_lock(provider_id):
+            if slot_id in intervals.booked:
+                intervals.booked[slot_id] = is_booked
+
+    def invalidate(self, provider_id=None):
+        with self._lock:
+            if provider_id is None:
+                self._providers.clear()
+            else:
+                self._providers.pop(provider_id, None)
+
+    def check_consistency(self, provider_id, repair=False):
+        """
+        Compare the cached intervals of a provider with the database.
+
+        Returns a dict of slot id lists: 'missing' (in the database but not
+        the index), 'stale' (in the index but not the database) and
+        'mismatched' (times or booking state differ). With repair=True the
+        provider is reloaded when any difference is found.
+        """
+        report = {'missing': [], 'stale': [], 'mismatched': []}
+        intervals = self._providers.get(provider_id)
+        if intervals is None:
+            return report
+
+        with self._provider_lock(provider_id):
+            cached = intervals.snapshot()
+        stored = {
+            slot_id: (start, end, bool(is_booked))
+            for slot_id, start, end, is_booked in self._loader(provider_id)
+        }
+
+        for slot_id, row in stored.items():
+            if slot_id not in cached:
+                report['missing'].append(slot_id)
+            elif cached[slot_id] != row:
+                report['mismatched'].append(slot_id)
+        report['stale'] = [slot_id for slot_id in cached if slot_id not in stored]
+
+        if repair and any(report.values()):
+            self.invalidate(provider_id)
+        return report
@@ -0,0 +1,179 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+
+def new_session(phone_number, department):
+    """
+    Fresh AI call session. Sessions are plain JSON-compatible dicts so every
+    store backend can hold them.
+    """
+    return {
+        'phone_number': phone_number,
+        'department': department,
+        'history': [],
+        'turns': 0,
+        'voice_enabled': True,
+        'start_time': datetime.utcnow().isoformat()
+    }
+
+
+def append_turn(session, role, content, max_history=20):
+    """
+    Add a turn to the session's history, keeping only the latest
+    `max_history` turns. `turns` keeps counting past the window.
+    """
+    session['history'].append({
+        'role': role,
+        'content': content,
+        'timestamp': datetime.utcnow().isoformat()
+    })
+    if max_history and len(session['history']) > max_history:
+        del session['history'][:-max_history]
+    session['turns'] += 1
+
+
+class MemorySessionStore:
+    """
+    In-process LRU store that evicts sessions idle for longer than `idle_ttl`
+    seconds and caps the number of live sessions at `max_sessions`.
+    """
+
+    def __init__(self, max_sessions=10000, idle_ttl=1800, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._clock = clock
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _purge_expired(self, now):
+        # Least recently used first, so stop at the first live session
+        while self._sessions:
+            call_id, (_, expires_at) = next(iter(self._sessions.items()))
+            if expires_at > now:
+                break
+            del self._sessions[call_id]
+            self.evictions += 1
+
+    def get(self, call_id):
+        with self._lock:
+            item = self._sessions.get(call_id)
+            if item is None:
+                return None
+            session, expires_at = item
+            if expires_at <= self._clock():
+                del self._sessions[call_id]
+                self.evictions += 1
+                return None
+            return session
+
+    def save(self, call_id, session):
+        with self._lock:
+            now = self._clock()
+            self._sessions[call_id] = (session, now + self.idle_ttl)
+            self._sessions.move_to_end(call_id)
+            self._purge_expired(now)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, call_id):
+        with self._lock:
+            return self._sessions.pop(call_id, None) is not None
+
+    def purge_expired(self):
+        with self._lock:
+            self._purge_expired(self._clock())
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """
+    File-backed stand-in for a shared session store such as Redis, so a call
+    started on one worker process can continue on another.
+    """
+
+    def __init__(self, path, max_sessions=10000, idle_ttl=1800, clock=time.time):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._clock = clock
+        self._local = threading.local()
+        self.evictions = 0
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS call_sessions ("
+                "call_id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_call_sessions_expires_at ON call_sessions (expires_at)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, call_id):
+        row = self._connect().execute(
+            "SELECT data FROM call_sessions WHERE call_id = ? AND expires_at > ?",
+            (call_id, self._clock())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, call_id, session):
+        conn = self._connect()
+        now = self._clock()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO call_sessions (call_id, data, expires_at) VALUES (?, ?, ?)",
+                (call_id, json.dumps(session), now + self.idle_ttl)
+            )
+            evicted = conn.execute("DELETE FROM call_sessions WHERE expires_at <= ?", (now,)).rowcount
+            evicted += conn.execute(
+                "DELETE FROM call_sessions WHERE call_id IN ("
+                "SELECT call_id FROM call_sessions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,)
+            ).rowcount
+        self.evictions += evicted
+
+    def delete(self, call_id):
+        conn = self._connect()
+        with conn:
+            return conn.execute("DELETE FROM call_sessions WHERE call_id = ?", (call_id,)).rowcount > 0
+
+    def purge_expired(self):
+        conn = self._connect()
+        with conn:
+            self.evictions += conn.execute(
+                "DELETE FROM call_sessions WHERE expires_at <= ?", (self._clock(),)
+            ).rowcount
+
+    def __len__(self):
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM call_sessions WHERE expires_at > ?", (self._clock(),)
+        ).fetchone()[0]
+
+
+def create_call_session_store(config):
+    """
+    Build the AI call session store described by the CALL_SESSION_* config
+    keys.
+    """
+    backend_name = config.get('CALL_SESSION_BACKEND', 'memory')
+    max_sessions = config.get('CALL_SESSION_MAX', 10000)
+    idle_ttl = config.get('CALL_SESSION_IDLE_TTL', 1800)
+
+    if backend_name == 'memory':
+        return MemorySessionStore(max_sessions=max_sessions, idle_ttl=idle_ttl)
+    if backend_name == 'sqlite':
+        return SQLiteSessionStore(config['CALL_SESSION_PATH'], max_sessions=max_sessions, idle_ttl=idle_ttl)
+    raise ValueError(f"Unknown CALL_SESSION_BACKEND: {backend_name!r}")
@@ -0,0 +1,215 @@
+import re
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+
+from ..database.models import DAY_PARTS
+
+ParsedDateTime = namedtuple('ParsedDateTime', ['date', 'time', 'day_part'])
+
+# Distinct utterances kept per process; repeated phrases ("tomorrow
+# morning", "next monday at 3") are parsed once per reference date
+PARSE_CACHE_SIZE = 4096
+
+MONTHS = {
+    'jan': 1, 'january': 1, 'feb': 2, 'february': 2, 'mar': 3, 'march': 3, 'apr': 4, 'april': 4,
+    'may': 5, 'jun': 6, 'june': 6, 'jul': 7, 'july': 7, 'aug': 8, 'august': 8,
+    'sep': 9, 'sept': 9, 'september': 9, 'oct': 10, 'october': 10, 'nov': 11, 'november': 11,
+    'dec': 12, 'december': 12,
+}
+WEEKDAYS = {
+    'mon': 0, 'monday': 0, 'tue': 1, 'tues': 1, 'tuesday': 1, 'wed': 2, 'wednesday': 2,
+    'thu': 3, 'thur': 3, 'thurs': 3, 'thursday': 3, 'fri': 4, 'friday': 4,
+    'sat': 5, 'saturday': 5, 'sun': 6, 'sunday': 6,
+}
+NUMBER_WORDS = {'a': 1, 'an': 1, 'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7}
+DAY_PART_WORDS = {'morning': 'morning', 'afternoon': 'afternoon', 'evening': 'evening', 'tonight': 'evening'}
+
+
+def _alternation(words):
+    return '|'.join(sorted(words, key=len, reverse=True))
+
+
+_MONTH = _alternation(MONTHS)
+_ORDINAL = r'(\d{1,2})(?:st|nd|rd|th)?'
+_YEAR = r'(?:,?\s+(\d{4}))?'
+
+DAY_MONTH = re.compile(rf'\b{_ORDINAL}\s+(?:of\s+)?({_MONTH})\b{_YEAR}')
+MONTH_DAY = re.compile(rf'\b({_MONTH})\.?\s+(?:the\s+)?{_ORDINAL}\b{_YEAR}')
+ISO_DATE = re.compile(r'\b(\d{4})-(\d{1,2})-(\d{1,2})\b')
+SLASH_DATE = re.compile(r'\b(\d{1,2})/(\d{1,2})(?:/(\d{2}|\d{4}))?\b')
+RELATIVE_DAY = re.compile(r'\b(day after tomorrow|today|tonight|tomorrow)\b')
+WEEKDAY = re.compile(rf'\b(?:(next|this|coming)\s+)?({_alternation(WEEKDAYS)})\b')
+OFFSET = re.compile(rf'\bin\s+(\d+|{_alternation(NUMBER_WORDS)})\s+(day|week)s?\b')
+NEXT_WEEK = re.compile(r'\bnext week\b')
+
+MERIDIEM_TIME = re.compile(r'\b(\d{1,2})(?:[:.](\d{2}))?\s*([ap])\.?\s?m\b\.?')
+CLOCK_TIME = re.compile(r'\b([01]?\d|2[0-3]):([0-5]\d)\b')
+AT_HOUR = re.compile(r'\bat\s+(\d{1,2})(?:[:.](\d{2}))?\b(?!\s*(?:st|nd|rd|th)\b)')
+NAMED_TIME = re.compile(r'\b(noon|midday|midnight)\b')
+DAY_PART = re.compile(rf'\b({_alternation(DAY_PART_WORDS)})\b')
+
+WHITESPACE = re.compile(r'\s+')
+
+
+def _resolve_year(month, day, year, reference):
+    """
+    Dates without a year refer to the next occurrence on or after the
+    reference date. Returns None for impossible dates such as 31 April.
+    """
+    if year is not None:
+        year = int(year)
+        if year < 100:
+            year += 2000
+        try:
+            return date(year, month, day)
+        except (ValueError, OverflowError):
+            return None
+    for year in (reference.year, reference.year + 1):
+        try:
+            candidate = date(year, month, day)
+        except ValueError:
+            continue
+        if candidate >= reference:
+            return candidate
+    return None
+
+
+def _days_after(reference, days):
+    """
+    `reference` plus `days` days, or None past the last representable date.
+    """
+    try:
+        return reference + timedelta(days=days)
+    except OverflowError:
+        return None
+
+
+def _parse_date(text, reference):
+    found = DAY_MONTH.search(text)
+    if found:
+        return _resolve_year(MONTHS[found.group(2)], int(found.group(1)), found.group(3), reference)
+    found = MONTH_DAY.search(text)
+    if found:
+        return _resolve_year(MONTHS[found.group(1)], int(found.group(2)), found.group(3), reference)
+    found = ISO_DATE.search(text)
+    if found:
+        return _resolve_year(int(found.group(2)), int(found.group(3)), found.group(1), reference)
+    found = SLASH_DATE.search(text)
+    if found:
+        # Month first, as in the US-style dates the frontend sends
+        return _resolve_year(int(found.group(1)), int(found.group(2)), found.group(3), reference)
+
+    found = RELATIVE_DAY.search(text)
+    if found:
+        word = found.group(1)
+        if word == 'tomorrow':
+            return _days_after(reference, 1)
+        if word == 'day after tomorrow':
+            return _days_after(reference, 2)
+        return reference
+
+    found = WEEKDAY.search(text)
+    if found:
+        modifier, weekday = found.groups()
+        days_ahead = (WEEKDAYS[weekday] - reference.weekday()) % 7
+        # A bare or "this" weekday may be today; "next" always moves forward
+        if modifier == 'next' and days_ahead == 0:
+            days_ahead = 7
+        return _days_after(reference, days_ahead)
+
+    found = OFFSET.search(text)
+    if found:
+        amount, unit = found.groups()
+        amount = int(amount) if amount.isdigit() else NUMBER_WORDS[amount]
+        return _days_after(reference, amount * (7 if unit == 'week' else 1))
+
+    if NEXT_WEEK.search(text):
+        return _days_after(reference, 7)
+    return None
+
+
+def _clock(hour, minute):
+    if hour > 23 or minute > 59:
+        return None
+    return time(hour, minute)
+
+
+def _parse_time(text, day_part):
+    found = MERIDIEM_TIME.search(text)
+    if found:
+        hour, minute, meridiem = int(found.group(1)), int(found.group(2) or 0), found.group(3)
+        if not 1 <= hour <= 12:
+            return None
+        return _clock(hour % 12 + (12 if meridiem == 'p' else 0), minute)
+
+    found = CLOCK_TIME.search(text)
+    if found:
+        return _clock(int(found.group(1)), int(found.group(2)))
+
+    found = NAMED_TIME.search(text)
+    if found:
+        return time(0) if found.group(1) == 'midnight' else time(12)
+
+    found = AT_HOUR.search(text)
+    if found:
+        hour, minute = int(found.group(1)), int(found.group(2) or 0)
+        # "at 3" means 3 PM unless the caller said morning; opening hours
+        # start at 8, so smaller hours are read as afternoon
+        if hour < 12 and (day_part in ('afternoon', 'evening') or (day_part is None and hour < 8)):
+            hour += 12
+        return _clock(hour, minute)
+    return None
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse(text, reference):
+    found = DAY_PART.search(text)
+    day_part = DAY_PART_WORDS[found.group(1)] if found else None
+    return ParsedDateTime(_parse_date(text, reference), _parse_time(text, day_part), day_part)
+
+
+def parse_datetime(text, reference=None):
+    """
+    Extract a date, a time of day and a day part ('morning', 'afternoon' or
+    'evening') from a caller's utterance.
+
+    Absolute dates ("15th March", "March 15 2031", "2031-03-15", "3/15"),
+    relative ones ("tomorrow", "next Tuesday", "in 2 weeks") and times
+    ("2 PM", "2:30pm", "14:00", "noon", "at 3") are understood. Dates are
+    resolved against `reference` (default: now); dates without a year are
+    the next occurrence on or after the reference date. Any part that is
+    missing or invalid is None.
+
+    Results are memoised on the normalised text and the reference date.
+    """
+    if reference is None:
+        reference = datetime.now()
+    if isinstance(reference, datetime):
+        reference = reference.date()
+    return _parse(WHITESPACE.sub(' ', text.lower()).strip(), reference)
+
+
+def requested_window(parsed):
+    """
+    (start, end) datetimes to search for a parsed request, or None when the
+    utterance does not say both a day and a time or part of the day.
+    """
+    if parsed.date is None:
+        return None
+    try:
+        if parsed.time is not None:
+            start = datetime.combine(parsed.date, parsed.time)
+            return start, start + timedelta(hours=1)
+        if parsed.day_part is not None:
+            first_hour, end_hour = DAY_PARTS[parsed.day_part]
+            day = datetime.combine(parsed.date, time())
+            return day + timedelta(hours=first_hour), day + timedelta(hours=end_hour)
+    except OverflowError:
+        # The window runs past the last representable datetime
+        return None
+    return None
+
+
+cache_info = _parse.cache_info
+cache_clear = _parse.cache_clear
@@ -1,3 +1,7 @@
+import threading
+import time
+
+
 def send_email(to_email: str, subject: str, message: str) -> None:
     """
     A simple email service that just prints the email details to the console.
@@ -6,4 +10,40 @@ def send_email(to_email: str, subject: str, message: str) -> None:
     print(f"\nEmail Service:")
     print(f"To: {to_email}")
     print(f"Subject: {subject}")
-    print(f"Message: {message}\n") 
\ No newline at end of file
+    print(f"Message: {message}\n")
+
+
+class ConsoleTransport:
+    """
+    Outbox transport that hands messages to send_email.
+    """
+
+    def send(self, to_email: str, subject: str, message: str) -> None:
+        send_email(to_email, subject, message)
+
+
+class FakeTransport:
+    """
+    In-memory transport for tests and benchmarks.
+
+    Sent messages are recorded in `sent`. Addresses listed in `failing` fail
+    on every attempt, and `fail_times` makes the next N sends fail.
+    """
+
+    def __init__(self, failing=(), fail_times=0, delay=0.0):
+        self.sent = []
+        self.failing = set(failing)
+        self.fail_times = fail_times
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def send(self, to_email: str, subject: str, message: str) -> None:
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            if to_email in self.failing:
+                raise ConnectionError(f"Fake transport rejected {to_email}")
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise ConnectionError("Fake transport failure")
+            self.sent.append((to_email, subject, message))
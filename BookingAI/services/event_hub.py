@@ -0,0 +1,121 @@
+import itertools
+import threading
+import time
+from collections import deque, namedtuple
+
+Event = namedtuple('Event', ['id', 'channel', 'type', 'data', 'published_at'])
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+def topic_channel(service_type):
+    return f"topic:{service_type}"
+
+
+class Subscription:
+    """
+    A client's view of one or more hub channels.
+
+    Events are handed over through a small per-subscription buffer guarded
+    by a condition variable, so an idle subscriber costs one blocked thread
+    and no polling.
+    """
+
+    def __init__(self, hub, channels):
+        self.hub = hub
+        self.channels = tuple(channels)
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self.resync = False
+
+    def _deliver(self, event):
+        with self._condition:
+            self._pending.append(event)
+            self._condition.notify()
+
+    def wait(self, timeout=None):
+        """
+        Block until events are available or `timeout` seconds pass and
+        return them in id order (possibly an empty list).
+        """
+        with self._condition:
+            if not self._pending:
+                self._condition.wait(timeout)
+            events = list(self._pending)
+            self._pending.clear()
+        return events
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    """
+    In-process publish/subscribe hub backing the /api/events push channel.
+
+    Every event gets a process-wide increasing id and is kept in a bounded
+    per-channel history so clients reconnecting with Last-Event-ID can be
+    replayed what they missed. When the requested id has already been
+    evicted the subscription is flagged with `resync` so the client knows to
+    refetch its inbox instead.
+    """
+
+    def __init__(self, history_size=256, clock=time.monotonic):
+        self.history_size = history_size
+        self._clock = clock
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._history = {}
+        self._evicted_up_to = {}
+        self._subscribers = {}
+        self.published = 0
+
+    def publish(self, channel, event_type, data):
+        with self._lock:
+            event = Event(next(self._ids), channel, event_type, data, self._clock())
+            history = self._history.setdefault(channel, deque())
+            history.append(event)
+            if len(history) > self.history_size:
+                self._evicted_up_to[channel] = history.popleft().id
+            subscribers = list(self._subscribers.get(channel, ()))
+            self.published += 1
+        for subscription in subscribers:
+            subscription._deliver(event)
+        return event
+
+    def subscribe(self, channels, last_event_id=None):
+        subscription = Subscription(self, channels)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+            if last_event_id is not None:
+                missed = []
+                for channel in subscription.channels:
+                    if self._evicted_up_to.get(channel, 0) > last_event_id:
+                        subscription.resync = True
+                    missed.extend(event for event in self._history.get(channel, ()) if event.id > last_event_id)
+                for event in sorted(missed, key=lambda event: event.id):
+                    subscription._deliver(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({s for subscribers in self._subscribers.values() for s in subscribers})
+
+    def stats(self):
+        return {
+            'subscribers': self.subscriber_count(),
+            'channels': len(self._subscribers),
+            'published': self.published
+        }
@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import g, has_request_context
+from sqlalchemy import select
+
+from .. import db
+from ..database.models import User, ServiceProvider
+
+# Snapshot of the user and provider columns handlers need. Plain tuples can
+# be shared between requests and sessions, unlike ORM instances.
+Identity = namedtuple('Identity', 'user_id email full_name provider_id service_type')
+
+
+class IdentityResolver:
+    """
+    Resolves a JWT identity to the user's profile and provider record.
+
+    Lookups are memoised for the rest of the request in flask.g and, for
+    `ttl` seconds, in an in-process LRU shared by all requests. Entries are
+    keyed both by user id and by provider id. Code that registers a
+    provider or changes a user's email, name or service type must call
+    invalidate(user_id) after committing; other processes see the change
+    once their entry expires. ttl=0 keeps only the per-request memo.
+    """
+
+    def __init__(self, ttl=30, max_entries=4096, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _request_memo(self):
+        if not has_request_context():
+            return {}
+        if 'identities' not in g:
+            g.identities = {}
+        return g.identities
+
+    def _cached(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            identity, expires_at = item
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return identity
+
+    def _store(self, identity):
+        if not self.ttl:
+            return
+        expires_at = self._clock() + self.ttl
+        with self._lock:
+            keys = [('user', identity.user_id)]
+            if identity.provider_id is not None:
+                keys.append(('provider', identity.provider_id))
+            for key in keys:
+                self._entries[key] = (identity, expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, condition):
+        row = db.session.execute(
+            select(User.id, User.email, User.full_name, ServiceProvider.id, ServiceProvider.service_type)
+            .outerjoin(ServiceProvider, ServiceProvider.user_id == User.id)
+            .where(condition)
+            .limit(1)
+        ).first()
+        return Identity(*row) if row else None
+
+    def _resolve(self, key, condition):
+        memo = self._request_memo()
+        if key in memo:
+            return memo[key]
+        identity = self._cached(key)
+        if identity is None:
+            identity = self._load(condition)
+            if identity is not None:
+                self._store(identity)
+        memo[key] = identity
+        return identity
+
+    def user(self, user_id):
+        """
+        Identity of the user, or None when no such user exists.
+        """
+        return self._resolve(('user', user_id), User.id == user_id)
+
+    def provider(self, user_id):
+        """
+        Identity of the user if they are a service provider, otherwise None.
+        """
+        identity = self.user(user_id)
+        return identity if identity is not None and identity.provider_id is not None else None
+
+    def by_provider_id(self, provider_id):
+        """
+        Identity of the user behind a service provider id, or None.
+        """
+        return self._resolve(('provider', provider_id), ServiceProvider.id == provider_id)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            item = self._entries.pop(('user', user_id), None)
+            if item is not None and item[0].provider_id is not None:
+                self._entries.pop(('provider', item[0].provider_id), None)
+        memo = self._request_memo()
+        identity = memo.pop(('user', user_id), None)
+        if identity is not None and identity.provider_id is not None:
+            memo.pop(('provider', identity.provider_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+def create_identity_resolver(config):
+    """
+    Build the resolver described by the IDENTITY_CACHE_* config keys.
+    """
+    return IdentityResolver(
+        ttl=config.get('IDENTITY_CACHE_TTL', 30),
+        max_entries=config.get('IDENTITY_CACHE_MAX_ENTRIES', 4096)
+    )
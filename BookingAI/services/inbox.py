@@ -0,0 +1,243 @@
+from sqlalchemy import and_, func, literal, null, or_, select, union_all, update
+from sqlalchemy.orm import aliased
+
+from .. import db
+from ..database.models import User, Message, Broadcast, BroadcastReadMarker, ServiceProvider
+from .pagination import before_cursor
+
+
+def publish_broadcast(topic, content, message_type, sender_user_id=None, call_request_id=None):
+    """
+    Store one notification for every agent subscribed to `topic`.
+
+    Agents subscribe through their provider service_type; their inboxes pick
+    the broadcast up at read time, so the write cost does not depend on how
+    many agents share the topic. The row joins the caller's transaction.
+    """
+    broadcast = Broadcast(
+        topic=topic,
+        content=content,
+        message_type=message_type,
+        sender_user_id=sender_user_id,
+        call_request_id=call_request_id
+    )
+    db.session.add(broadcast)
+    return broadcast
+
+
+def create_message(recipient_user_id, content, message_type, sender_user_id=None, call_request_id=None):
+    """
+    Add a direct message and bump the recipient's unread counter in the
+    caller's transaction.
+    """
+    message = Message(
+        sender_user_id=sender_user_id,
+        recipient_user_id=recipient_user_id,
+        message_type=message_type,
+        content=content,
+        call_request_id=call_request_id
+    )
+    db.session.add(message)
+    db.session.execute(
+        update(User)
+        .where(User.id == recipient_user_id)
+        .values(unread_message_count=User.unread_message_count + 1, updated_at=User.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    return message
+
+
+def mark_message_read(user_id, message_id):
+    """
+    Mark a message addressed to `user_id` as read. Returns False when no such
+    message exists. The counter is only decremented when this call actually
+    flipped is_read, so repeated or concurrent calls cannot drive it below
+    the true count. Commits.
+    """
+    flipped = db.session.execute(
+        update(Message)
+        .where(Message.id == message_id, Message.recipient_user_id == user_id, Message.is_read == False)
+        .values(is_read=True)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if flipped:
+        db.session.execute(
+            update(User)
+            .where(User.id == user_id, User.unread_message_count > 0)
+            .values(unread_message_count=User.unread_message_count - 1, updated_at=User.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return True
+
+    db.session.rollback()
+    return db.session.query(Message.id).filter_by(id=message_id, recipient_user_id=user_id).first() is not None
+
+
+def recount_unread_messages(user_id=None):
+    """
+    Recompute unread_message_count from the messages table for one user or
+    everybody. Repairs counters after out-of-band writes. Commits.
+    """
+    unread = select(func.count(Message.id)).where(
+        Message.recipient_user_id == User.id,
+        Message.is_read == False
+    ).scalar_subquery()
+    statement = update(User).values(unread_message_count=unread, updated_at=User.updated_at)
+    if user_id is not None:
+        statement = statement.where(User.id == user_id)
+    db.session.execute(statement.execution_options(synchronize_session=False))
+    db.session.commit()
+
+
+def visible_broadcasts(user_id):
+    """
+    Query of (Broadcast, last_read_id) pairs in the user's inbox.
+
+    A provider sees broadcasts on its service_type published since it
+    registered, which matches who the old per-agent fan-out would have
+    reached.
+    """
+    return db.session.query(
+        Broadcast,
+        func.coalesce(BroadcastReadMarker.last_read_id, 0)
+    ).join(
+        ServiceProvider,
+        and_(
+            ServiceProvider.user_id == user_id,
+            ServiceProvider.service_type == Broadcast.topic,
+            Broadcast.created_at >= ServiceProvider.created_at
+        )
+    ).outerjoin(
+        BroadcastReadMarker,
+        and_(
+            BroadcastReadMarker.user_id == user_id,
+            BroadcastReadMarker.topic == Broadcast.topic
+        )
+    )
+
+
+def unread_broadcast_count(user_id):
+    return visible_broadcasts(user_id).filter(
+        Broadcast.id > func.coalesce(BroadcastReadMarker.last_read_id, 0)
+    ).count()
+
+
+def unread_count(user_id):
+    """
+    Badge count: the denormalised direct-message counter plus unread
+    broadcasts, without scanning the user's messages.
+    """
+    direct = db.session.query(User.unread_message_count).filter(User.id == user_id).scalar() or 0
+    return direct + unread_broadcast_count(user_id)
+
+
+def mark_broadcasts_read(user_id, topic, up_to_id):
+    """
+    Advance the user's read marker on `topic` to `up_to_id`.
+
+    Markers only move forward, so everything published on the topic up to
+    and including `up_to_id` counts as read. Commits.
+    """
+    marker = BroadcastReadMarker.query.filter_by(user_id=user_id, topic=topic).first()
+    if marker is None:
+        marker = BroadcastReadMarker(user_id=user_id, topic=topic, last_read_id=up_to_id)
+        db.session.add(marker)
+    elif marker.last_read_id < up_to_id:
+        marker.last_read_id = up_to_id
+    db.session.commit()
+    return marker.last_read_id
+
+
+def _newest_first(statement, created_at, sort_id, limit, cursor):
+    if cursor:
+        statement = statement.where(before_cursor(created_at, sort_id, cursor))
+    statement = statement.order_by(created_at.desc(), sort_id.desc())
+    if limit is not None:
+        statement = statement.limit(limit)
+    # Wrap so every branch keeps its own ORDER BY/LIMIT inside the UNION
+    return select(statement.subquery())
+
+
+def inbox_query(user_id, limit=None, cursor=None):
+    """
+    One statement returning a page of the user's inbox, newest first.
+
+    Sent messages, received messages and subscribed broadcasts are separate
+    UNION ALL branches, each walking its own (user, created_at) index with
+    the keyset condition and limit pushed down, so a page costs
+    O(3 * limit) index reads however long the history is. Participant
+    names come from joins rather than per-row lazy loads.
+
+    Rows are ordered by (created_at, sort_id) where sort_id is id * 2 for
+    messages and id * 2 + 1 for broadcasts, keeping the keyset unique
+    across both tables. Malformed cursors raise ValueError.
+    """
+    sender = aliased(User)
+    recipient = aliased(User)
+
+    def message_branch(condition):
+        sort_id = Message.id * 2
+        statement = select(
+            literal('message').label('kind'),
+            Message.id.label('id'),
+            sort_id.label('sort_id'),
+            Message.sender_user_id.label('sender_id'),
+            sender.full_name.label('sender_name'),
+            Message.recipient_user_id.label('receiver_id'),
+            recipient.full_name.label('receiver_name'),
+            Message.content.label('content'),
+            Message.created_at.label('created_at'),
+            Message.is_read.label('is_read'),
+            Message.call_request_id.label('call_request_id'),
+            null().label('topic')
+        ).outerjoin(
+            sender, sender.id == Message.sender_user_id
+        ).join(
+            recipient, recipient.id == Message.recipient_user_id
+        ).where(condition)
+        return _newest_first(statement, Message.created_at, sort_id, limit, cursor)
+
+    sent = message_branch(Message.sender_user_id == user_id)
+    received = message_branch(and_(
+        Message.recipient_user_id == user_id,
+        or_(Message.sender_user_id.is_(None), Message.sender_user_id != user_id)
+    ))
+
+    broadcast_sender = aliased(User)
+    subscriber = aliased(User)
+    sort_id = Broadcast.id * 2 + 1
+    broadcasts = _newest_first(select(
+        literal('broadcast').label('kind'),
+        Broadcast.id.label('id'),
+        sort_id.label('sort_id'),
+        Broadcast.sender_user_id.label('sender_id'),
+        broadcast_sender.full_name.label('sender_name'),
+        subscriber.id.label('receiver_id'),
+        subscriber.full_name.label('receiver_name'),
+        Broadcast.content.label('content'),
+        Broadcast.created_at.label('created_at'),
+        (Broadcast.id <= func.coalesce(BroadcastReadMarker.last_read_id, 0)).label('is_read'),
+        Broadcast.call_request_id.label('call_request_id'),
+        Broadcast.topic.label('topic')
+    ).join(
+        ServiceProvider,
+        and_(
+            ServiceProvider.user_id == user_id,
+            ServiceProvider.service_type == Broadcast.topic,
+            Broadcast.created_at >= ServiceProvider.created_at
+        )
+    ).join(
+        subscriber, subscriber.id == ServiceProvider.user_id
+    ).outerjoin(
+        broadcast_sender, broadcast_sender.id == Broadcast.sender_user_id
+    ).outerjoin(
+        BroadcastReadMarker,
+        and_(BroadcastReadMarker.user_id == user_id, BroadcastReadMarker.topic == Broadcast.topic)
+    ), Broadcast.created_at, sort_id, limit, cursor)
+
+    inbox = union_all(sent, received, broadcasts).subquery()
+    statement = select(inbox).order_by(inbox.c.created_at.desc(), inbox.c.sort_id.desc())
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
@@ -0,0 +1,92 @@
+import string
+from collections import namedtuple
+
+Intent = namedtuple('Intent', ['name', 'priority', 'phrases'])
+
+# Declarative intent table for the AI call assistant. When an utterance
+# matches several intents the lowest priority number wins, which keeps the
+# order the original if/elif chain checked them in.
+#
+# Phrases only match whole words, so the inflections the old substring
+# scan picked up are listed explicitly.
+INTENTS = (
+    Intent('schedule', 0, ('schedule', 'schedules', 'scheduled', 'scheduling',
+                           'book', 'books', 'booked', 'booking', 'bookings',
+                           'appointment', 'appointments', 'make an appointment')),
+    Intent('confirm', 1, ('yes', 'confirm', 'confirms', 'confirmed', 'confirming', 'confirmation',
+                          'sure', 'okay', 'fine')),
+    Intent('reschedule', 2, ('reschedule', 'reschedules', 'rescheduled', 'rescheduling',
+                             'change time', 'different time', 'another time')),
+    Intent('hours', 3, ('hours', 'open', 'opens', 'opened', 'opening', 'close', 'closes', 'closed', 'closing',
+                        'when are you open')),
+    Intent('emergency', 4, ('emergency', 'emergencies', 'urgent', 'urgently', 'immediately', 'right now')),
+    Intent('help', 5, ('help', 'helps', 'helped', 'helping', 'what can you do', 'how can you help')),
+    Intent('end_call', 6, ('goodbye', 'bye', 'end call', 'hang up')),
+)
+
+DEFAULT_INTENT = 'default'
+
+# Punctuation splits words, except apostrophes inside contractions. A bytes
+# table is used because bytes.translate is several times faster than
+# str.translate; UTF-8 multi-byte sequences never contain ASCII bytes.
+_SEPARATORS = string.punctuation.replace("'", '').encode()
+WORD_SEPARATORS = bytes.maketrans(_SEPARATORS, b' ' * len(_SEPARATORS))
+
+
+class IntentMatcher:
+    """
+    Picks an intent for an utterance from a lookup table compiled once from
+    the intent phrases.
+
+    Utterances are split into lowercase words (punctuation other than
+    apostrophes separates words) and matched on whole words only, so
+    "pressure" no longer reads as "sure" and "reschedule" no longer reads
+    as "schedule". Single-word phrases are found with one set intersection
+    against the utterance's words; multi-word phrases are only checked at
+    positions where their first word occurs. The cost depends on the
+    utterance length rather than on the number of phrases, unlike the old
+    chain of substring scans.
+    """
+
+    def __init__(self, intents=INTENTS, default=DEFAULT_INTENT):
+        self.intents = sorted(intents, key=lambda intent: intent.priority)
+        self.default = default
+        self._words = {}
+        self._phrases = {}
+        for intent in self.intents:
+            for phrase in intent.phrases:
+                first, *rest = self.tokenize(phrase)
+                if rest:
+                    self._phrases.setdefault(first, []).append((rest, intent))
+                else:
+                    # Keep the highest priority intent for a shared word
+                    self._words.setdefault(first, intent)
+
+    @staticmethod
+    def tokenize(message):
+        return message.lower().encode().translate(WORD_SEPARATORS).decode().split()
+
+    def match(self, message):
+        words = self.tokenize(message)
+        best = None
+        for word in self._words.keys() & words:
+            intent = self._words[word]
+            if best is None or intent.priority < best.priority:
+                best = intent
+        for first in self._phrases.keys() & words:
+            for position, word in enumerate(words):
+                if word != first:
+                    continue
+                for rest, intent in self._phrases[first]:
+                    if words[position + 1:position + 1 + len(rest)] == rest and (
+                        best is None or intent.priority < best.priority
+                    ):
+                        best = intent
+        return best.name if best else self.default
+
+
+_default_matcher = IntentMatcher()
+
+
+def match_intent(message):
+    return _default_matcher.match(message)
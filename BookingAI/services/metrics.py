@@ -0,0 +1,245 @@
+import cProfile
+import heapq
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus sense: each bucket counts
+    observations less than or equal to its upper bound.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _bound(value):
+    return '+Inf' if value == float('inf') else repr(value)
+
+
+class RequestMetrics:
+    """
+    Per-route request instrumentation exported in the Prometheus text format.
+
+    For every request it records wall time, the number of SQL statements and
+    the time spent in them (from engine cursor events), and the response
+    size. The `slow_query_limit` slowest statements seen are kept along with
+    their route. Requests are optionally profiled: with probability
+    `profile_sample_rate` a request runs under cProfile, and the profile is
+    written to `profile_dir` when the request took longer than
+    `profile_threshold_ms`. Only one request is profiled at a time.
+
+    Nothing is hooked into the app or the engine unless install() is called,
+    so a disabled instance costs nothing per request.
+    """
+
+    def __init__(self, slow_query_limit=10, profile_sample_rate=0.0, profile_threshold_ms=500,
+                 profile_dir='profiles', namespace='bookingai'):
+        self.slow_query_limit = slow_query_limit
+        self.profile_sample_rate = profile_sample_rate
+        self.profile_threshold = profile_threshold_ms / 1000
+        self.profile_dir = profile_dir
+        self.namespace = namespace
+        self.profiles_written = 0
+        self._routes = {}
+        self._slow_queries = []  # min-heap of (seconds, statement, route)
+        self._values = []  # (name, help, type, read) exported as one sample each
+        self._lock = threading.Lock()
+        self._profiling = threading.Lock()
+
+    def install(self, app, engine):
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def _route(self):
+        rule = request.url_rule
+        return (rule.rule if rule is not None else 'unmatched', request.method)
+
+    def _before_request(self):
+        g.request_metrics = [time.perf_counter(), 0, 0.0]
+        if self.profile_sample_rate and random.random() < self.profile_sample_rate \
+                and self._profiling.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is active in this process
+                self._profiling.release()
+            else:
+                g.request_profiler = profiler
+
+    def _after_request(self, response):
+        if 'request_metrics' not in g:
+            # An earlier before_request hook answered first
+            return response
+        started, statements, sql_seconds = g.request_metrics
+        elapsed = time.perf_counter() - started
+        size = response.calculate_content_length() or 0
+        route = self._route()
+        with self._lock:
+            histograms = self._routes.get(route)
+            if histograms is None:
+                histograms = self._routes[route] = {
+                    'duration': Histogram(DURATION_BUCKETS),
+                    'statements': Histogram(STATEMENT_BUCKETS),
+                    'sql': Histogram(DURATION_BUCKETS),
+                    'size': Histogram(SIZE_BUCKETS),
+                    'statuses': {}
+                }
+            histograms['duration'].observe(elapsed)
+            histograms['statements'].observe(statements)
+            histograms['sql'].observe(sql_seconds)
+            histograms['size'].observe(size)
+            histograms['statuses'][response.status_code] = histograms['statuses'].get(response.status_code, 0) + 1
+
+        profiler = g.pop('request_profiler', None)
+        if profiler is not None:
+            self._finish_profile(profiler, route, elapsed)
+        return response
+
+    def _teardown_request(self, exc):
+        # Covers requests that raised before after_request ran
+        profiler = g.pop('request_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            self._profiling.release()
+
+    def _finish_profile(self, profiler, route, elapsed):
+        profiler.disable()
+        try:
+            if elapsed >= self.profile_threshold:
+                os.makedirs(self.profile_dir, exist_ok=True)
+                name = re.sub(r'[^A-Za-z0-9]+', '_', f"{route[1]} {route[0]}").strip('_')
+                stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')
+                profiler.dump_stats(os.path.join(self.profile_dir, f"{stamp}-{name}-{elapsed * 1000:.0f}ms.prof"))
+                self.profiles_written += 1
+        finally:
+            self._profiling.release()
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Kept on the statement's execution context, which is dropped with
+        # it, since after_cursor_execute never fires for a statement that raises
+        if context is not None:
+            context._query_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_query_started', None)
+        if started is None or not has_request_context() or 'request_metrics' not in g:
+            return
+        elapsed = time.perf_counter() - started
+        counters = g.request_metrics
+        counters[1] += 1
+        counters[2] += elapsed
+        if self.slow_query_limit:
+            with self._lock:
+                if len(self._slow_queries) < self.slow_query_limit:
+                    heapq.heappush(self._slow_queries, (elapsed, ' '.join(statement.split()), self._route()[0]))
+                elif elapsed > self._slow_queries[0][0]:
+                    heapq.heapreplace(self._slow_queries, (elapsed, ' '.join(statement.split()), self._route()[0]))
+
+    def add_value(self, name, help_text, read, kind='counter'):
+        """
+        Export `read()` as the single sample of `<namespace>_<name>` on every
+        render, e.g. for counters other services keep themselves.
+        """
+        self._values.append((f'{self.namespace}_{name}', help_text, kind, read))
+
+    def slow_queries(self):
+        with self._lock:
+            return sorted(self._slow_queries, reverse=True)
+
+    def render(self):
+        """
+        All metrics in the Prometheus text exposition format.
+        """
+        ns = self.namespace
+        families = (
+            ('duration', f'{ns}_request_duration_seconds', 'Request wall time in seconds.'),
+            ('statements', f'{ns}_request_sql_statements', 'SQL statements executed per request.'),
+            ('sql', f'{ns}_request_sql_seconds', 'Time spent in SQL statements per request.'),
+            ('size', f'{ns}_response_size_bytes', 'Response body size in bytes.'),
+        )
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = []
+            for key, name, help_text in families:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} histogram')
+                for (rule, method), histograms in routes:
+                    labels = f'route="{_label(rule)}",method="{method}"'
+                    histogram = histograms[key]
+                    for bound, total in histogram.cumulative():
+                        lines.append(f'{name}_bucket{{{labels},le="{_bound(bound)}"}} {total}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum!r}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+            lines.append(f'# HELP {ns}_responses_total Responses by route and status code.')
+            lines.append(f'# TYPE {ns}_responses_total counter')
+            for (rule, method), histograms in routes:
+                for status, count in sorted(histograms['statuses'].items()):
+                    lines.append(f'{ns}_responses_total{{route="{_label(rule)}",method="{method}",status="{status}"}} {count}')
+
+            lines.append(f'# HELP {ns}_slow_query_seconds Slowest SQL statements seen by this process.')
+            lines.append(f'# TYPE {ns}_slow_query_seconds gauge')
+            for elapsed, statement, rule in sorted(self._slow_queries, reverse=True):
+                lines.append(f'{ns}_slow_query_seconds{{route="{_label(rule)}",statement="{_label(statement[:200])}"}} {elapsed!r}')
+
+        # Read outside the lock: the sources take their own locks
+        for name, help_text, kind, read in self._values:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.append(f'{name} {read()!r}')
+        return '\n'.join(lines) + '\n'
+
+
+def create_request_metrics(config):
+    """
+    Build the instrumentation described by the METRICS_* and PROFILE_*
+    config keys, or return None when METRICS_ENABLED is false.
+    """
+    if not config.get('METRICS_ENABLED', False):
+        return None
+    return RequestMetrics(
+        slow_query_limit=config.get('METRICS_SLOW_QUERIES', 10),
+        profile_sample_rate=config.get('PROFILE_SAMPLE_RATE', 0.0),
+        profile_threshold_ms=config.get('PROFILE_THRESHOLD_MS', 500),
+        profile_dir=config.get('PROFILE_DIR', 'profiles')
+    )
@@ -0,0 +1,100 @@
+import heapq
+from functools import lru_cache
+from itertools import islice
+
+from sqlalchemy import Integer, bindparam, select, union_all
+
+from .. import db
+from ..database.models import User, ServiceProvider, Availability
+
+# Providers per UNION ALL statement, well below SQLite's 500-term compound limit
+PROVIDERS_PER_STATEMENT = 100
+
+
+def provider_ids(service_type=None):
+    statement = select(ServiceProvider.id).order_by(ServiceProvider.id)
+    if service_type:
+        statement = statement.where(ServiceProvider.service_type == service_type)
+    return db.session.scalars(statement).all()
+
+
+def has_providers(service_type):
+    return db.session.scalar(
+        select(ServiceProvider.id).where(ServiceProvider.service_type == service_type).limit(1)
+    ) is not None
+
+
+def _provider_branch(n, bounded):
+    statement = select(
+        Availability.id,
+        Availability.provider_id,
+        Availability.start_time,
+        Availability.end_time
+    ).where(
+        Availability.provider_id == bindparam(f'provider_{n}'),
+        Availability.is_booked == False,
+        Availability.start_time >= bindparam('after')
+    )
+    if bounded:
+        statement = statement.where(Availability.start_time < bindparam('before'))
+    # Wrap so the branch keeps its own ORDER BY/LIMIT inside the UNION
+    limit = bindparam('limit', type_=Integer)
+    return select(statement.order_by(Availability.start_time, Availability.id).limit(limit).subquery())
+
+
+@lru_cache(maxsize=2 * PROVIDERS_PER_STATEMENT)
+def _chunk_statement(providers, bounded):
+    """
+    The merge statement for `providers` branches, built once per shape:
+    constructing a few hundred selects costs more than running them.
+    """
+    branches = [_provider_branch(n, bounded) for n in range(providers)]
+    merged = union_all(*branches).subquery() if providers > 1 else branches[0].subquery()
+    return select(merged).order_by(merged.c.start_time, merged.c.id).limit(bindparam('limit', type_=Integer))
+
+
+def _earliest_in_chunk(chunk, after, before, limit):
+    params = {f'provider_{n}': provider_id for n, provider_id in enumerate(chunk)}
+    params.update(after=after, limit=limit)
+    if before is not None:
+        params['before'] = before
+    return db.session.execute(_chunk_statement(len(chunk), before is not None), params).all()
+
+
+def next_free_slots(after, limit=3, service_type=None, before=None):
+    """
+    The first `limit` unbooked slots starting at or after `after` (and
+    before `before`, when given), earliest first, across the providers of
+    `service_type` or all providers.
+
+    Each provider contributes at most `limit` slots from a range scan of the
+    (provider_id, is_booked, start_time) index, so one provider costs
+    O(log slots + limit) whatever its calendar holds. The per-provider lists
+    are merged a statement of PROVIDERS_PER_STATEMENT providers at a time,
+    and the sorted chunk results are merged with a heap. Returns rows of
+    (id, provider_id, provider_name, service_type, start_time, end_time).
+    """
+    providers = provider_ids(service_type)
+    if not providers or limit < 1:
+        return []
+
+    chunks = [
+        _earliest_in_chunk(providers[i:i + PROVIDERS_PER_STATEMENT], after, before, limit)
+        for i in range(0, len(providers), PROVIDERS_PER_STATEMENT)
+    ]
+    earliest = list(islice(heapq.merge(*chunks, key=lambda row: (row.start_time, row.id)), limit))
+    if not earliest:
+        return []
+
+    names = {
+        row.id: (row.full_name, row.service_type)
+        for row in db.session.execute(
+            select(ServiceProvider.id, User.full_name, ServiceProvider.service_type)
+            .join(User, User.id == ServiceProvider.user_id)
+            .where(ServiceProvider.id.in_({row.provider_id for row in earliest}))
+        )
+    }
+    return [
+        (row.id, row.provider_id, *names[row.provider_id], row.start_time, row.end_time)
+        for row in earliest
+    ]
@@ -0,0 +1,237 @@
+import threading
+import uuid
+from collections import Counter, deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_, select, update
+
+from .. import db
+from ..database.models import OutboxMessage
+from .email_service import ConsoleTransport, FakeTransport
+
+TRANSPORTS = {
+    'console': ConsoleTransport,
+    'fake': FakeTransport,
+}
+
+
+def enqueue_email(to_email, subject, message):
+    """
+    Stage an email in the outbox as part of the caller's transaction.
+
+    Nothing is delivered unless the surrounding session commits, and the
+    request never waits on the mail transport.
+    """
+    entry = OutboxMessage(channel='email', recipient=to_email, subject=subject, body=message)
+    db.session.add(entry)
+    return entry
+
+
+def _percentile(samples, fraction):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class OutboxDispatcher:
+    """
+    Background worker pool draining the notification outbox.
+
+    Workers claim due messages in batches with a single conditional UPDATE
+    tagging them with a claim token and a lease, commit, deliver them
+    outside any transaction and record the outcome in one more commit.
+    Failed deliveries are retried with exponential backoff and moved to the
+    'dead' state after max_attempts. Messages whose lease expires (a worker
+    died mid-batch) become claimable again.
+    """
+
+    def __init__(self, app, transport, workers=2, batch_size=50, poll_interval=1.0,
+                 max_attempts=5, backoff_base=2.0, backoff_max=300.0, lease_seconds=60.0):
+        self.app = app
+        self.transport = transport
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.lease = timedelta(seconds=lease_seconds)
+
+        self.counters = Counter()
+        self._latencies = deque(maxlen=1000)
+        self._stats_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+
+    def backoff(self, attempts):
+        return timedelta(seconds=min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1)))
+
+    def _claim(self):
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        claimable = or_(
+            and_(OutboxMessage.status == 'pending', OutboxMessage.next_attempt_at <= now),
+            and_(OutboxMessage.status == 'sending', OutboxMessage.lease_expires_at < now)
+        )
+        due = select(OutboxMessage.id).where(claimable).order_by(OutboxMessage.id).limit(
+            self.batch_size
+        ).with_for_update(skip_locked=True)
+
+        db.session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(due.scalar_subquery()), claimable)
+            .values(status='sending', claimed_by=token, lease_expires_at=now + self.lease)
+            .execution_options(synchronize_session=False)
+        )
+        batch = db.session.execute(
+            select(
+                OutboxMessage.id, OutboxMessage.recipient, OutboxMessage.subject,
+                OutboxMessage.body, OutboxMessage.attempts, OutboxMessage.created_at
+            ).where(OutboxMessage.claimed_by == token).order_by(OutboxMessage.id)
+        ).all()
+        db.session.commit()
+        return batch
+
+    def drain_once(self):
+        """
+        Claim and deliver one batch. Returns the number of messages handled.
+        """
+        with self.app.app_context():
+            batch = self._claim()
+            if not batch:
+                return 0
+
+            outcomes = []
+            for message_id, recipient, subject, body, attempts, created_at in batch:
+                try:
+                    self.transport.send(recipient, subject, body)
+                except Exception as exc:
+                    attempts += 1
+                    dead = attempts >= self.max_attempts
+                    outcomes.append({
+                        'id': message_id,
+                        'status': 'dead' if dead else 'pending',
+                        'attempts': attempts,
+                        'next_attempt_at': datetime.utcnow() + self.backoff(attempts),
+                        'claimed_by': None,
+                        'lease_expires_at': None,
+                        'last_error': f"{type(exc).__name__}: {exc}"
+                    })
+                    self._count('dead' if dead else 'retried')
+                else:
+                    sent_at = datetime.utcnow()
+                    outcomes.append({
+                        'id': message_id,
+                        'status': 'sent',
+                        'attempts': attempts + 1,
+                        'sent_at': sent_at,
+                        'claimed_by': None,
+                        'lease_expires_at': None
+                    })
+                    self._count('sent', (sent_at - created_at).total_seconds())
+
+            db.session.execute(update(OutboxMessage), outcomes)
+            db.session.commit()
+            return len(batch)
+
+    def drain(self):
+        """
+        Deliver everything that is currently due; used for shutdown and tests.
+        """
+        total = 0
+        while True:
+            handled = self.drain_once()
+            if not handled:
+                return total
+            total += handled
+
+    def _count(self, outcome, latency=None):
+        with self._stats_lock:
+            self.counters[outcome] += 1
+            if latency is not None:
+                self._latencies.append(latency)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            try:
+                handled = self.drain_once()
+            except Exception:
+                self.app.logger.exception("Outbox worker failed to drain a batch")
+                handled = 0
+            if handled < self.batch_size:
+                if self._wakeup.wait(self.poll_interval):
+                    self._wakeup.clear()
+
+    def start(self):
+        if self._threads:
+            return
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'outbox-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=5.0):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def wake(self):
+        """
+        Nudge idle workers after a request committed new messages.
+        """
+        self._wakeup.set()
+
+    def retry_dead(self):
+        with self.app.app_context():
+            result = db.session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.status == 'dead')
+                .values(status='pending', attempts=0, next_attempt_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        self.wake()
+        return result.rowcount
+
+    def queue_depth(self):
+        with self.app.app_context():
+            rows = db.session.query(OutboxMessage.status, func.count()).group_by(OutboxMessage.status).all()
+        return {status: count for status, count in rows}
+
+    def metrics(self):
+        with self._stats_lock:
+            latencies = list(self._latencies)
+            counters = dict(self.counters)
+        return {
+            'queue_depth': self.queue_depth(),
+            'sent': counters.get('sent', 0),
+            'retried': counters.get('retried', 0),
+            'dead': counters.get('dead', 0),
+            'drain_latency_seconds': {
+                'count': len(latencies),
+                'p50': _percentile(latencies, 0.50),
+                'p95': _percentile(latencies, 0.95),
+                'max': max(latencies) if latencies else None
+            }
+        }
+
+
+def create_outbox(app):
+    """
+    Build the dispatcher described by the OUTBOX_* config keys.
+    """
+    config = app.config
+    transport = TRANSPORTS[config.get('OUTBOX_TRANSPORT', 'console')]()
+    return OutboxDispatcher(
+        app,
+        transport,
+        workers=config.get('OUTBOX_WORKERS', 2),
+        batch_size=config.get('OUTBOX_BATCH_SIZE', 50),
+        poll_interval=config.get('OUTBOX_POLL_INTERVAL', 1.0),
+        max_attempts=config.get('OUTBOX_MAX_ATTEMPTS', 5)
+    )
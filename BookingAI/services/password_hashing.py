@@ -0,0 +1,106 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeout
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashingOverloaded(Exception):
+    """
+    Raised when the hashing queue is full; callers should answer 503 with a
+    Retry-After header instead of queueing more CPU work.
+    """
+
+    def __init__(self, retry_after):
+        super().__init__(f"Password hashing queue is full, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class PasswordHasher:
+    """
+    Runs Werkzeug password hashing and verification off the request thread.
+
+    Work goes to a process pool of `workers` processes, created on first
+    use with the spawn start method so it never forks the app's background
+    threads. At most `max_pending` hashes may be running or queued; beyond
+    that HashingOverloaded is raised immediately so a login storm is shed
+    instead of piling up behind the pool. With workers=0 hashing runs
+    inline, as it did before.
+    """
+
+    def __init__(self, method='pbkdf2:sha256:600000', workers=2, max_pending=32, timeout=10.0, retry_after=1):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._prefix = None
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _pool(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def _run(self, function, *args):
+        if not self.workers:
+            return function(*args)
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingOverloaded(self.retry_after)
+        try:
+            future = self._pool().submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job is done, not until we stop waiting
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(self.timeout)
+        except FuturesTimeout:
+            # The pool is saturated; the job still finishes but nobody waits
+            raise HashingOverloaded(self.retry_after)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """
+        True when the stored hash was made with different parameters than
+        the configured method, e.g. after raising the iteration count.
+        """
+        return password_hash.split('$', 1)[0] != self._method_prefix()
+
+    def _method_prefix(self):
+        # Werkzeug fills in its defaults for short methods ('scrypt' is
+        # stored as 'scrypt:32768:8:1'), so take the prefix from one real
+        # hash, made on first use
+        if self._prefix is None:
+            self._prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return self._prefix
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+def create_password_hasher(config):
+    """
+    Build the hasher described by the PASSWORD_HASH_* config keys.
+    """
+    return PasswordHasher(
+        method=config.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000'),
+        workers=config.get('PASSWORD_HASH_WORKERS', 2),
+        max_pending=config.get('PASSWORD_HASH_MAX_PENDING', 32),
+        timeout=config.get('PASSWORD_HASH_TIMEOUT', 10.0),
+        retry_after=config.get('PASSWORD_HASH_RETRY_AFTER', 1)
+    )
@@ -0,0 +1,126 @@
+from datetime import datetime
+
+from sqlalchemy import case, delete, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+
+from .. import db
+from ..database.models import User, ServiceProvider, Appointment, Feedback, ProviderRating
+
+STARS = (1, 2, 3, 4, 5)
+
+
+def valid_rating(rating):
+    return isinstance(rating, int) and not isinstance(rating, bool) and rating in STARS
+
+
+def _increment(provider_id, rating, now):
+    return db.session.execute(
+        update(ProviderRating)
+        .where(ProviderRating.provider_id == provider_id)
+        .values({
+            ProviderRating.rating_count: ProviderRating.rating_count + 1,
+            ProviderRating.rating_sum: ProviderRating.rating_sum + rating,
+            # The right-hand sides see the row before this UPDATE
+            ProviderRating.rating_avg: (ProviderRating.rating_sum + rating) * 1.0 / (ProviderRating.rating_count + 1),
+            getattr(ProviderRating, f'stars_{rating}'): getattr(ProviderRating, f'stars_{rating}') + 1,
+            ProviderRating.updated_at: now
+        })
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def record_rating(appointment_id, rating):
+    """
+    Fold one appointment rating into its provider's aggregate in the
+    caller's transaction.
+
+    The counters are bumped with a single UPDATE, so concurrent feedback on
+    the same provider serialises on that row instead of losing increments.
+    The first rating of a provider inserts its row; if another transaction
+    inserted it meanwhile, the UPDATE is retried. Ratings outside 1-5 and
+    unknown appointments are ignored. Returns whether anything was counted.
+    """
+    if appointment_id is None or not valid_rating(rating):
+        return False
+    provider_id = db.session.scalar(select(Appointment.provider_id).where(Appointment.id == appointment_id))
+    if provider_id is None:
+        return False
+
+    now = datetime.utcnow()
+    if _increment(provider_id, rating, now):
+        return True
+    try:
+        with db.session.begin_nested():
+            db.session.execute(insert(ProviderRating).values(**{
+                'provider_id': provider_id,
+                'rating_count': 1,
+                'rating_sum': rating,
+                'rating_avg': float(rating),
+                **{f'stars_{star}': int(star == rating) for star in STARS},
+                'updated_at': now
+            }))
+    except IntegrityError:
+        _increment(provider_id, rating, now)
+    return True
+
+
+def rebuild_ratings():
+    """
+    Recompute every provider aggregate from the feedback table with one
+    INSERT ... SELECT, replacing the current rows. Use after bulk loads or
+    out-of-band edits to feedback. Commits and returns the number of
+    providers with ratings.
+    """
+    rating_count = func.count(Feedback.id)
+    rating_sum = func.sum(Feedback.rating)
+    aggregates = select(
+        Appointment.provider_id,
+        rating_count,
+        rating_sum,
+        rating_sum * 1.0 / rating_count,
+        *(func.sum(case((Feedback.rating == star, 1), else_=0)) for star in STARS),
+        literal(datetime.utcnow())
+    ).join(
+        Appointment, Appointment.id == Feedback.appointment_id
+    ).where(
+        Feedback.rating.in_(STARS)
+    ).group_by(Appointment.provider_id)
+
+    db.session.execute(delete(ProviderRating))
+    db.session.execute(insert(ProviderRating).from_select([
+        'provider_id', 'rating_count', 'rating_sum', 'rating_avg',
+        *(f'stars_{star}' for star in STARS), 'updated_at'
+    ], aggregates))
+    db.session.commit()
+    return db.session.scalar(select(func.count()).select_from(ProviderRating))
+
+
+def ranked_providers_query(service_type=None, min_ratings=1, limit=None):
+    """
+    Providers ordered by average rating, best first, with ties going to the
+    provider with more ratings. Reads only the aggregate table, so the cost
+    depends on the number of providers rather than on how much feedback has
+    been collected.
+    """
+    statement = select(
+        ServiceProvider.id.label('provider_id'),
+        User.full_name.label('provider_name'),
+        ServiceProvider.service_type,
+        ProviderRating.rating_avg,
+        ProviderRating.rating_count,
+        *(getattr(ProviderRating, f'stars_{star}') for star in STARS)
+    ).join(
+        ServiceProvider, ServiceProvider.id == ProviderRating.provider_id
+    ).join(
+        User, User.id == ServiceProvider.user_id
+    ).where(
+        ProviderRating.rating_count >= min_ratings
+    )
+    if service_type:
+        statement = statement.where(ServiceProvider.service_type == service_type)
+    statement = statement.order_by(
+        ProviderRating.rating_avg.desc(), ProviderRating.rating_count.desc(), ServiceProvider.id
+    )
+    if limit is not None:
+        statement = statement.limit(limit)
+    return statement
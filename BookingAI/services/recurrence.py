@@ -0,0 +1,124 @@
+from datetime import date, datetime, time, timedelta
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+DAY_ALIASES = {
+    'weekdays': WEEKDAYS[:5],
+    'weekends': WEEKDAYS[5:],
+    'daily': WEEKDAYS,
+}
+
+# Upper bound on slots a single rule or request may produce
+MAX_BULK_SLOTS = 5000
+# Upper bound on the span of a rule, which bounds the days walked
+MAX_RECURRENCE_WEEKS = 104
+
+
+def _parse_days(days):
+    if isinstance(days, str):
+        days = DAY_ALIASES.get(days.lower(), [days])
+    weekdays = set()
+    for day in days:
+        key = str(day).lower()[:3]
+        if key not in WEEKDAYS:
+            raise ValueError(f"Unknown day: {day!r}")
+        weekdays.add(WEEKDAYS.index(key))
+    if not weekdays:
+        raise ValueError("days must name at least one day")
+    return weekdays
+
+
+def expand_recurrence(rule):
+    """
+    Expand a recurrence rule into sorted (start_time, end_time) pairs.
+
+    Example rule, "weekdays 9-17, 30 minute slots, next 12 weeks":
+
+        {
+            "days": "weekdays",           # or ["mon", "wed", ...], "daily"
+            "start_time": "09:00",
+            "end_time": "17:00",
+            "slot_minutes": 30,
+            "gap_minutes": 0,             # optional break between slots
+            "start_date": "2030-01-07",
+            "weeks": 12                   # or "end_date": "2030-03-31"
+        }
+
+    Raises ValueError for malformed rules, rules spanning more than
+    MAX_RECURRENCE_WEEKS weeks or producing more than MAX_BULK_SLOTS slots.
+    """
+    try:
+        weekdays = _parse_days(rule.get('days', 'weekdays'))
+        day_start = time.fromisoformat(rule['start_time'])
+        day_end = time.fromisoformat(rule['end_time'])
+        slot_length = timedelta(minutes=int(rule['slot_minutes']))
+        step = slot_length + timedelta(minutes=int(rule.get('gap_minutes', 0)))
+        first_day = date.fromisoformat(rule['start_date'])
+        if 'end_date' in rule:
+            last_day = date.fromisoformat(rule['end_date'])
+        else:
+            last_day = first_day + timedelta(weeks=int(rule['weeks'])) - timedelta(days=1)
+    except KeyError as exc:
+        raise ValueError(f"Missing recurrence field: {exc.args[0]}") from exc
+    except (TypeError, AttributeError, OverflowError) as exc:
+        raise ValueError(f"Invalid recurrence rule: {exc}") from exc
+
+    if slot_length <= timedelta(0) or step <= timedelta(0):
+        raise ValueError("slot_minutes must be positive")
+    if day_start >= day_end:
+        raise ValueError("start_time must be before end_time")
+    if last_day < first_day:
+        raise ValueError("Recurrence ends before it starts")
+    if (last_day - first_day).days >= MAX_RECURRENCE_WEEKS * 7:
+        raise ValueError(f"Recurrence spans more than {MAX_RECURRENCE_WEEKS} weeks")
+
+    try:
+        return _expand(weekdays, day_start, day_end, slot_length, step, first_day, last_day)
+    except OverflowError as exc:
+        raise ValueError(f"Recurrence runs past the last supported date: {exc}") from exc
+
+
+def _expand(weekdays, day_start, day_end, slot_length, step, first_day, last_day):
+    slots = []
+    day = first_day
+    while day <= last_day:
+        if day.weekday() in weekdays:
+            start = datetime.combine(day, day_start)
+            close = datetime.combine(day, day_end)
+            while start + slot_length <= close:
+                slots.append((start, start + slot_length))
+                if len(slots) > MAX_BULK_SLOTS:
+                    raise ValueError(f"Recurrence produces more than {MAX_BULK_SLOTS} slots")
+                start += step
+        day += timedelta(days=1)
+    return slots
+
+
+def find_conflicts(candidates, find_existing_overlap):
+    """
+    Split sorted (start_time, end_time) candidates into accepted slots and
+    conflicts in a single pass.
+
+    find_existing_overlap(start, end) returns the id of an already stored
+    slot overlapping the candidate, or None. Candidates overlapping an
+    earlier accepted candidate of the same batch are rejected too.
+    """
+    accepted, conflicts = [], []
+    batch_end = None
+    for start, end in candidates:
+        conflict = None
+        if start >= end:
+            conflict = {'reason': 'invalid_range'}
+        elif batch_end is not None and start < batch_end:
+            conflict = {'reason': 'overlaps_request'}
+        else:
+            existing = find_existing_overlap(start, end)
+            if existing is not None:
+                conflict = {'reason': 'overlaps_existing', 'conflicting_slot_id': existing}
+
+        if conflict:
+            conflict.update({'start_time': start.isoformat(), 'end_time': end.isoformat()})
+            conflicts.append(conflict)
+        else:
+            accepted.append((start, end))
+            batch_end = end if batch_end is None else max(batch_end, end)
+    return accepted, conflicts
@@ -0,0 +1,238 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """
+    In-process LRU cache with per-entry expiry.
+
+    Invalidation counters are kept apart from the entries so that LRU
+    eviction can never reset a generation and resurrect stale results.
+    """
+
+    def __init__(self, max_entries=1024, clock=time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, self._clock() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def counter(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def incr(self, name):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend:
+    """
+    File-backed stand-in for a shared cache such as Redis.
+
+    Every process pointing at the same file sees the same entries and
+    invalidation counters. Eviction is by insertion order rather than true
+    LRU so that reads stay read-only.
+    """
+
+    def __init__(self, path, max_entries=10000, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self._clock = clock
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_counters ("
+                "name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?",
+            (key, self._clock())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), self._clock() + ttl)
+            )
+            conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (self._clock(),))
+            conn.execute(
+                "DELETE FROM cache_entries WHERE rowid IN ("
+                "SELECT rowid FROM cache_entries ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def counter(self, name):
+        row = self._connect().execute(
+            "SELECT value FROM cache_counters WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, name):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "INSERT INTO cache_counters (name, value) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+                (name,)
+            )
+            return conn.execute("SELECT value FROM cache_counters WHERE name = ?", (name,)).fetchone()[0]
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM cache_entries")
+            conn.execute("DELETE FROM cache_counters")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+
+class SearchCache:
+    """
+    Cache of availability search responses keyed on normalised parameters.
+
+    Each entry belongs to a scope: the provider it was filtered on, the
+    service_type it was filtered on, or 'all' for unscoped searches. The
+    scope's generation counter is part of the key, so invalidating a
+    provider only bumps that provider's counter, its service_type counter
+    and the 'all' counter; entries of other scopes keep being served and
+    superseded entries simply age out.
+    """
+
+    def __init__(self, backend=None, ttl=30, namespace='availability'):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def scope_for(provider_id=None, service_type=None):
+        if provider_id:
+            return f"provider:{provider_id}"
+        if service_type:
+            return f"service_type:{service_type}"
+        return 'all'
+
+    def key(self, scope, params):
+        """
+        Cache key of a search under the scope's current generation.
+
+        Take the key before running the search and store the result under
+        that same key: if a write invalidates the scope meanwhile, the
+        result lands under the superseded generation and is never served.
+        """
+        generation = self.backend.counter(f"{self.namespace}:gen:{scope}")
+        normalized = json.dumps(params, sort_keys=True, separators=(',', ':'))
+        return f"{self.namespace}:{scope}:{generation}:{normalized}"
+
+    def get(self, scope, params, key=None):
+        value = self.backend.get(key or self.key(scope, params))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, scope, params, value, key=None):
+        self.backend.set(key or self.key(scope, params), value, self.ttl)
+
+    def invalidate(self, provider_id=None, service_type=None):
+        scopes = ['all']
+        if provider_id:
+            scopes.append(self.scope_for(provider_id=provider_id))
+        if service_type:
+            scopes.append(self.scope_for(service_type=service_type))
+        for scope in scopes:
+            self.backend.incr(f"{self.namespace}:gen:{scope}")
+        with self._lock:
+            self.invalidations += 1
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'entries': len(self.backend)
+            }
+
+
+def create_search_cache(config):
+    """
+    Build the search cache described by the SEARCH_CACHE_* config keys, or
+    return None when SEARCH_CACHE_BACKEND is 'none'.
+    """
+    backend_name = config.get('SEARCH_CACHE_BACKEND', 'memory')
+    ttl = config.get('SEARCH_CACHE_TTL', 30)
+    max_entries = config.get('SEARCH_CACHE_MAX_ENTRIES', 1024)
+
+    if backend_name == 'none':
+        return None
+    if backend_name == 'memory':
+        backend = MemoryBackend(max_entries=max_entries)
+    elif backend_name == 'sqlite':
+        backend = SQLiteBackend(config['SEARCH_CACHE_PATH'], max_entries=max_entries)
+    else:
+        raise ValueError(f"Unknown SEARCH_CACHE_BACKEND: {backend_name!r}")
+    return SearchCache(backend, ttl=ttl)
@@ -0,0 +1,170 @@
+import threading
+from datetime import datetime
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from .. import db
+from ..database.models import CallTranscript
+
+
+class TranscriptWriter:
+    """
+    Append-only, batched writer for AI call transcripts.
+
+    Turns are buffered in memory and written with one multi-row INSERT when
+    `flush_turns` turns have accumulated, when a call ends, every
+    `flush_interval` seconds once the background flusher is started, and on
+    close.
+
+    (call_id, seq) is unique, so turns are stored at most once: when a batch
+    hits a turn that is already stored, the batch is retried row by row and
+    the duplicates are dropped. A flush that fails for any other reason puts
+    its rows back at the front of the buffer so they go out with the next
+    one. The buffer never holds more than `max_buffer` turns; beyond that
+    the oldest are dropped and counted in `dropped`.
+    """
+
+    def __init__(self, app, flush_turns=100, flush_interval=5.0, max_buffer=10000):
+        self.app = app
+        self.flush_turns = flush_turns
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.flushes = 0
+        self.written = 0
+        self.dropped = 0
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def append(self, call_id, seq, role, content, department=None, created_at=None):
+        with self._lock:
+            self._buffer.append({
+                'call_id': call_id,
+                'seq': seq,
+                'role': role,
+                'content': content,
+                'department': department,
+                'created_at': created_at or datetime.utcnow()
+            })
+            self._trim()
+            full = len(self._buffer) >= self.flush_turns
+        if full:
+            if self._thread:
+                self._wakeup.set()
+            else:
+                self.flush()
+
+    def _trim(self):
+        # Called with self._lock held
+        overflow = len(self._buffer) - self.max_buffer
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped += overflow
+            self.app.logger.warning("Transcript buffer full, dropped the %d oldest turns", overflow)
+
+    def pending(self):
+        with self._lock:
+            return len(self._buffer)
+
+    def flush(self):
+        """
+        Write every buffered turn. Returns the number of rows written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            try:
+                with self.app.app_context():
+                    written = self._write(rows)
+            except Exception:
+                with self._lock:
+                    self._buffer[:0] = rows
+                    self._trim()
+                raise
+            self.flushes += 1
+            self.written += written
+            return written
+
+    def _write(self, rows):
+        try:
+            db.session.execute(insert(CallTranscript), rows)
+            db.session.commit()
+            return len(rows)
+        except IntegrityError:
+            db.session.rollback()
+
+        # Some turn is stored already; write the others one at a time
+        written = 0
+        for row in rows:
+            try:
+                db.session.execute(insert(CallTranscript), row)
+                db.session.commit()
+                written += 1
+            except IntegrityError:
+                db.session.rollback()
+                self.dropped += 1
+                self.app.logger.warning("Dropped duplicate transcript turn %s #%s", row['call_id'], row['seq'])
+        return written
+
+    def _run(self):
+        while not self._stopping.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception("Failed to flush call transcripts")
+
+    def start(self):
+        if self._thread:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name='transcript-writer', daemon=True)
+        self._thread.start()
+
+    def close(self, timeout=5.0):
+        """
+        Stop the background flusher and write whatever is still buffered.
+        Registered with atexit for the served app.
+        """
+        if self._thread:
+            self._stopping.set()
+            self._wakeup.set()
+            self._thread.join(timeout)
+            self._thread = None
+        return self.flush()
+
+
+def iter_transcripts(call_id=None, after_id=None, batch_size=500, department=None):
+    """
+    Yield stored transcript turns in write order, `batch_size` rows per
+    round trip, optionally for one call, one department and/or after a
+    given row id so an export can resume where it stopped.
+    """
+    statement = select(CallTranscript).order_by(CallTranscript.id)
+    if department is not None:
+        statement = statement.where(CallTranscript.department == department)
+    if call_id is not None:
+        statement = statement.where(CallTranscript.call_id == call_id)
+    if after_id is not None:
+        statement = statement.where(CallTranscript.id > after_id)
+    yield from db.session.scalars(statement.execution_options(yield_per=batch_size))
+
+
+def create_transcript_writer(app):
+    """
+    Build the writer described by the TRANSCRIPT_* config keys.
+    """
+    config = app.config
+    return TranscriptWriter(
+        app,
+        flush_turns=config.get('TRANSCRIPT_FLUSH_TURNS', 100),
+        flush_interval=config.get('TRANSCRIPT_FLUSH_INTERVAL', 5.0),
+        max_buffer=config.get('TRANSCRIPT_MAX_BUFFER', 10000)
+    )
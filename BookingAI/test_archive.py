@@ -0,0 +1,132 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from . import create_app, db
+from .database.models import (
+    User, ServiceProvider, Availability, Appointment, Feedback, ArchivedAvailability, ArchivedAppointment
+)
+from .services.archive import archive_history
+
+
+class TestArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.tmp.name, 'archive.db')}",
+            'OUTBOX_AUTOSTART': False,
+            'SEARCH_CACHE_BACKEND': 'none',
+            'TESTING': True
+        })
+        with self.app.app_context():
+            provider_user = User(email='provider@example.com', password_hash='x', full_name='Dr. Provider')
+            provider = ServiceProvider(user=provider_user, service_type='dentist')
+            patient = User(email='patient@example.com', password_hash='x', full_name='Patient')
+            db.session.add_all([provider, patient])
+            db.session.flush()
+            # One slot a month from 2022 to the end of 2024, every other one booked
+            for month in range(36):
+                start = datetime(2022 + month // 12, month % 12 + 1, 10, 9)
+                slot = Availability(provider=provider, start_time=start, end_time=start + timedelta(minutes=30),
+                                    is_booked=month % 2 == 0)
+                db.session.add(slot)
+                if slot.is_booked:
+                    db.session.add(Appointment(user=patient, provider=provider, availability_slot=slot,
+                                               start_time=slot.start_time, end_time=slot.end_time))
+            db.session.flush()
+            rated = Appointment.query.order_by(Appointment.id).first()
+            db.session.add(Feedback(user_id=patient.id, appointment_id=rated.id, rating=5))
+            db.session.commit()
+            self.rated_id = rated.id
+            self.rated_slot_id = rated.availability_id
+            self.provider_token = create_access_token(identity=provider_user.id)
+            self.patient_token = create_access_token(identity=patient.id)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+            db.engine.dispose()
+        self.tmp.cleanup()
+
+    def get(self, url, token):
+        return self.app.test_client().get(url, headers={'Authorization': f'Bearer {token}'})
+
+    def history(self):
+        slots = self.get('/api/providers/availability', self.provider_token).get_json()['slots']
+        appointments, cursor = [], None
+        while True:
+            page = self.get(f"/api/appointments?limit=4{'&cursor=' + cursor if cursor else ''}",
+                            self.patient_token).get_json()
+            appointments.extend(page['appointments'])
+            cursor = page['next_cursor']
+            if not cursor:
+                return slots, appointments
+
+    def test_archive_moves_past_rows_in_batches(self):
+        before = self.history()
+        self.assertEqual(len(before[0]), 36)
+        self.assertEqual(len(before[1]), 18)
+        starts = [appointment['start_time'] for appointment in before[1]]
+        self.assertEqual(starts, sorted(starts, reverse=True))
+
+        with self.app.app_context():
+            stats = archive_history(datetime(2024, 1, 1), batch_size=5)
+            # 12 booked months before 2024, less the one with feedback
+            self.assertEqual(stats['appointments'], 11)
+            self.assertEqual(stats['availabilities'], 23)
+            self.assertEqual(stats['batches'], 3 + 5)
+            self.assertEqual(ArchivedAppointment.query.count(), 11)
+            self.assertEqual(Availability.query.filter(Availability.end_time < datetime(2024, 1, 1)).count(), 1)
+            self.assertIsNotNone(db.session.get(Appointment, self.rated_id))
+            self.assertIsNotNone(db.session.get(Availability, self.rated_slot_id))
+            self.assertEqual(archive_history(datetime(2024, 1, 1))['batches'], 0)
+
+        self.assertEqual(self.history(), before)
+
+    def test_only_completed_appointments_are_archived(self):
+        with self.app.app_context():
+            pending, cancelled = Appointment.query.order_by(Appointment.id.desc()).offset(6).limit(2)
+            pending.status, cancelled.status = 'pending', 'cancelled'
+            kept = {pending.id, cancelled.id, pending.availability_id, cancelled.availability_id}
+            db.session.commit()
+
+            stats = archive_history(datetime(2024, 1, 1))
+            self.assertEqual(stats['appointments'], 9)
+            self.assertEqual(stats['availabilities'], 21)
+            self.assertEqual({appointment.id for appointment in Appointment.query} & kept,
+                             {pending.id, cancelled.id})
+            self.assertEqual({slot.id for slot in Availability.query} & kept,
+                             {pending.availability_id, cancelled.availability_id})
+
+    def test_archived_slot_cannot_be_booked(self):
+        with self.app.app_context():
+            slot_id = Availability.query.filter_by(is_booked=False).order_by(Availability.id).first().id
+            archive_history(datetime(2024, 1, 1))
+            self.assertIsNotNone(db.session.get(ArchivedAvailability, slot_id))
+        with redirect_stdout(io.StringIO()):
+            response = self.app.test_client().post('/api/appointments/book', json={'slot_id': slot_id}, headers={
+                'Authorization': f'Bearer {self.patient_token}'
+            })
+        self.assertEqual(response.status_code, 404)
+
+    def test_cli_command(self):
+        result = self.app.test_cli_runner().invoke(args=['archive-history', '--older-than-days', '0'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        # The rated appointment and the newest row of each table stay live,
+        # the latter so that SQLite cannot hand its id out again
+        self.assertIn('Archived 16 appointments and 33 slots', result.output)
+        with self.app.app_context():
+            self.assertEqual(Appointment.query.count(), 2)
+            self.assertEqual(Availability.query.count(), 3)
+
+        self.assertEqual(self.get('/api/appointments?cursor=nope', self.patient_token).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
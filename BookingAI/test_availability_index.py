@@ -0,0 +1,112 @@
+import unittest
+from datetime import datetime, timedelta
+
+from . import create_app, db
+from .database.models import Availability
+from .services.availability_index import ProviderIntervals
+
+
+def at(hour, minute=0):
+    return datetime(2030, 1, 7, hour, minute)
+
+
+class TestProviderIntervals(unittest.TestCase):
+
+    def setUp(self):
+        self.intervals = ProviderIntervals([
+            (1, at(9), at(10), False),
+            (2, at(11), at(12), True),
+            (3, at(14), at(16), False),
+        ])
+
+    def test_detects_overlaps(self):
+        self.assertEqual(self.intervals.find_overlap(at(9, 30), at(10, 30)), 1)
+        self.assertEqual(self.intervals.find_overlap(at(10, 30), at(11, 30)), 2)
+        self.assertEqual(self.intervals.find_overlap(at(14, 30), at(15)), 3)
+        self.assertEqual(self.intervals.find_overlap(at(8), at(20)), 3)
+
+    def test_adjacent_slots_do_not_overlap(self):
+        self.assertIsNone(self.intervals.find_overlap(at(10), at(11)))
+        self.assertIsNone(self.intervals.find_overlap(at(12), at(14)))
+        self.assertIsNone(self.intervals.find_overlap(at(7), at(9)))
+
+    def test_add_keeps_order(self):
+        self.intervals.add(4, at(12, 30), at(13), False)
+        self.assertEqual(self.intervals.ids, [1, 2, 4, 3])
+        self.assertEqual(self.intervals.find_overlap(at(12, 45), at(13, 15)), 4)
+
+    def test_long_slot_is_found_behind_short_ones(self):
+        intervals = ProviderIntervals([
+            (1, at(8), at(18), False),
+            (2, at(9), at(9, 30), False),
+            (3, at(10), at(10, 30), False),
+        ])
+        self.assertEqual(intervals.find_overlap(at(17), at(17, 30)), 1)
+
+
+class TestAvailabilityIndexRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True
+        })
+        self.client = self.app.test_client()
+        self.index = self.app.extensions['availability_index']
+
+        self.client.post('/api/users/register', json={
+            'email': 'provider@example.com',
+            'password': 'secret',
+            'full_name': 'Dr. Provider'
+        })
+        response = self.client.post('/api/users/login', json={
+            'email': 'provider@example.com',
+            'password': 'secret'
+        })
+        self.headers = {'Authorization': f"Bearer {response.get_json()['access_token']}"}
+        response = self.client.post('/api/providers/register', headers=self.headers, json={
+            'service_type': 'dentist'
+        })
+        self.provider_id = response.get_json()['provider_id']
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def add_slot(self, start, end):
+        return self.client.post('/api/providers/availability', headers=self.headers, json={
+            'start_time': start.isoformat(),
+            'end_time': end.isoformat()
+        })
+
+    def test_overlapping_slot_is_rejected(self):
+        self.assertEqual(self.add_slot(at(9), at(10)).status_code, 201)
+        self.assertEqual(self.add_slot(at(10), at(11)).status_code, 201)
+        self.assertEqual(self.add_slot(at(9, 30), at(10, 30)).status_code, 409)
+        self.assertTrue(self.index.is_loaded(self.provider_id))
+
+    def test_index_matches_database(self):
+        for hour in range(8, 16):
+            self.add_slot(at(hour), at(hour, 45))
+
+        with self.app.app_context():
+            report = self.index.check_consistency(self.provider_id)
+        self.assertEqual(report, {'missing': [], 'stale': [], 'mismatched': []})
+
+    def test_consistency_check_reports_out_of_band_writes(self):
+        self.add_slot(at(9), at(10))
+        with self.app.app_context():
+            slot = Availability(provider_id=self.provider_id, start_time=at(12), end_time=at(13))
+            db.session.add(slot)
+            db.session.commit()
+
+            report = self.index.check_consistency(self.provider_id, repair=True)
+            self.assertEqual(report['missing'], [slot.id])
+
+        self.assertFalse(self.index.is_loaded(self.provider_id))
+        self.assertEqual(self.add_slot(at(12, 30), at(14)).status_code, 409)
+
+
+if __name__ == '__main__':
+    unittest.main()
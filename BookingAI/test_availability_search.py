@@ -0,0 +1,178 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, text
+
+from . import create_app, db
+from .database.models import User, ServiceProvider, Availability
+from .testing import count_queries
+
+
+class TestAvailabilitySearch(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True
+        })
+        self.client = self.app.test_client()
+        self.base = datetime(2030, 3, 4, 8)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def seed(self, providers, slots_per_provider, service_type='dentist'):
+        with self.app.app_context():
+            for p in range(providers):
+                user = User(
+                    email=f'{service_type}-{p}-{slots_per_provider}@example.com',
+                    password_hash='x',
+                    full_name=f'Dr. {service_type.title()} {p}'
+                )
+                provider = ServiceProvider(user=user, service_type=service_type)
+                db.session.add(provider)
+                for i in range(slots_per_provider):
+                    start = self.base + timedelta(hours=i)
+                    provider.availabilities.append(Availability(
+                        start_time=start,
+                        end_time=start + timedelta(minutes=30),
+                        is_booked=(i % 5 == 4)
+                    ))
+            db.session.commit()
+        # Seeding bypasses the write paths that invalidate cached searches
+        self.app.extensions['search_cache'].clear()
+
+    def search(self, **params):
+        with self.app.app_context():
+            with count_queries(db.engine) as statements:
+                response = self.client.get('/api/availability', query_string=params)
+        return response, statements
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.seed(providers=2, slots_per_provider=5)
+        response, small = self.search(service_type='dentist')
+        self.assertEqual(len(response.get_json()['available_slots']), 8)
+
+        self.seed(providers=10, slots_per_provider=50)
+        response, large = self.search(service_type='dentist')
+        self.assertEqual(len(response.get_json()['available_slots']), 8 + 400)
+
+        self.assertEqual(len(small), 1)
+        self.assertEqual(len(large), 1)
+
+    def test_projection_fields_and_filters(self):
+        self.seed(providers=1, slots_per_provider=3, service_type='dentist')
+        self.seed(providers=1, slots_per_provider=3, service_type='physio')
+
+        response, _ = self.search(service_type='physio', preferred_time='morning')
+        slots = response.get_json()['available_slots']
+        self.assertEqual(len(slots), 3)
+        self.assertEqual({slot['service_type'] for slot in slots}, {'physio'})
+        self.assertEqual(slots[0]['provider_name'], 'Dr. Physio 0')
+        self.assertEqual(slots[0]['end_time'], (self.base + timedelta(minutes=30)).isoformat())
+
+        response, _ = self.search(service_type='physio', preferred_time='afternoon')
+        self.assertEqual(response.get_json()['available_slots'], [])
+
+    def test_day_part_is_stored_on_insert(self):
+        self.seed(providers=1, slots_per_provider=0)
+        with self.app.app_context():
+            provider_id = ServiceProvider.query.first().id
+            hours = [5, 6, 11, 12, 16, 17, 21, 22]
+            db.session.execute(insert(Availability), [{
+                'provider_id': provider_id,
+                'start_time': self.base.replace(hour=hour),
+                'end_time': self.base.replace(hour=hour, minute=30)
+            } for hour in hours])
+            db.session.commit()
+
+            stored = db.session.query(Availability.start_time, Availability.day_part).order_by(Availability.start_time).all()
+            self.assertEqual([day_part for _, day_part in stored], [
+                'night', 'morning', 'morning', 'afternoon', 'afternoon', 'evening', 'evening', 'night'
+            ])
+
+        response, statements = self.search(provider_id=provider_id, preferred_time='evening')
+        self.assertEqual(len(response.get_json()['available_slots']), 2)
+        self.assertIn('day_part', statements[0])
+
+    def test_provider_search_uses_composite_index(self):
+        self.seed(providers=1, slots_per_provider=3)
+        with self.app.app_context():
+            plan = db.session.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM availabilities "
+                "WHERE provider_id = 1 AND is_booked = 0 AND start_time >= '2030-03-04'"
+            )).all()
+        self.assertIn('ix_availabilities_provider_booked_start', ' '.join(row[-1] for row in plan))
+
+    def test_keyset_pages_cover_every_slot_once(self):
+        # Three providers share start times, so pages must break ties on id.
+        self.seed(providers=3, slots_per_provider=10)
+        response, _ = self.search(service_type='dentist')
+        expected = [slot['id'] for slot in response.get_json()['available_slots']]
+
+        seen, cursor = [], None
+        while True:
+            params = {'service_type': 'dentist', 'limit': 7}
+            if cursor:
+                params['cursor'] = cursor
+            response, statements = self.search(**params)
+            body = response.get_json()
+            self.assertLessEqual(len(body['available_slots']), 7)
+            self.assertEqual(len(statements), 1)
+            seen.extend(slot['id'] for slot in body['available_slots'])
+            cursor = body['next_cursor']
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 24)
+
+    def test_invalid_pagination_parameters(self):
+        response, _ = self.search(cursor='not-a-cursor')
+        self.assertEqual(response.status_code, 400)
+        response, _ = self.search(limit=0)
+        self.assertEqual(response.status_code, 400)
+        response, _ = self.search(limit='ten')
+        self.assertEqual(response.status_code, 400)
+
+    def test_ndjson_stream(self):
+        self.seed(providers=2, slots_per_provider=5)
+        response = self.client.get('/api/availability', query_string={
+            'service_type': 'dentist',
+            'format': 'ndjson'
+        })
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(len(lines), 8)
+        starts = [json.loads(line)['start_time'] for line in lines]
+        self.assertEqual(starts, sorted(starts))
+
+        response = self.client.get('/api/availability', query_string={'format': 'ndjson', 'limit': 3})
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 3)
+
+    def test_cache_counters_are_exported(self):
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True,
+            'METRICS_ENABLED': True
+        })
+        self.client = self.app.test_client()
+        self.seed(providers=1, slots_per_provider=5)
+        for service_type in ('dentist', 'dentist', 'physio'):
+            self.search(service_type=service_type)
+
+        text = self.client.get('/metrics').get_data(as_text=True)
+        self.assertIn('# TYPE bookingai_search_cache_hits_total counter', text)
+        self.assertIn('\nbookingai_search_cache_hits_total 1\n', text)
+        self.assertIn('\nbookingai_search_cache_misses_total 2\n', text)
+        self.assertIn('\nbookingai_search_cache_entries 2\n', text)
+        stats = self.app.extensions['search_cache'].stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
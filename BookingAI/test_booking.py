@@ -0,0 +1,82 @@
+import io
+import os
+import tempfile
+import threading
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from . import create_app, db
+from .database.models import User, ServiceProvider, Availability, Appointment
+
+
+class TestBooking(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.tmp.name, 'booking.db')}",
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True
+        })
+        with self.app.app_context():
+            provider_user = User(email='provider@example.com', password_hash='x', full_name='Dr. Provider')
+            provider = ServiceProvider(user=provider_user, service_type='dentist')
+            start = datetime(2030, 6, 3, 9)
+            for i in range(4):
+                provider.availabilities.append(Availability(
+                    start_time=start + timedelta(hours=i),
+                    end_time=start + timedelta(hours=i, minutes=30)
+                ))
+            patients = [User(email=f'patient{i}@example.com', password_hash='x', full_name=f'Patient {i}')
+                        for i in range(8)]
+            db.session.add_all([provider] + patients)
+            db.session.commit()
+            self.slot_ids = [slot.id for slot in provider.availabilities]
+            self.tokens = [create_access_token(identity=patient.id) for patient in patients]
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+            db.engine.dispose()
+        self.tmp.cleanup()
+
+    def book(self, token, slot_id):
+        return self.app.test_client().post('/api/appointments/book', json={'slot_id': slot_id}, headers={
+            'Authorization': f'Bearer {token}'
+        })
+
+    def test_book_and_rebook(self):
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(self.book(self.tokens[0], self.slot_ids[0]).status_code, 201)
+            self.assertEqual(self.book(self.tokens[1], self.slot_ids[0]).status_code, 409)
+            self.assertEqual(self.book(self.tokens[1], 9999).status_code, 404)
+
+        with self.app.app_context():
+            self.assertTrue(db.session.get(Availability, self.slot_ids[0]).is_booked)
+            self.assertEqual(Appointment.query.count(), 1)
+
+    def test_concurrent_bookings_have_exactly_one_winner(self):
+        barrier = threading.Barrier(len(self.tokens))
+        statuses = []
+
+        def worker(token):
+            barrier.wait()
+            statuses.append(self.book(token, self.slot_ids[1]).status_code)
+
+        threads = [threading.Thread(target=worker, args=(token,)) for token in self.tokens]
+        with redirect_stdout(io.StringIO()):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(sorted(statuses), [201] + [409] * (len(self.tokens) - 1))
+        with self.app.app_context():
+            self.assertEqual(Appointment.query.filter_by(availability_id=self.slot_ids[1]).count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+import unittest
+from datetime import date, datetime
+
+from . import create_app, db
+from .database.models import Availability
+from .services.recurrence import expand_recurrence, MAX_RECURRENCE_WEEKS
+
+
+class TestExpandRecurrence(unittest.TestCase):
+
+    def test_weekdays_nine_to_five(self):
+        slots = expand_recurrence({
+            'days': 'weekdays',
+            'start_time': '09:00',
+            'end_time': '17:00',
+            'slot_minutes': 30,
+            'start_date': '2030-01-07',
+            'weeks': 12
+        })
+        self.assertEqual(len(slots), 12 * 5 * 16)
+        self.assertEqual(slots[0], (datetime(2030, 1, 7, 9), datetime(2030, 1, 7, 9, 30)))
+        self.assertEqual(slots[-1][1], datetime(2030, 3, 29, 17))
+        self.assertTrue(all(start.weekday() < 5 for start, _ in slots))
+
+    def test_gap_and_explicit_days(self):
+        slots = expand_recurrence({
+            'days': ['Monday', 'wed'],
+            'start_time': '10:00',
+            'end_time': '12:00',
+            'slot_minutes': 45,
+            'gap_minutes': 15,
+            'start_date': '2030-01-07',
+            'end_date': '2030-01-09'
+        })
+        self.assertEqual([start.date() for start, _ in slots], [date(2030, 1, 7)] * 2 + [date(2030, 1, 9)] * 2)
+        self.assertEqual(slots[1][0], datetime(2030, 1, 7, 11))
+
+    def test_invalid_rules(self):
+        base = {'start_time': '09:00', 'end_time': '17:00', 'slot_minutes': 30, 'start_date': '2030-01-07', 'weeks': 1}
+        for change in ({'days': ['funday']}, {'slot_minutes': 0}, {'end_time': '08:00'}, {'weeks': 500}):
+            with self.assertRaises(ValueError):
+                expand_recurrence({**base, **change})
+        with self.assertRaises(ValueError):
+            expand_recurrence({'start_time': '09:00'})
+
+    def test_span_and_days_are_bounded(self):
+        base = {'start_time': '09:00', 'end_time': '17:00', 'slot_minutes': 30, 'start_date': '2030-01-07'}
+        for change in (
+            {'weeks': 10 ** 9},
+            {'weeks': MAX_RECURRENCE_WEEKS + 1},
+            {'days': [], 'end_date': '2031-12-31'},
+            {'days': 'sun', 'start_date': '9999-12-26', 'end_date': '9999-12-31', 'end_time': '23:59'},
+            {'slot_minutes': 10 ** 12},
+        ):
+            with self.subTest(change=change), self.assertRaises(ValueError):
+                expand_recurrence({**base, **change})
+        slots = expand_recurrence({**base, 'days': 'sun', 'weeks': MAX_RECURRENCE_WEEKS})
+        self.assertEqual(len(slots), MAX_RECURRENCE_WEEKS * 16)
+
+
+class TestBulkAvailabilityRoute(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True
+        })
+        self.client = self.app.test_client()
+        self.client.post('/api/users/register', json={
+            'email': 'bulk@example.com', 'password': 'secret', 'full_name': 'Dr. Bulk'
+        })
+        token = self.client.post('/api/users/login', json={
+            'email': 'bulk@example.com', 'password': 'secret'
+        }).get_json()['access_token']
+        self.headers = {'Authorization': f'Bearer {token}'}
+        self.provider_id = self.client.post('/api/providers/register', headers=self.headers, json={
+            'service_type': 'dentist'
+        }).get_json()['provider_id']
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def bulk(self, **body):
+        return self.client.post('/api/providers/availability/bulk', headers=self.headers, json=body)
+
+    def test_recurrence_is_inserted_in_one_batch(self):
+        existing = self.client.post('/api/providers/availability', headers=self.headers, json={
+            'start_time': '2030-01-07T09:15:00', 'end_time': '2030-01-07T09:45:00'
+        }).get_json()['slot_id']
+
+        response = self.bulk(recurrence={
+            'days': 'weekdays', 'start_time': '09:00', 'end_time': '12:00',
+            'slot_minutes': 30, 'start_date': '2030-01-07', 'weeks': 2
+        })
+        body = response.get_json()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(body['created'], 10 * 6 - 2)
+        self.assertEqual([c['conflicting_slot_id'] for c in body['conflicts']], [existing, existing])
+
+        with self.app.app_context():
+            stored = Availability.query.filter(Availability.id.in_(body['slot_ids'])).all()
+            self.assertEqual(len(stored), body['created'])
+            self.assertTrue(all(slot.day_part == 'morning' for slot in stored))
+            report = self.app.extensions['availability_index'].check_consistency(self.provider_id)
+        self.assertEqual(report, {'missing': [], 'stale': [], 'mismatched': []})
+
+    def test_explicit_slots_report_conflicts_within_request(self):
+        response = self.bulk(slots=[
+            {'start_time': '2030-02-01T10:00:00', 'end_time': '2030-02-01T11:00:00'},
+            {'start_time': '2030-02-01T10:30:00', 'end_time': '2030-02-01T11:30:00'},
+            {'start_time': '2030-02-01T12:00:00', 'end_time': '2030-02-01T11:00:00'},
+        ])
+        body = response.get_json()
+        self.assertEqual(body['created'], 1)
+        self.assertEqual(sorted(c['reason'] for c in body['conflicts']), ['invalid_range', 'overlaps_request'])
+
+        # Everything now overlaps an existing slot.
+        response = self.bulk(slots=[{'start_time': '2030-02-01T10:00:00', 'end_time': '2030-02-01T10:30:00'}])
+        self.assertEqual(response.status_code, 409)
+
+    def test_atomic_rejects_whole_batch(self):
+        self.bulk(slots=[{'start_time': '2030-02-01T10:00:00', 'end_time': '2030-02-01T11:00:00'}])
+        response = self.bulk(atomic=True, slots=[
+            {'start_time': '2030-02-01T09:00:00', 'end_time': '2030-02-01T10:00:00'},
+            {'start_time': '2030-02-01T10:30:00', 'end_time': '2030-02-01T11:30:00'},
+        ])
+        self.assertEqual(response.status_code, 409)
+        with self.app.app_context():
+            self.assertEqual(Availability.query.count(), 1)
+
+    def test_bad_requests(self):
+        self.assertEqual(self.bulk().status_code, 400)
+        self.assertEqual(self.bulk(recurrence={'days': 'weekdays'}).status_code, 400)
+        self.assertEqual(self.bulk(recurrence={
+            'days': 'weekdays', 'start_time': '09:00', 'end_time': '17:00', 'slot_minutes': 30,
+            'start_date': '2030-01-07', 'weeks': 99999999999
+        }).status_code, 400)
+        self.assertEqual(self.bulk(slots=[{'start_time': 'soon'}]).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+
+from . import create_app, db
+from .database.models import Broadcast, BroadcastReadMarker, Message
+
+
+class TestCallBroadcasts(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True,
+            'OUTBOX_TRANSPORT': 'fake'
+        })
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def login(self, email, service_type=None):
+        self.client.post('/api/users/register', json={'email': email, 'password': 'secret', 'full_name': email})
+        token = self.client.post('/api/users/login', json={
+            'email': email, 'password': 'secret'
+        }).get_json()['access_token']
+        headers = {'Authorization': f'Bearer {token}'}
+        if service_type:
+            self.client.post('/api/providers/register', headers=headers, json={'service_type': service_type})
+        return headers
+
+    def inbox(self, headers):
+        return self.client.get('/api/messages', headers=headers).get_json()['messages']
+
+    def test_call_request_is_stored_once_and_read_per_agent(self):
+        dentists = [self.login(f'dentist{i}@example.com', 'dentist') for i in range(3)]
+        physio = self.login('physio@example.com', 'physio')
+        patient = self.login('patient@example.com')
+
+        response = self.client.post('/api/appointments/call', headers=patient, json={
+            'service_type': 'dentist',
+            'phone_number': '555-0100',
+            'preferred_time': 'morning',
+            'preferred_date': '2030-01-07'
+        })
+        self.assertEqual(response.status_code, 201)
+        call_request_id = response.get_json()['call_request_id']
+        late_dentist = self.login('late@example.com', 'dentist')
+
+        with self.app.app_context():
+            self.assertEqual(Broadcast.query.count(), 1)
+            self.assertEqual(Message.query.count(), 0)
+
+        for headers in dentists:
+            items = self.inbox(headers)
+            self.assertEqual(len(items), 1)
+            self.assertEqual(items[0]['kind'], 'broadcast')
+            self.assertEqual(items[0]['call_request_id'], call_request_id)
+            self.assertEqual(items[0]['sender_name'], 'patient@example.com')
+            self.assertFalse(items[0]['is_read'])
+        self.assertEqual(self.inbox(physio), [])
+        self.assertEqual(self.inbox(late_dentist), [])
+
+        broadcast_id = self.inbox(dentists[0])[0]['id']
+        response = self.client.put(f'/api/broadcasts/{broadcast_id}/read', headers=dentists[0])
+        self.assertEqual(response.get_json(), {'topic': 'dentist', 'last_read_id': broadcast_id})
+        self.assertTrue(self.inbox(dentists[0])[0]['is_read'])
+        self.assertFalse(self.inbox(dentists[1])[0]['is_read'])
+
+    def test_read_markers_only_move_forward(self):
+        agent = self.login('agent@example.com', 'dentist')
+        patient = self.login('patient@example.com')
+        for day in (7, 8):
+            self.client.post('/api/appointments/call', headers=patient, json={
+                'service_type': 'dentist',
+                'phone_number': '555-0100',
+                'preferred_time': 'morning',
+                'preferred_date': f'2030-01-0{day}'
+            })
+        newest, oldest = [item['id'] for item in self.inbox(agent)]
+
+        self.client.put(f'/api/broadcasts/{newest}/read', headers=agent)
+        response = self.client.put(f'/api/broadcasts/{oldest}/read', headers=agent)
+        self.assertEqual(response.get_json()['last_read_id'], newest)
+        self.assertTrue(all(item['is_read'] for item in self.inbox(agent)))
+        self.assertEqual(self.client.put('/api/broadcasts/999/read', headers=agent).status_code, 404)
+
+    def test_broadcasts_outside_the_inbox_cannot_be_marked_read(self):
+        dentist = self.login('dentist@example.com', 'dentist')
+        physio = self.login('physio@example.com', 'physio')
+        patient = self.login('patient@example.com')
+        self.client.post('/api/appointments/call', headers=patient, json={
+            'service_type': 'dentist',
+            'phone_number': '555-0100',
+            'preferred_time': 'morning',
+            'preferred_date': '2030-01-07'
+        })
+        late_dentist = self.login('late@example.com', 'dentist')
+        broadcast_id = self.inbox(dentist)[0]['id']
+
+        for headers in (physio, patient, late_dentist):
+            response = self.client.put(f'/api/broadcasts/{broadcast_id}/read', headers=headers)
+            self.assertEqual(response.status_code, 404)
+        with self.app.app_context():
+            self.assertEqual(BroadcastReadMarker.query.count(), 0)
+        self.assertEqual(self.client.put(f'/api/broadcasts/{broadcast_id}/read', headers=dentist).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import os
+import tempfile
+import unittest
+
+from . import create_app, db
+from .services.call_sessions import MemorySessionStore, SQLiteSessionStore, new_session, append_turn
+from .testing import FakeClock
+
+
+class StoreBehaviour:
+
+    def make_store(self, **kwargs):
+        raise NotImplementedError
+
+    def test_roundtrip_and_delete(self):
+        store = self.make_store()
+        session = new_session('555-0100', 'dentist')
+        append_turn(session, 'assistant', 'Hello')
+        store.save('call-1', session)
+
+        self.assertEqual(store.get('call-1')['history'][0]['content'], 'Hello')
+        self.assertTrue(store.delete('call-1'))
+        self.assertIsNone(store.get('call-1'))
+        self.assertFalse(store.delete('call-1'))
+
+    def test_idle_sessions_expire(self):
+        clock = FakeClock(1000.0)
+        store = self.make_store(idle_ttl=60, clock=clock)
+        store.save('idle', new_session('555-0100', 'dentist'))
+        store.save('active', new_session('555-0101', 'dentist'))
+        clock.now += 45
+        store.save('active', store.get('active'))
+        clock.now += 30
+
+        self.assertIsNone(store.get('idle'))
+        self.assertIsNotNone(store.get('active'))
+        store.purge_expired()
+        self.assertEqual(len(store), 1)
+
+    def test_oldest_sessions_evicted_past_capacity(self):
+        clock = FakeClock(1000.0)
+        store = self.make_store(max_sessions=2, clock=clock)
+        for call_id in ('a', 'b', 'c'):
+            clock.now += 1
+            store.save(call_id, new_session('555-0100', 'dentist'))
+
+        self.assertIsNone(store.get('a'))
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.evictions, 1)
+
+
+class TestMemorySessionStore(StoreBehaviour, unittest.TestCase):
+
+    def make_store(self, **kwargs):
+        return MemorySessionStore(**kwargs)
+
+
+class TestSQLiteSessionStore(StoreBehaviour, unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'sessions.sqlite')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_store(self, **kwargs):
+        return SQLiteSessionStore(self.path, **kwargs)
+
+
+class TestHistoryWindow(unittest.TestCase):
+
+    def test_history_keeps_latest_turns(self):
+        session = new_session('555-0100', 'dentist')
+        for i in range(10):
+            append_turn(session, 'user', f'turn {i}', max_history=4)
+
+        self.assertEqual([turn['content'] for turn in session['history']], ['turn 6', 'turn 7', 'turn 8', 'turn 9'])
+        self.assertEqual(session['turns'], 10)
+
+
+class TestCallRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.config = {
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True,
+            'CALL_HISTORY_LIMIT': 4
+        }
+        self.app = create_app(self.config)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+        self.tmp.cleanup()
+
+    def start_call(self, client):
+        response = client.post('/api/call/start', json={'phone_number': '555-0100', 'department': 'dentist'})
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()['call_id']
+
+    def test_history_is_windowed_and_end_removes_session(self):
+        call_id = self.start_call(self.client)
+        for _ in range(5):
+            response = self.client.post(f'/api/call/{call_id}/interact', json={'message': 'what are your hours'})
+            self.assertEqual(response.status_code, 200)
+
+        session = self.app.extensions['call_sessions'].get(call_id)
+        self.assertEqual(len(session['history']), 4)
+        self.assertEqual(session['turns'], 11)
+
+        self.assertEqual(self.client.post(f'/api/call/{call_id}/end').status_code, 200)
+        self.assertEqual(self.client.post(f'/api/call/{call_id}/interact', json={'message': 'hi'}).status_code, 404)
+
+    def test_sqlite_sessions_are_shared_between_workers(self):
+        shared = {
+            **self.config,
+            'CALL_SESSION_BACKEND': 'sqlite',
+            'CALL_SESSION_PATH': os.path.join(self.tmp.name, 'sessions.sqlite')
+        }
+        first, second = create_app(shared), create_app(shared)
+
+        call_id = self.start_call(first.test_client())
+        response = second.test_client().post(f'/api/call/{call_id}/interact', json={'message': 'help'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(first.extensions['call_sessions'].get(call_id)['turns'], 3)
+
+        for app in (first, second):
+            with app.app_context():
+                db.drop_all()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from . import create_app, db
+from .database.engine import database_uri, engine_options
+
+
+class TestEngineOptions(unittest.TestCase):
+
+    def test_in_memory_sqlite_keeps_driver_defaults(self):
+        self.assertEqual(engine_options({'SQLALCHEMY_DATABASE_URI': 'sqlite://'}), {})
+        self.assertEqual(engine_options({'SQLALCHEMY_DATABASE_URI': 'sqlite:///:memory:'}), {})
+
+    def test_file_sqlite_gets_pool_and_busy_timeout(self):
+        options = engine_options({'SQLALCHEMY_DATABASE_URI': 'sqlite:///appointments.db', 'SQLITE_BUSY_TIMEOUT_MS': 2500})
+        self.assertEqual(options['pool_size'], 10)
+        self.assertEqual(options['connect_args']['timeout'], 2.5)
+        self.assertNotIn('pool_pre_ping', options)
+
+    def test_server_database_gets_pre_ping(self):
+        options = engine_options({'SQLALCHEMY_DATABASE_URI': 'postgresql://app@db/bookings', 'DB_POOL_SIZE': 5})
+        self.assertEqual(options['pool_size'], 5)
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertEqual(options['pool_recycle'], 1800)
+
+    def test_database_url_environment_variable(self):
+        with mock.patch.dict(os.environ, {'DATABASE_URL': 'postgresql://app@db/bookings'}):
+            self.assertEqual(database_uri(), 'postgresql://app@db/bookings')
+        with mock.patch.dict(os.environ, clear=True):
+            self.assertEqual(database_uri(), 'sqlite:///appointments.db')
+
+
+class TestSQLitePragmas(unittest.TestCase):
+
+    def test_file_database_connections_are_tuned(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = create_app({
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'tuned.db')}",
+                'OUTBOX_AUTOSTART': False,
+                'SQLITE_BUSY_TIMEOUT_MS': 1234
+            })
+            with app.app_context():
+                with db.engine.connect() as connection:
+                    pragma = lambda name: connection.exec_driver_sql(f"PRAGMA {name}").scalar()
+                    self.assertEqual(pragma('journal_mode'), 'wal')
+                    self.assertEqual(pragma('synchronous'), 1)  # NORMAL
+                    self.assertEqual(pragma('busy_timeout'), 1234)
+                db.engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
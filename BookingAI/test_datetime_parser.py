@@ -0,0 +1,126 @@
+import unittest
+from datetime import date, datetime, time, timedelta
+
+from . import create_app, db
+from .database.models import User, ServiceProvider, Availability
+from .services import datetime_parser
+from .services.datetime_parser import parse_datetime, requested_window
+
+# A Friday
+REFERENCE = date(2026, 10, 16)
+
+
+class TestParseDatetime(unittest.TestCase):
+
+    def assertParsed(self, text, expected_date, expected_time=None, day_part=None):
+        parsed = parse_datetime(text, REFERENCE)
+        self.assertEqual((parsed.date, parsed.time, parsed.day_part), (expected_date, expected_time, day_part), text)
+
+    def test_absolute_dates(self):
+        self.assertParsed("I'd like to schedule for March 15th at 2 PM", date(2027, 3, 15), time(14))
+        self.assertParsed("book 15th march at 10:30 am", date(2027, 3, 15), time(10, 30))
+        self.assertParsed("the 1st of december at 9", date(2026, 12, 1), time(9))
+        self.assertParsed("dec. 3rd at 5 p.m.", date(2026, 12, 3), time(17))
+        self.assertParsed("March 15 2031 14:00", date(2031, 3, 15), time(14))
+        self.assertParsed("2031-03-15 at noon", date(2031, 3, 15), time(12))
+        self.assertParsed("3/15 at 4pm", date(2027, 3, 15), time(16))
+
+    def test_dates_without_year_roll_forward(self):
+        self.assertParsed("16 october", date(2026, 10, 16))
+        self.assertParsed("15 october", date(2027, 10, 15))
+
+    def test_relative_dates(self):
+        self.assertParsed("tomorrow afternoon", date(2026, 10, 17), day_part='afternoon')
+        self.assertParsed("day after tomorrow at 11", date(2026, 10, 18), time(11))
+        self.assertParsed("tonight", REFERENCE, day_part='evening')
+        self.assertParsed("next Tuesday at 3", date(2026, 10, 20), time(15))
+        self.assertParsed("this friday at 9am", REFERENCE, time(9))
+        self.assertParsed("next friday", date(2026, 10, 23))
+        self.assertParsed("in 2 weeks at noon", date(2026, 10, 30), time(12))
+        self.assertParsed("in three days", date(2026, 10, 19))
+
+    def test_bare_hour_follows_day_part(self):
+        self.assertParsed("monday morning at 9", date(2026, 10, 19), time(9), 'morning')
+        self.assertParsed("monday evening at 7", date(2026, 10, 19), time(19), 'evening')
+
+    def test_invalid_parts_are_none(self):
+        self.assertParsed("31 april at 2pm", None, time(14))
+        self.assertParsed("at 13 pm", None)
+        self.assertParsed("hello there", None)
+
+    def test_dates_past_the_calendar_are_none(self):
+        self.assertParsed("book in 99999999999 weeks at 3pm", None, time(15))
+        self.assertParsed("book in 5000000 days at 2pm", None, time(14))
+        self.assertParsed("book 31 december 9999 at 11pm", date(9999, 12, 31), time(23))
+        # The hour-long window would end in the year 10000
+        self.assertIsNone(requested_window(parse_datetime("book 31 december 9999 at 11pm", REFERENCE)))
+
+    def test_repeated_utterances_hit_the_cache(self):
+        datetime_parser.cache_clear()
+        for _ in range(3):
+            parse_datetime("Tomorrow  at 3 PM", datetime(2026, 10, 16, 9))
+        parse_datetime("tomorrow at 3 pm", REFERENCE)
+        info = datetime_parser.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 3))
+
+    def test_requested_window(self):
+        start, end = requested_window(parse_datetime("tomorrow at 3pm", REFERENCE))
+        self.assertEqual((start, end), (datetime(2026, 10, 17, 15), datetime(2026, 10, 17, 16)))
+        start, end = requested_window(parse_datetime("tomorrow afternoon", REFERENCE))
+        self.assertEqual((start, end), (datetime(2026, 10, 17, 12), datetime(2026, 10, 17, 17)))
+        self.assertIsNone(requested_window(parse_datetime("tomorrow", REFERENCE)))
+
+
+class TestAiCallScheduling(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'OUTBOX_AUTOSTART': False, 'TESTING': True})
+        self.client = self.app.test_client()
+        self.tomorrow = datetime.combine(datetime.utcnow().date() + timedelta(days=1), time())
+        with self.app.app_context():
+            provider = ServiceProvider(
+                user=User(email='provider@example.com', password_hash='x', full_name='Dr. Provider'),
+                service_type='dentist'
+            )
+            db.session.add(provider)
+            db.session.flush()
+            db.session.add(Availability(
+                provider_id=provider.id,
+                start_time=self.tomorrow + timedelta(hours=14),
+                end_time=self.tomorrow + timedelta(hours=14, minutes=30)
+            ))
+            db.session.commit()
+        response = self.client.post('/api/call/start', json={'phone_number': '555-0100', 'department': 'dentist'})
+        self.call_id = response.get_json()['call_id']
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def interact(self, message):
+        response = self.client.post(f'/api/call/{self.call_id}/interact', json={'message': message})
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_relative_request_finds_slot(self):
+        reply = self.interact('Can I book tomorrow afternoon?')
+        self.assertTrue(reply['appointment_scheduled'])
+        self.assertIn('in the afternoon', reply['message'])
+
+    def test_ordinal_date_without_minutes(self):
+        day = self.tomorrow.day
+        suffix = 'th' if 10 <= day % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')
+        reply = self.interact(f"I'd like to book {day}{suffix} {self.tomorrow:%B} at 2 PM")
+        self.assertTrue(reply['appointment_scheduled'])
+        self.assertEqual(reply['appointment_details']['time'], '02:00 PM')
+
+    def test_date_past_the_calendar_asks_again(self):
+        for message in ("book in 99999999999 weeks at 3pm", "book in 5000000 days at 2pm",
+                        "book 31 december 9999 at 11pm"):
+            with self.subTest(message=message):
+                reply = self.interact(message)
+                self.assertIn('Could you please tell me what date and time you\'d prefer', reply['message'])
+
+
+if __name__ == '__main__':
+    unittest.main()
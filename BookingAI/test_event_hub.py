@@ -0,0 +1,162 @@
+import threading
+import unittest
+from datetime import datetime
+
+from flask_jwt_extended import create_access_token
+
+from . import create_app, db
+from .database.models import User, ServiceProvider
+from .services.event_hub import EventHub, user_channel, topic_channel
+
+
+class TestEventHub(unittest.TestCase):
+
+    def test_publish_reaches_only_subscribed_channels(self):
+        hub = EventHub()
+        alice = hub.subscribe([user_channel(1)])
+        bob = hub.subscribe([user_channel(2), topic_channel('dentist')])
+
+        hub.publish(user_channel(1), 'message', {'n': 1})
+        hub.publish(topic_channel('dentist'), 'call_request', {'n': 2})
+
+        self.assertEqual([event.type for event in alice.wait(0)], ['message'])
+        self.assertEqual([event.type for event in bob.wait(0)], ['call_request'])
+        self.assertEqual(alice.wait(0), [])
+
+    def test_wait_wakes_up_on_publish(self):
+        hub = EventHub()
+        subscription = hub.subscribe([user_channel(1)])
+        timer = threading.Timer(0.05, hub.publish, args=(user_channel(1), 'message', {}))
+        timer.start()
+        events = subscription.wait(5)
+        timer.join()
+        self.assertEqual(len(events), 1)
+
+    def test_resume_replays_missed_events_in_order(self):
+        hub = EventHub()
+        first = hub.publish(user_channel(1), 'message', {'n': 1})
+        hub.publish(topic_channel('dentist'), 'call_request', {'n': 2})
+        hub.publish(user_channel(1), 'message', {'n': 3})
+        hub.publish(user_channel(2), 'message', {'n': 4})
+
+        subscription = hub.subscribe([user_channel(1), topic_channel('dentist')], last_event_id=first.id)
+        self.assertEqual([event.data['n'] for event in subscription.wait(0)], [2, 3])
+        self.assertFalse(subscription.resync)
+
+    def test_resume_past_history_flags_resync(self):
+        hub = EventHub(history_size=2)
+        first = hub.publish(user_channel(1), 'message', {'n': 1})
+        for n in range(2, 5):
+            hub.publish(user_channel(1), 'message', {'n': n})
+
+        subscription = hub.subscribe([user_channel(1)], last_event_id=first.id)
+        self.assertTrue(subscription.resync)
+        self.assertEqual([event.data['n'] for event in subscription.wait(0)], [3, 4])
+
+    def test_close_unsubscribes(self):
+        hub = EventHub()
+        subscription = hub.subscribe([user_channel(1), topic_channel('dentist')])
+        self.assertEqual(hub.stats()['subscribers'], 1)
+        subscription.close()
+        self.assertEqual(hub.stats(), {'subscribers': 0, 'channels': 0, 'published': 0})
+
+
+class TestEventRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True,
+            'OUTBOX_TRANSPORT': 'fake'
+        })
+        self.client = self.app.test_client()
+        self.hub = self.app.extensions['event_hub']
+        with self.app.app_context():
+            alice = User(email='alice@example.com', password_hash='x', full_name='Alice')
+            agent = ServiceProvider(
+                user=User(email='agent@example.com', password_hash='x', full_name='Agent'),
+                service_type='dentist',
+                created_at=datetime(2000, 1, 1)
+            )
+            db.session.add_all([alice, agent])
+            db.session.commit()
+            self.alice, self.agent = alice.id, agent.user_id
+            self.tokens = {user_id: create_access_token(identity=user_id) for user_id in (self.alice, self.agent)}
+        self.headers = {user_id: {'Authorization': f'Bearer {token}'} for user_id, token in self.tokens.items()}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def poll(self, user_id, **params):
+        response = self.client.get('/api/events/poll', headers=self.headers[user_id],
+                                   query_string={'timeout': 0, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_call_request_lifecycle_is_pushed(self):
+        response = self.client.post('/api/appointments/call', headers=self.headers[self.alice], json={
+            'service_type': 'dentist',
+            'phone_number': '555-0100',
+            'preferred_time': 'morning',
+            'preferred_date': '2030-01-01'
+        })
+        call_id = response.get_json()['call_request_id']
+        self.client.post(f'/api/appointments/call/{call_id}/accept', headers=self.headers[self.agent])
+        self.client.post(f'/api/appointments/call/{call_id}/complete', headers=self.headers[self.agent])
+
+        agent_events = self.poll(self.agent, last_event_id=0)['events']
+        self.assertEqual([event['type'] for event in agent_events], ['call_request', 'call_request_updated'])
+        alice_events = self.poll(self.alice, last_event_id=0)['events']
+        self.assertEqual([event['type'] for event in alice_events], ['call_request_accepted', 'call_request_completed'])
+        self.assertTrue(all(event['data']['call_request_id'] == call_id for event in alice_events))
+
+    def test_poll_resumes_from_last_event_id(self):
+        self.client.post('/api/messages', headers=self.headers[self.agent], json={
+            'receiver_id': self.alice, 'content': 'first'
+        })
+        page = self.poll(self.alice, last_event_id=0)
+        self.assertEqual([event['data']['content'] for event in page['events']], ['first'])
+
+        self.client.post('/api/messages', headers=self.headers[self.agent], json={
+            'receiver_id': self.alice, 'content': 'second'
+        })
+        page = self.poll(self.alice, last_event_id=page['last_event_id'])
+        self.assertEqual([event['data']['content'] for event in page['events']], ['second'])
+        self.assertFalse(page['resync'])
+
+        empty = self.poll(self.alice, last_event_id=page['last_event_id'])
+        self.assertEqual(empty['events'], [])
+        self.assertEqual(empty['last_event_id'], page['last_event_id'])
+
+    def test_stream_replays_after_last_event_id(self):
+        self.client.post('/api/messages', headers=self.headers[self.agent], json={
+            'receiver_id': self.alice, 'content': 'missed while offline'
+        })
+        response = self.client.get('/api/events', query_string={'jwt': self.tokens[self.alice]},
+                                   headers={'Last-Event-ID': '0'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(self.hub.stats()['subscribers'], 1)
+
+        frames = iter(response.response)
+        self.assertTrue(next(frames).startswith(b'retry:'))
+        frame = next(frames).decode()
+        self.assertIn('event: message\n', frame)
+        self.assertIn('missed while offline', frame)
+
+        response.close()
+        self.assertEqual(self.hub.stats()['subscribers'], 0)
+
+    def test_invalid_last_event_id_is_rejected(self):
+        response = self.client.get('/api/events/poll', headers=self.headers[self.alice],
+                                   query_string={'last_event_id': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_stream_requires_authentication(self):
+        self.assertEqual(self.client.get('/api/events').status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+
+from . import create_app, db
+
+
+class TestFastStart(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.tmp.name, 'fast.db')}",
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True,
+            'FAST_START': True
+        })
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+            db.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_schema_and_routes_are_deferred(self):
+        self.assertNotIn('identities', self.app.extensions)
+        with self.app.app_context():
+            self.assertEqual(db.inspect(db.engine).get_table_names(), [])
+
+        result = self.app.test_cli_runner().invoke(args=['init-db'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        with self.app.app_context():
+            self.assertIn('availabilities', db.inspect(db.engine).get_table_names())
+
+        response = self.app.test_client().get('/api/availability')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json(), {'available_slots': []})
+        self.assertIn('identities', self.app.extensions)
+
+    def test_api_docs_are_built_on_first_hit(self):
+        client = self.app.test_client()
+        self.assertEqual(client.get('/apidocs/').status_code, 200)
+        spec = client.get('/apispec_1.json')
+        self.assertEqual(spec.status_code, 200)
+        eager = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'OUTBOX_AUTOSTART': False, 'TESTING': True})
+        self.assertEqual(spec.get_json(), eager.test_client().get('/apispec_1.json').get_json())
+        self.assertEqual(client.get('/flasgger_static/swagger-ui.css').status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from . import create_app, db
+from .database.models import User, ServiceProvider
+from .testing import FakeClock
+
+
+class TestIdentityResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'OUTBOX_AUTOSTART': False, 'TESTING': True})
+        self.identities = self.app.extensions['identities']
+        self.clock = FakeClock()
+        self.identities._clock = self.clock
+        with self.app.app_context():
+            provider = ServiceProvider(
+                user=User(email='provider@example.com', password_hash='x', full_name='Dr. Provider'),
+                service_type='dentist'
+            )
+            patient = User(email='patient@example.com', password_hash='x', full_name='Patient')
+            db.session.add_all([provider, patient])
+            db.session.commit()
+            self.provider_user_id, self.provider_id, self.patient_id = provider.user_id, provider.id, patient.id
+        self.statements = 0
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def count_statements(self):
+        def before_execute(*args):
+            self.statements += 1
+        with self.app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_execute)
+        self.addCleanup(event.remove, engine, 'before_cursor_execute', before_execute)
+
+    def test_lookups_are_cached_across_requests(self):
+        self.count_statements()
+        with self.app.test_request_context():
+            identity = self.identities.provider(self.provider_user_id)
+            self.assertEqual(identity.provider_id, self.provider_id)
+            self.assertEqual(identity.service_type, 'dentist')
+            self.assertEqual(identity.full_name, 'Dr. Provider')
+        self.assertEqual(self.statements, 1)
+
+        with self.app.test_request_context():
+            self.assertEqual(self.identities.by_provider_id(self.provider_id), identity)
+            self.assertIsNone(self.identities.provider(self.patient_id))
+            self.assertEqual(self.identities.user(self.patient_id).email, 'patient@example.com')
+        self.assertEqual(self.statements, 2)
+
+        self.clock.now = 31
+        with self.app.test_request_context():
+            self.identities.user(self.provider_user_id)
+        self.assertEqual(self.statements, 3)
+
+    def test_request_memo_without_shared_cache(self):
+        self.identities.ttl = 0
+        self.count_statements()
+        with self.app.test_request_context():
+            self.identities.user(self.patient_id)
+            self.identities.provider(self.patient_id)
+        with self.app.test_request_context():
+            self.identities.user(self.patient_id)
+        self.assertEqual(self.statements, 2)
+        self.assertEqual(self.identities.stats()['entries'], 0)
+
+    def test_provider_registration_invalidates(self):
+        headers = {'Authorization': f'Bearer {self.token(self.patient_id)}'}
+        client = self.app.test_client()
+        self.assertEqual(client.get('/api/providers/availability', headers=headers).status_code, 403)
+
+        response = client.post('/api/providers/register', headers=headers, json={'service_type': 'optician'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(client.get('/api/providers/availability', headers=headers).status_code, 200)
+        self.assertEqual(client.post('/api/providers/register', headers=headers, json={
+            'service_type': 'optician'
+        }).status_code, 409)
+
+        with self.app.app_context():
+            self.assertEqual(self.identities.provider(self.patient_id).service_type, 'optician')
+
+    def token(self, user_id):
+        with self.app.app_context():
+            return create_access_token(identity=user_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
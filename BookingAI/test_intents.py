@@ -0,0 +1,57 @@
+import unittest
+
+from . import create_app, db
+from .benchmarks.intent_corpus import CORPUS, BOUNDARY_FIXES, legacy_intent
+from .services.intents import Intent, IntentMatcher, match_intent
+
+
+class TestIntentMatcher(unittest.TestCase):
+
+    def test_corpus_matches_legacy_chain(self):
+        for utterance, expected in CORPUS:
+            with self.subTest(utterance=utterance):
+                self.assertEqual(legacy_intent(utterance), expected)
+                self.assertEqual(match_intent(utterance), expected)
+
+    def test_keywords_only_match_whole_words(self):
+        for utterance, legacy, expected in BOUNDARY_FIXES:
+            with self.subTest(utterance=utterance):
+                self.assertEqual(legacy_intent(utterance), legacy)
+                self.assertEqual(match_intent(utterance), expected)
+
+    def test_lowest_priority_number_wins_regardless_of_position(self):
+        matcher = IntentMatcher([
+            Intent('greeting', 1, ('hello',)),
+            Intent('urgent', 0, ('right now',)),
+        ], default='none')
+        self.assertEqual(matcher.match('hello, I need someone right   now'), 'urgent')
+        self.assertEqual(matcher.match('HELLO'), 'greeting')
+        self.assertEqual(matcher.match('hi'), 'none')
+
+
+class TestAiCallIntents(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'OUTBOX_AUTOSTART': False, 'TESTING': True})
+        self.client = self.app.test_client()
+        response = self.client.post('/api/call/start', json={'phone_number': '555-0100', 'department': 'dentist'})
+        self.call_id = response.get_json()['call_id']
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def reply(self, message):
+        response = self.client.post(f'/api/call/{self.call_id}/interact', json={'message': message})
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()['message']
+
+    def test_reschedule_is_not_treated_as_schedule(self):
+        self.assertIn('reschedule your appointment', self.reply('I need to reschedule'))
+
+    def test_hours_reply_names_department(self):
+        self.assertIn('Our dentist department is open', self.reply('When are you open?'))
+
+
+if __name__ == '__main__':
+    unittest.main()
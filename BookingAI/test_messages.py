@@ -0,0 +1,147 @@
+import unittest
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+
+from . import create_app, db
+from .database.models import User, ServiceProvider, Message
+from .services.inbox import recount_unread_messages
+from .testing import count_queries
+
+
+class TestMessages(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True,
+            'OUTBOX_TRANSPORT': 'fake'
+        })
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            alice = User(email='alice@example.com', password_hash='x', full_name='Alice')
+            bob = User(email='bob@example.com', password_hash='x', full_name='Bob')
+            agent = ServiceProvider(
+                user=User(email='agent@example.com', password_hash='x', full_name='Agent'),
+                service_type='dentist'
+            )
+            db.session.add_all([alice, bob, agent])
+            db.session.commit()
+            self.alice, self.bob, self.agent = alice.id, bob.id, agent.user_id
+            self.headers = {
+                user_id: {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+                for user_id in (self.alice, self.bob, self.agent)
+            }
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def send(self, sender, receiver, content):
+        response = self.client.post('/api/messages', headers=self.headers[sender], json={
+            'receiver_id': receiver, 'content': content
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()['message_id']
+
+    def inbox(self, user_id, **params):
+        return self.client.get('/api/messages', headers=self.headers[user_id], query_string=params).get_json()
+
+    def unread(self, user_id):
+        return self.client.get('/api/messages/unread_count', headers=self.headers[user_id]).get_json()['unread_count']
+
+    def test_inbox_is_one_query_regardless_of_size(self):
+        self.send(self.alice, self.bob, 'hi')
+        with self.app.app_context():
+            with count_queries(db.engine) as small:
+                self.assertEqual(len(self.inbox(self.bob)['messages']), 1)
+
+        for i in range(30):
+            self.send(self.alice if i % 2 else self.bob, self.bob if i % 2 else self.alice, f'message {i}')
+        with self.app.app_context():
+            with count_queries(db.engine) as large:
+                items = self.inbox(self.bob)['messages']
+        self.assertEqual(len(items), 31)
+        self.assertEqual(len(small), 1)
+        self.assertEqual(len(large), 1)
+        self.assertEqual({item['sender_name'] for item in items}, {'Alice', 'Bob'})
+        self.assertEqual({item['receiver_name'] for item in items}, {'Alice', 'Bob'})
+
+    def test_cursor_pages_walk_messages_and_broadcasts(self):
+        for i in range(7):
+            self.send(self.alice, self.agent, f'to agent {i}')
+            self.send(self.agent, self.bob, f'from agent {i}')
+            self.client.post('/api/appointments/call', headers=self.headers[self.alice], json={
+                'service_type': 'dentist', 'phone_number': '555', 'preferred_time': 'morning',
+                'preferred_date': '2030-01-07'
+            })
+        expected = [(item['kind'], item['id']) for item in self.inbox(self.agent)['messages']]
+        self.assertEqual(len(expected), 21)
+        created = [item['created_at'] for item in self.inbox(self.agent)['messages']]
+        self.assertEqual(created, sorted(created, reverse=True))
+
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 4}
+            if cursor:
+                params['cursor'] = cursor
+            page = self.inbox(self.agent, **params)
+            self.assertLessEqual(len(page['messages']), 4)
+            seen.extend((item['kind'], item['id']) for item in page['messages'])
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        self.assertEqual(seen, expected)
+
+        response = self.client.get('/api/messages', headers=self.headers[self.agent], query_string={'cursor': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unread_counter_tracks_send_and_mark_read(self):
+        ids = [self.send(self.alice, self.bob, f'hello {i}') for i in range(3)]
+        self.send(self.bob, self.alice, 'reply')
+        self.assertEqual(self.unread(self.bob), 3)
+        self.assertEqual(self.unread(self.alice), 1)
+
+        mark = lambda user_id, message_id: self.client.put(
+            f'/api/messages/{message_id}/read', headers=self.headers[user_id]
+        ).status_code
+        self.assertEqual(mark(self.bob, ids[0]), 200)
+        self.assertEqual(mark(self.bob, ids[0]), 200)
+        self.assertEqual(mark(self.alice, ids[1]), 404)
+        self.assertEqual(mark(self.bob, 9999), 404)
+        self.assertEqual(self.unread(self.bob), 2)
+        read = {item['id']: item['is_read'] for item in self.inbox(self.bob)['messages'] if item['kind'] == 'message'}
+        self.assertEqual([read[message_id] for message_id in ids], [True, False, False])
+
+    def test_unread_count_includes_broadcasts(self):
+        self.client.post('/api/appointments/call', headers=self.headers[self.alice], json={
+            'service_type': 'dentist', 'phone_number': '555', 'preferred_time': 'morning',
+            'preferred_date': '2030-01-07'
+        })
+        self.send(self.bob, self.agent, 'question')
+        self.assertEqual(self.unread(self.agent), 2)
+
+        broadcast = next(item for item in self.inbox(self.agent)['messages'] if item['kind'] == 'broadcast')
+        self.client.put(f"/api/broadcasts/{broadcast['id']}/read", headers=self.headers[self.agent])
+        self.assertEqual(self.unread(self.agent), 1)
+
+    def test_recount_repairs_counters(self):
+        self.send(self.alice, self.bob, 'hello')
+        with self.app.app_context():
+            db.session.add(Message(sender_user_id=self.alice, recipient_user_id=self.bob,
+                                   message_type='direct', content='out of band'))
+            db.session.commit()
+            recount_unread_messages(self.bob)
+        self.assertEqual(self.unread(self.bob), 2)
+
+    def test_recipient_lookup_uses_composite_index(self):
+        with self.app.app_context():
+            plan = db.session.execute(text(
+                "EXPLAIN QUERY PLAN SELECT id FROM messages WHERE recipient_user_id = 1 ORDER BY created_at DESC"
+            )).all()
+        self.assertIn('ix_messages_recipient_created', ' '.join(row[-1] for row in plan))
+
+
+if __name__ == '__main__':
+    unittest.main()
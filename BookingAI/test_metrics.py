@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from . import create_app, db
+from .services.metrics import Histogram
+
+
+class TestHistogram(unittest.TestCase):
+
+    def test_cumulative_buckets(self):
+        histogram = Histogram((1, 5))
+        for value in (0, 1, 3, 9):
+            histogram.observe(value)
+        self.assertEqual(list(histogram.cumulative()), [(1, 2), (5, 3), (float('inf'), 4)])
+        self.assertEqual((histogram.sum, histogram.count), (13, 4))
+
+
+class TestMetricsEndpoint(unittest.TestCase):
+
+    def create(self, **config):
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'OUTBOX_AUTOSTART': False, 'TESTING': True, **config})
+        self.addCleanup(self.drop, app)
+        return app
+
+    def drop(self, app):
+        with app.app_context():
+            db.drop_all()
+
+    def test_disabled_by_default(self):
+        app = self.create()
+        self.assertIsNone(app.extensions['request_metrics'])
+        self.assertNotIn('export_metrics', app.view_functions)
+
+    def test_records_routes_and_sql(self):
+        app = self.create(METRICS_ENABLED=True, SEARCH_CACHE_BACKEND='none')
+        client = app.test_client()
+        client.get('/api/availability?service_type=dentist')
+        client.get('/api/availability?service_type=dentist')
+        client.post('/api/users/login', json={})
+
+        text = client.get('/metrics').get_data(as_text=True)
+        labels = 'route="/api/availability",method="GET"'
+        self.assertIn(f'bookingai_request_duration_seconds_count{{{labels}}} 2', text)
+        self.assertIn(f'bookingai_request_sql_statements_sum{{{labels}}} 2.0', text)
+        self.assertIn(f'bookingai_request_sql_statements_bucket{{{labels},le="1"}} 2', text)
+        self.assertIn(f'bookingai_response_size_bytes_bucket{{{labels},le="+Inf"}} 2', text)
+        self.assertIn('bookingai_responses_total{route="/api/users/login",method="POST",status="400"} 1', text)
+        self.assertIn('bookingai_slow_query_seconds{route="/api/availability",statement="SELECT', text)
+
+        slowest = app.extensions['request_metrics'].slow_queries()
+        self.assertTrue(all(a[0] >= b[0] for a, b in zip(slowest, slowest[1:])))
+
+    def test_failed_statements_leave_no_timing_state(self):
+        app = self.create(METRICS_ENABLED=True)
+        with app.app_context():
+            connection = db.session.connection()
+            for _ in range(3):
+                with self.assertRaises(OperationalError):
+                    connection.execute(text('SELECT * FROM missing_table'))
+            self.assertNotIn('query_started', connection.info)
+            self.assertEqual(connection.execute(text('SELECT 1')).scalar(), 1)
+
+    def test_slow_requests_are_profiled(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = self.create(METRICS_ENABLED=True, PROFILE_SAMPLE_RATE=1.0, PROFILE_THRESHOLD_MS=0, PROFILE_DIR=tmp)
+            app.test_client().get('/api/availability')
+            files = os.listdir(tmp)
+            self.assertEqual(len(files), 1)
+            self.assertIn('GET_api_availability', files[0])
+            self.assertTrue(files[0].endswith('.prof'))
+
+
+if __name__ == '__main__':
+    unittest.main()
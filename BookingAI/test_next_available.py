@@ -0,0 +1,117 @@
+import os
+import random
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+from sqlalchemy import insert
+
+from . import create_app, db
+from .database.models import User, ServiceProvider, Availability
+from .services import next_available
+from .services.next_available import next_free_slots
+
+
+class TestNextAvailable(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.tmp.name, 'next.db')}",
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True
+        })
+        self.start = datetime(2030, 6, 3, 9)
+        rng = random.Random(3)
+        with self.app.app_context():
+            providers = [
+                ServiceProvider(user=User(email=f'dr{i}@example.com', password_hash='x', full_name=f'Dr. {i}'),
+                                service_type='dentist' if i % 3 else 'physio')
+                for i in range(12)
+            ]
+            db.session.add_all(providers)
+            db.session.flush()
+            rows = []
+            for provider in providers:
+                for hour in rng.sample(range(200), 40):
+                    slot_start = self.start + timedelta(hours=hour)
+                    rows.append({'provider_id': provider.id, 'start_time': slot_start,
+                                 'end_time': slot_start + timedelta(minutes=30), 'is_booked': rng.random() < 0.3})
+            db.session.execute(insert(Availability), rows)
+            db.session.commit()
+            self.service_types = {provider.id: provider.service_type for provider in providers}
+            self.rows = rows
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+            db.engine.dispose()
+        self.tmp.cleanup()
+
+    def expected(self, after, limit, service_type=None, before=None):
+        slots = sorted(
+            (row['start_time'], row['provider_id']) for row in self.rows
+            if not row['is_booked'] and row['start_time'] >= after
+            and (before is None or row['start_time'] < before)
+            and (service_type is None or self.service_types[row['provider_id']] == service_type)
+        )
+        return [start for start, _ in slots[:limit]]
+
+    def test_matches_full_scan(self):
+        with self.app.app_context():
+            for hours, limit, service_type in ((0, 3, None), (50, 10, 'dentist'), (120, 25, 'physio'), (199, 5, None)):
+                after = self.start + timedelta(hours=hours)
+                slots = next_free_slots(after, limit, service_type)
+                self.assertEqual([slot[4] for slot in slots], self.expected(after, limit, service_type))
+                if service_type:
+                    self.assertEqual({slot[3] for slot in slots}, {service_type})
+
+            before = self.start + timedelta(hours=60)
+            self.assertEqual([slot[4] for slot in next_free_slots(self.start, 1000, 'physio', before=before)],
+                             self.expected(self.start, 1000, 'physio', before))
+            self.assertEqual(next_free_slots(self.start + timedelta(days=30), 3), [])
+            self.assertEqual(next_free_slots(self.start, 3, 'optician'), [])
+
+    def test_merges_across_statements(self):
+        with self.app.app_context(), mock.patch.object(next_available, 'PROVIDERS_PER_STATEMENT', 5):
+            after = self.start + timedelta(hours=30)
+            self.assertEqual([slot[4] for slot in next_free_slots(after, 40)], self.expected(after, 40))
+
+    def test_endpoint(self):
+        client = self.app.test_client()
+        after = self.start + timedelta(hours=10)
+        response = client.get('/api/availability/next', query_string={
+            'after': after.isoformat(), 'service_type': 'dentist', 'limit': 4
+        })
+        self.assertEqual(response.status_code, 200)
+        slots = response.get_json()['available_slots']
+        self.assertEqual([datetime.fromisoformat(slot['start_time']) for slot in slots],
+                         self.expected(after, 4, 'dentist'))
+        self.assertTrue(all(slot['provider_name'].startswith('Dr. ') for slot in slots))
+
+        self.assertEqual(client.get('/api/availability/next?after=soon').status_code, 400)
+        self.assertEqual(client.get('/api/availability/next?limit=0').status_code, 400)
+
+    def test_ai_alternatives_are_scoped_to_the_department(self):
+        client = self.app.test_client()
+        # Book out the first day so the requested hour has no free slot
+        with self.app.app_context():
+            db.session.execute(Availability.__table__.update().values(is_booked=True).where(
+                Availability.start_time < self.start + timedelta(hours=24)))
+            db.session.commit()
+        for row in self.rows:
+            row['is_booked'] = row['is_booked'] or row['start_time'] < self.start + timedelta(hours=24)
+        call_id = client.post('/api/call/start', json={
+            'phone_number': '555-0100', 'department': 'physio'
+        }).get_json()['call_id']
+        reply = client.post(f'/api/call/{call_id}/interact', json={
+            'message': 'I would like to book June 3rd 2030 at 10 AM'
+        }).get_json()
+        expected = [start.strftime("%B %d at %I:%M %p")
+                    for start in self.expected(self.start + timedelta(hours=1), 3, 'physio')]
+        self.assertEqual(reply.get('alternative_slots'), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
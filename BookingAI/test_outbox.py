@@ -0,0 +1,207 @@
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from . import create_app, db
+from .database.models import User, ServiceProvider, Availability, OutboxMessage
+from .services.outbox import enqueue_email
+
+
+class TestOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True,
+            'OUTBOX_TRANSPORT': 'fake',
+            'OUTBOX_MAX_ATTEMPTS': 3
+        })
+        self.outbox = self.app.extensions['outbox']
+        self.transport = self.outbox.transport
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def enqueue(self, *recipients):
+        with self.app.app_context():
+            for recipient in recipients:
+                enqueue_email(recipient, 'Subject', 'Body')
+            db.session.commit()
+
+    def statuses(self):
+        with self.app.app_context():
+            return [(m.recipient, m.status, m.attempts) for m in OutboxMessage.query.order_by(OutboxMessage.id)]
+
+    def make_due(self):
+        with self.app.app_context():
+            OutboxMessage.query.update({'next_attempt_at': datetime.utcnow() - timedelta(seconds=1)})
+            db.session.commit()
+
+    def test_rolled_back_transaction_queues_nothing(self):
+        with self.app.app_context():
+            enqueue_email('a@example.com', 'Subject', 'Body')
+            db.session.rollback()
+        self.assertEqual(self.outbox.drain(), 0)
+        self.assertEqual(self.statuses(), [])
+
+    def test_drain_delivers_in_batches(self):
+        self.outbox.batch_size = 2
+        self.enqueue('a@example.com', 'b@example.com', 'c@example.com')
+
+        self.assertEqual(self.outbox.drain_once(), 2)
+        self.assertEqual(self.outbox.drain(), 1)
+        self.assertEqual([to for to, _, _ in self.transport.sent], ['a@example.com', 'b@example.com', 'c@example.com'])
+        self.assertEqual({status for _, status, _ in self.statuses()}, {'sent'})
+
+        metrics = self.outbox.metrics()
+        self.assertEqual(metrics['sent'], 3)
+        self.assertEqual(metrics['queue_depth'], {'sent': 3})
+        self.assertEqual(metrics['drain_latency_seconds']['count'], 3)
+
+    def test_failures_back_off_then_succeed(self):
+        self.transport.fail_times = 1
+        self.enqueue('a@example.com')
+
+        self.assertEqual(self.outbox.drain(), 1)
+        self.assertEqual(self.statuses(), [('a@example.com', 'pending', 1)])
+        with self.app.app_context():
+            entry = OutboxMessage.query.one()
+            self.assertGreater(entry.next_attempt_at, datetime.utcnow())
+            self.assertIn('ConnectionError', entry.last_error)
+
+        # Not due yet
+        self.assertEqual(self.outbox.drain(), 0)
+        self.make_due()
+        self.assertEqual(self.outbox.drain(), 1)
+        self.assertEqual(self.statuses(), [('a@example.com', 'sent', 2)])
+        self.assertEqual(self.outbox.metrics()['retried'], 1)
+
+    def test_dead_letter_after_max_attempts(self):
+        self.transport.failing.add('bounce@example.com')
+        self.enqueue('bounce@example.com', 'ok@example.com')
+
+        for _ in range(3):
+            self.outbox.drain()
+            self.make_due()
+        self.assertEqual(self.statuses(), [('bounce@example.com', 'dead', 3), ('ok@example.com', 'sent', 1)])
+        self.assertEqual(self.outbox.metrics()['dead'], 1)
+
+        self.transport.failing.clear()
+        self.assertEqual(self.outbox.retry_dead(), 1)
+        self.outbox.drain()
+        self.assertEqual(self.statuses()[0], ('bounce@example.com', 'sent', 1))
+
+    def test_expired_lease_is_reclaimed(self):
+        self.enqueue('a@example.com')
+        with self.app.app_context():
+            OutboxMessage.query.update({
+                'status': 'sending',
+                'claimed_by': 'crashed-worker',
+                'lease_expires_at': datetime.utcnow() - timedelta(seconds=1)
+            })
+            db.session.commit()
+        self.assertEqual(self.outbox.drain(), 1)
+        self.assertEqual(self.statuses(), [('a@example.com', 'sent', 1)])
+
+
+class TestOutboxRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.tmp.name, 'outbox.db')}",
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True,
+            'OUTBOX_TRANSPORT': 'fake',
+            'OUTBOX_POLL_INTERVAL': 0.05
+        })
+        self.client = self.app.test_client()
+        self.outbox = self.app.extensions['outbox']
+        with self.app.app_context():
+            provider = ServiceProvider(
+                user=User(email='provider@example.com', password_hash='x', full_name='Dr. Provider'),
+                service_type='dentist'
+            )
+            provider.availabilities.append(Availability(
+                start_time=datetime(2030, 1, 7, 9), end_time=datetime(2030, 1, 7, 10)
+            ))
+            patient = User(email='patient@example.com', password_hash='x', full_name='Patient')
+            db.session.add_all([provider, patient])
+            db.session.commit()
+            self.slot_id = provider.availabilities[0].id
+            self.provider_user_id = provider.user_id
+            self.headers = {'Authorization': f'Bearer {create_access_token(identity=patient.id)}'}
+
+    def tearDown(self):
+        self.outbox.stop()
+        with self.app.app_context():
+            db.drop_all()
+            db.engine.dispose()
+        self.tmp.cleanup()
+
+    def queued(self):
+        with self.app.app_context():
+            return sorted((m.recipient, m.subject) for m in OutboxMessage.query)
+
+    def test_booking_queues_emails_in_its_transaction(self):
+        response = self.client.post('/api/appointments/book', headers=self.headers, json={'slot_id': self.slot_id})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.queued(), [
+            ('patient@example.com', 'Appointment Confirmation'),
+            ('provider@example.com', 'New Appointment')
+        ])
+
+        response = self.client.post('/api/appointments/book', headers=self.headers, json={'slot_id': self.slot_id})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(len(self.queued()), 2)
+
+    def test_worker_pool_delivers_messages(self):
+        self.outbox.start()
+        response = self.client.post('/api/messages', headers=self.headers, json={
+            'receiver_id': self.provider_user_id,
+            'content': 'Hello'
+        })
+        self.assertEqual(response.status_code, 201)
+
+        deadline = time.monotonic() + 5
+        while not self.outbox.transport.sent and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.outbox.transport.sent, [
+            ('provider@example.com', 'New Message', 'You have received a new message: Hello')
+        ])
+
+
+class TestOutboxDefaults(unittest.TestCase):
+
+    def test_default_app_delivers_queued_email(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = create_app({
+                'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'outbox.db')}",
+                'OUTBOX_TRANSPORT': 'fake'
+            })
+            outbox = app.extensions['outbox']
+            try:
+                with app.app_context():
+                    enqueue_email('a@example.com', 'Subject', 'Body')
+                    db.session.commit()
+                outbox.wake()
+
+                deadline = time.monotonic() + 5
+                while not outbox.transport.sent and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                self.assertEqual(outbox.transport.sent, [('a@example.com', 'Subject', 'Body')])
+            finally:
+                outbox.stop()
+                with app.app_context():
+                    db.drop_all()
+                    db.engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
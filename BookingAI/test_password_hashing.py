@@ -0,0 +1,132 @@
+import time
+import unittest
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+from . import create_app, db
+from .database.models import User
+from .services.password_hashing import PasswordHasher, HashingOverloaded
+
+FAST_METHOD = 'pbkdf2:sha256:1000'
+
+
+class TestPasswordHasher(unittest.TestCase):
+
+    def test_inline_hash_and_verify(self):
+        hasher = PasswordHasher(method=FAST_METHOD, workers=0)
+        password_hash = hasher.hash('secret')
+        self.assertTrue(password_hash.startswith(FAST_METHOD + '$'))
+        self.assertTrue(hasher.verify(password_hash, 'secret'))
+        self.assertFalse(hasher.verify(password_hash, 'wrong'))
+
+    def test_process_pool_hash_and_verify(self):
+        hasher = PasswordHasher(method=FAST_METHOD, workers=1)
+        try:
+            password_hash = hasher.hash('secret')
+            self.assertTrue(check_password_hash(password_hash, 'secret'))
+            self.assertTrue(hasher.verify(password_hash, 'secret'))
+        finally:
+            hasher.shutdown()
+
+    def test_full_queue_is_rejected(self):
+        hasher = PasswordHasher(method=FAST_METHOD, workers=1, max_pending=1, retry_after=7)
+        hasher._slots.acquire()
+        with self.assertRaises(HashingOverloaded) as raised:
+            hasher.hash('secret')
+        self.assertEqual(raised.exception.retry_after, 7)
+        self.assertEqual(hasher.rejected, 1)
+        self.assertIsNone(hasher._executor)
+
+    def test_timed_out_job_holds_its_slot_until_it_finishes(self):
+        hasher = PasswordHasher(method=FAST_METHOD, workers=1, max_pending=1, timeout=0.05)
+        try:
+            with self.assertRaises(HashingOverloaded):
+                hasher._run(time.sleep, 1.0)
+            # The sleep is still running, so there is no room for another job
+            with self.assertRaises(HashingOverloaded):
+                hasher.hash('secret')
+            self.assertEqual(hasher.rejected, 1)
+
+            self.assertTrue(hasher._slots.acquire(timeout=30))
+            hasher._slots.release()
+            hasher.timeout = 30
+            self.assertTrue(hasher.verify(hasher.hash('secret'), 'secret'))
+        finally:
+            hasher.shutdown()
+
+    def test_needs_rehash(self):
+        hasher = PasswordHasher(method=FAST_METHOD, workers=0)
+        self.assertFalse(hasher.needs_rehash(generate_password_hash('secret', FAST_METHOD)))
+        self.assertTrue(hasher.needs_rehash(generate_password_hash('secret', 'pbkdf2:sha256:2000')))
+
+    def test_short_methods_do_not_force_a_rehash(self):
+        for method in ('scrypt', 'pbkdf2'):
+            with self.subTest(method=method):
+                hasher = PasswordHasher(method=method, workers=0)
+                self.assertFalse(hasher.needs_rehash(generate_password_hash('secret', method)))
+                self.assertTrue(hasher.needs_rehash(generate_password_hash('secret', FAST_METHOD)))
+
+
+class TestPasswordHashingRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True,
+            'PASSWORD_HASH_METHOD': FAST_METHOD,
+            'PASSWORD_HASH_WORKERS': 0
+        })
+        self.client = self.app.test_client()
+        self.hasher = self.app.extensions['password_hasher']
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def register(self):
+        return self.client.post('/api/users/register', json={
+            'email': 'user@example.com',
+            'password': 'secret',
+            'full_name': 'Test User'
+        })
+
+    def login(self, password='secret'):
+        return self.client.post('/api/users/login', json={'email': 'user@example.com', 'password': password})
+
+    def stored_hash(self):
+        with self.app.app_context():
+            return User.query.filter_by(email='user@example.com').one().password_hash
+
+    def test_register_and_login(self):
+        self.assertEqual(self.register().status_code, 201)
+        self.assertTrue(self.stored_hash().startswith(FAST_METHOD + '$'))
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login('wrong').status_code, 401)
+
+    def test_login_upgrades_outdated_hash(self):
+        self.register()
+        with self.app.app_context():
+            user = User.query.filter_by(email='user@example.com').one()
+            user.password_hash = generate_password_hash('secret', 'pbkdf2:sha256:2000')
+            db.session.commit()
+
+        self.assertEqual(self.login('wrong').status_code, 401)
+        self.assertTrue(self.stored_hash().startswith('pbkdf2:sha256:2000$'))
+
+        self.assertEqual(self.login().status_code, 200)
+        self.assertTrue(self.stored_hash().startswith(FAST_METHOD + '$'))
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_overloaded_hasher_answers_503(self):
+        self.hasher.workers = 1
+        self.hasher._slots.acquire = lambda blocking=True: False
+
+        response = self.register()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+        self.assertEqual(self.login().status_code, 401)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from flask_jwt_extended import create_access_token
+
+from . import create_app, db
+from .database.models import User, ServiceProvider, Availability, Appointment, Feedback, ProviderRating
+from .services.ratings import rebuild_ratings
+
+
+class TestProviderRatings(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.tmp.name, 'ratings.db')}",
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True
+        })
+        with self.app.app_context():
+            patient = User(email='patient@example.com', password_hash='x', full_name='Patient')
+            providers = [
+                ServiceProvider(user=User(email=f'dr{i}@example.com', password_hash='x', full_name=f'Dr. {i}'),
+                                service_type=service_type)
+                for i, service_type in enumerate(['dentist', 'dentist', 'physio'])
+            ]
+            db.session.add_all([patient] + providers)
+            db.session.flush()
+            start = datetime(2030, 6, 3, 9)
+            self.appointments = {}
+            for provider in providers:
+                appointments = []
+                for i in range(3):
+                    slot = Availability(provider=provider, start_time=start + timedelta(hours=i),
+                                        end_time=start + timedelta(hours=i, minutes=30), is_booked=True)
+                    appointments.append(Appointment(user_id=patient.id, provider_id=provider.id, availability_slot=slot,
+                                                    start_time=slot.start_time, end_time=slot.end_time))
+                db.session.add_all(appointments)
+                db.session.flush()
+                self.appointments[provider.id] = [appointment.id for appointment in appointments]
+            db.session.commit()
+            self.provider_ids = [provider.id for provider in providers]
+            self.token = create_access_token(identity=patient.id)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+            db.engine.dispose()
+        self.tmp.cleanup()
+
+    def rate(self, appointment_id, rating):
+        return self.app.test_client().post('/api/feedback', json={
+            'appointment_id': appointment_id, 'rating': rating, 'feedback_type': 'appointment'
+        }, headers={'Authorization': f'Bearer {self.token}'})
+
+    def aggregates(self):
+        with self.app.app_context():
+            return {row.provider_id: (row.rating_count, row.rating_sum, row.rating_avg,
+                                      [getattr(row, f'stars_{star}') for star in range(1, 6)])
+                    for row in ProviderRating.query.all()}
+
+    def test_feedback_updates_aggregate_incrementally(self):
+        first, second, physio = self.provider_ids
+        self.assertEqual(self.rate(self.appointments[first][0], 5).status_code, 201)
+        self.rate(self.appointments[first][1], 3)
+        self.rate(self.appointments[second][0], 4)
+        # Not counted: no rating, no appointment
+        self.rate(self.appointments[physio][1], None)
+        self.rate(None, 5)
+
+        aggregates = self.aggregates()
+        self.assertEqual(aggregates[first], (2, 8, 4.0, [0, 0, 1, 0, 1]))
+        self.assertEqual(aggregates[second], (1, 4, 4.0, [0, 0, 0, 1, 0]))
+        self.assertNotIn(physio, aggregates)
+
+        with self.app.app_context():
+            self.assertEqual(Feedback.query.count(), 5)
+            self.assertEqual(rebuild_ratings(), 2)
+        self.assertEqual(self.aggregates(), aggregates)
+
+    def test_invalid_ratings_are_rejected(self):
+        first, _, physio = self.provider_ids
+        self.rate(self.appointments[first][0], 4)
+        for rating in (0, 6, 9, -1, 2.5, '3', True):
+            with self.subTest(rating=rating):
+                self.assertEqual(self.rate(self.appointments[physio][0], rating).status_code, 400)
+
+        with self.app.app_context():
+            self.assertEqual(Feedback.query.count(), 1)
+            aggregates = self.aggregates()
+            rebuild_ratings()
+        self.assertEqual(self.aggregates(), aggregates)
+        self.assertNotIn(physio, aggregates)
+
+    def test_rebuild_after_bulk_insert(self):
+        first, _, physio = self.provider_ids
+        with self.app.app_context():
+            patient_id = User.query.filter_by(email='patient@example.com').one().id
+            db.session.add_all([Feedback(user_id=patient_id, appointment_id=appointment_id, rating=rating)
+                                for appointment_id, rating in zip(self.appointments[physio], (1, 2, 2))])
+            db.session.commit()
+        self.rate(self.appointments[first][0], 5)
+
+        result = self.app.test_cli_runner().invoke(args=['rebuild-ratings'])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('2 providers', result.output)
+        aggregates = self.aggregates()
+        self.assertEqual(aggregates[physio][:2], (3, 5))
+        self.assertAlmostEqual(aggregates[physio][2], 5 / 3)
+        self.assertEqual(aggregates[physio][3], [1, 2, 0, 0, 0])
+        self.assertEqual(aggregates[first][:2], (1, 5))
+
+    def test_ranked_search(self):
+        first, second, physio = self.provider_ids
+        for rating in (5, 4):
+            self.rate(self.appointments[first].pop(), rating)
+        for rating in (5, 5, 4):
+            self.rate(self.appointments[second].pop(), rating)
+        self.rate(self.appointments[physio].pop(), 5)
+
+        client = self.app.test_client()
+        ranked = client.get('/api/providers/ranked', query_string={'service_type': 'dentist'}).get_json()['providers']
+        self.assertEqual([provider['provider_id'] for provider in ranked], [second, first])
+        self.assertEqual(ranked[0]['average_rating'], 4.67)
+        self.assertEqual(ranked[0]['rating_count'], 3)
+        self.assertEqual(ranked[0]['histogram'], {'1': 0, '2': 0, '3': 0, '4': 1, '5': 2})
+        self.assertEqual(ranked[0]['provider_name'], 'Dr. 1')
+
+        everyone = client.get('/api/providers/ranked').get_json()['providers']
+        self.assertEqual([provider['provider_id'] for provider in everyone], [physio, second, first])
+        trusted = client.get('/api/providers/ranked?min_ratings=2&limit=1').get_json()['providers']
+        self.assertEqual([provider['provider_id'] for provider in trusted], [second])
+        self.assertEqual(client.get('/api/providers/ranked?limit=0').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from . import create_app, db
+from .services.search_cache import MemoryBackend, SQLiteBackend, SearchCache
+from .testing import FakeClock
+
+
+class TestMemoryBackend(unittest.TestCase):
+
+    def test_lru_eviction_and_ttl(self):
+        clock = FakeClock()
+        backend = MemoryBackend(max_entries=2, clock=clock)
+        backend.set('a', 1, ttl=10)
+        backend.set('b', 2, ttl=10)
+        self.assertEqual(backend.get('a'), 1)
+        backend.set('c', 3, ttl=10)
+
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('a'), 1)
+        clock.now = 11
+        self.assertIsNone(backend.get('a'))
+
+    def test_counters_survive_eviction(self):
+        backend = MemoryBackend(max_entries=1)
+        backend.incr('gen')
+        backend.set('a', 1, ttl=10)
+        backend.set('b', 2, ttl=10)
+        self.assertEqual(backend.counter('gen'), 1)
+
+
+class TestSQLiteBackend(unittest.TestCase):
+
+    def test_entries_are_shared_between_instances(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.sqlite')
+            first = SearchCache(SQLiteBackend(path))
+            second = SearchCache(SQLiteBackend(path))
+
+            first.set('all', {'q': 1}, {'available_slots': [1, 2]})
+            self.assertEqual(second.get('all', {'q': 1}), {'available_slots': [1, 2]})
+
+            second.invalidate(provider_id=3, service_type='dentist')
+            self.assertIsNone(first.get('all', {'q': 1}))
+
+    def test_max_entries(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            backend = SQLiteBackend(os.path.join(tmp, 'cache.sqlite'), max_entries=3)
+            for i in range(5):
+                backend.set(f'k{i}', i, ttl=60)
+            self.assertEqual(len(backend), 3)
+            self.assertIsNone(backend.get('k0'))
+            self.assertEqual(backend.get('k4'), 4)
+
+
+class TestSearchCache(unittest.TestCase):
+
+    def test_invalidation_is_scoped(self):
+        cache = SearchCache()
+        cache.set('provider:1', {}, 'p1')
+        cache.set('provider:2', {}, 'p2')
+        cache.set('service_type:dentist', {}, 'dentist')
+        cache.set('service_type:physio', {}, 'physio')
+        cache.set('all', {}, 'all')
+
+        cache.invalidate(provider_id=1, service_type='dentist')
+
+        self.assertIsNone(cache.get('provider:1', {}))
+        self.assertIsNone(cache.get('service_type:dentist', {}))
+        self.assertIsNone(cache.get('all', {}))
+        self.assertEqual(cache.get('provider:2', {}), 'p2')
+        self.assertEqual(cache.get('service_type:physio', {}), 'physio')
+        self.assertEqual(cache.stats()['hits'], 2)
+        self.assertEqual(cache.stats()['misses'], 3)
+
+    def test_result_computed_across_an_invalidation_is_not_served(self):
+        cache = SearchCache()
+        params = {'service_type': 'dentist'}
+        key = cache.key('service_type:dentist', params)
+        self.assertIsNone(cache.get('service_type:dentist', params, key=key))
+
+        # A booking lands while the search is running
+        cache.invalidate(provider_id=1, service_type='dentist')
+        cache.set('service_type:dentist', params, 'stale', key=key)
+
+        self.assertIsNone(cache.get('service_type:dentist', params))
+
+
+class TestSearchCacheRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'OUTBOX_AUTOSTART': False,
+            'TESTING': True
+        })
+        self.client = self.app.test_client()
+        self.cache = self.app.extensions['search_cache']
+        self.base = datetime(2030, 5, 6, 9)
+        self.headers = {}
+        for service_type in ('dentist', 'physio'):
+            email = f'{service_type}@example.com'
+            self.client.post('/api/users/register', json={
+                'email': email, 'password': 'secret', 'full_name': service_type.title()
+            })
+            token = self.client.post('/api/users/login', json={
+                'email': email, 'password': 'secret'
+            }).get_json()['access_token']
+            self.headers[service_type] = {'Authorization': f'Bearer {token}'}
+            self.client.post('/api/providers/register', headers=self.headers[service_type], json={
+                'service_type': service_type
+            })
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def add_slot(self, service_type, hours):
+        start = self.base + timedelta(hours=hours)
+        return self.client.post('/api/providers/availability', headers=self.headers[service_type], json={
+            'start_time': start.isoformat(),
+            'end_time': (start + timedelta(minutes=30)).isoformat()
+        })
+
+    def search(self, service_type):
+        response = self.client.get('/api/availability', query_string={'service_type': service_type})
+        return [slot['id'] for slot in response.get_json()['available_slots']]
+
+    def test_repeated_search_hits_cache(self):
+        self.add_slot('dentist', 0)
+        first = self.search('dentist')
+        second = self.search('dentist')
+        self.assertEqual(first, second)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_writes_invalidate_only_their_service_type(self):
+        self.add_slot('dentist', 0)
+        self.add_slot('physio', 0)
+        self.search('dentist')
+        self.search('physio')
+
+        slot_id = self.add_slot('dentist', 1).get_json()['slot_id']
+        self.assertIn(slot_id, self.search('dentist'))
+        self.search('physio')
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+        self.client.post('/api/appointments/book', headers=self.headers['physio'], json={'slot_id': slot_id})
+        self.assertNotIn(slot_id, self.search('dentist'))
+
+    def test_cache_can_be_disabled(self):
+        app = create_app({
+            'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+            'OUTBOX_AUTOSTART': False,
+            'SEARCH_CACHE_BACKEND': 'none'
+        })
+        self.assertIsNone(app.extensions['search_cache'])
+        self.assertEqual(app.test_client().get('/api/availability').status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
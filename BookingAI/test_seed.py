@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+
+from werkzeug.security import check_password_hash
+
+from . import create_app, db
+from .database.models import User, ServiceProvider, Availability, Appointment, Message, Feedback
+from .database.seed import generate_dataset, SEED_PASSWORD
+
+
+class TestSeedData(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def seeded(self, name, **options):
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.tmp.name, name)}.db", 'OUTBOX_AUTOSTART': False})
+        with app.app_context():
+            stats = generate_dataset(users=30, providers=5, slots_per_provider=40, messages=25, batch_size=16, **options)
+            snapshot = {
+                'providers': [(p.user_id, p.service_type) for p in ServiceProvider.query.order_by(ServiceProvider.id)],
+                'slots': [(s.provider_id, s.start_time, s.is_booked, s.day_part)
+                          for s in Availability.query.order_by(Availability.id)],
+                'appointments': [(a.user_id, a.availability_id) for a in Appointment.query.order_by(Appointment.id)],
+                'feedback': [(f.appointment_id, f.rating) for f in Feedback.query.order_by(Feedback.id)],
+                'messages': Message.query.count(),
+                'indexes': sorted(index['name'] for index in db.inspect(db.engine).get_indexes('availabilities')),
+                'password_ok': check_password_hash(User.query.first().password_hash, SEED_PASSWORD)
+            }
+            db.engine.dispose()
+        return stats, snapshot
+
+    def test_same_seed_same_dataset(self):
+        stats, first = self.seeded('first')
+        _, second = self.seeded('second', defer_indexes=False)
+        _, other = self.seeded('other', seed=7)
+
+        self.assertEqual(first, second)
+        self.assertNotEqual(first['slots'], other['slots'])
+        self.assertEqual(len(first['slots']), 200)
+        self.assertEqual(len(first['appointments']), sum(booked for _, _, booked, _ in first['slots']))
+        self.assertEqual(first['messages'], 25)
+        self.assertTrue(first['password_ok'])
+        self.assertIn('ix_availabilities_booked_day_part_start', first['indexes'])
+        self.assertEqual(stats.rows['availabilities'], 200)
+
+    def test_cli_command(self):
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(self.tmp.name, 'cli')}.db", 'OUTBOX_AUTOSTART': False})
+        result = app.test_cli_runner().invoke(args=[
+            'seed-data', '--users', '10', '--providers', '2', '--slots-per-provider', '8', '--messages', '5'
+        ])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn('rows/s', result.output)
+        with app.app_context():
+            self.assertEqual(Availability.query.count(), 16)
+            db.engine.dispose()
+
+        result = app.test_cli_runner().invoke(args=['seed-data', '--users', '2', '--providers', '3'])
+        self.assertNotEqual(result.exit_code, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
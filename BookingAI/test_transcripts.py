@@ -0,0 +1,183 @@
+import json
+import time
+import unittest
+
+from flask_jwt_extended import create_access_token
+
+from . import create_app, db
+from .database.models import User, ServiceProvider, CallTranscript
+from .services.transcripts import TranscriptWriter, iter_transcripts
+
+
+class TestTranscriptWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'OUTBOX_AUTOSTART': False, 'TESTING': True})
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def stored(self):
+        with self.app.app_context():
+            return [(turn.call_id, turn.seq) for turn in iter_transcripts()]
+
+    def test_flushes_in_batches(self):
+        writer = TranscriptWriter(self.app, flush_turns=3)
+        writer.append('call-1', 1, 'assistant', 'Hello')
+        writer.append('call-1', 2, 'user', 'Hi')
+        self.assertEqual(self.stored(), [])
+        self.assertEqual(writer.pending(), 2)
+
+        writer.append('call-2', 1, 'assistant', 'Hello')
+        self.assertEqual(self.stored(), [('call-1', 1), ('call-1', 2), ('call-2', 1)])
+        self.assertEqual((writer.flushes, writer.written, writer.pending()), (1, 3, 0))
+
+    def test_failed_flush_keeps_turns_buffered(self):
+        writer = TranscriptWriter(self.app, flush_turns=100)
+        writer.append('call-1', 1, 'assistant', 'Hello')
+        with self.app.app_context():
+            CallTranscript.__table__.drop(db.engine)
+        with self.assertRaises(Exception):
+            writer.flush()
+        self.assertEqual(writer.pending(), 1)
+
+        with self.app.app_context():
+            CallTranscript.__table__.create(db.engine)
+        writer.append('call-1', 2, 'user', 'Hi')
+        self.assertEqual(writer.flush(), 2)
+        self.assertEqual(self.stored(), [('call-1', 1), ('call-1', 2)])
+
+    def test_duplicate_turn_does_not_block_later_turns(self):
+        writer = TranscriptWriter(self.app, flush_turns=100)
+        writer.append('call-1', 1, 'assistant', 'Hello')
+        writer.flush()
+        # A concurrent interact reused seq 1
+        writer.append('call-1', 2, 'user', 'Hi')
+        writer.append('call-1', 1, 'user', 'Hi again')
+        writer.append('call-1', 3, 'assistant', 'How can I help?')
+        with self.assertLogs(self.app.logger, 'WARNING'):
+            self.assertEqual(writer.flush(), 2)
+        self.assertEqual((writer.pending(), writer.dropped), (0, 1))
+
+        writer.append('call-1', 4, 'user', 'Bye')
+        self.assertEqual(writer.flush(), 1)
+        self.assertEqual(self.stored(), [('call-1', 1), ('call-1', 2), ('call-1', 3), ('call-1', 4)])
+
+    def test_buffer_is_bounded_while_flushes_fail(self):
+        writer = TranscriptWriter(self.app, flush_turns=100, max_buffer=3)
+        with self.app.app_context():
+            CallTranscript.__table__.drop(db.engine)
+        with self.assertLogs(self.app.logger, 'WARNING'):
+            for seq in range(1, 6):
+                writer.append('call-1', seq, 'user', 'Hello?')
+                with self.assertRaises(Exception):
+                    writer.flush()
+        self.assertEqual((writer.pending(), writer.dropped), (3, 2))
+
+        with self.app.app_context():
+            CallTranscript.__table__.create(db.engine)
+        self.assertEqual(writer.flush(), 3)
+        self.assertEqual(self.stored(), [('call-1', 3), ('call-1', 4), ('call-1', 5)])
+
+    def test_background_flush_and_close(self):
+        writer = TranscriptWriter(self.app, flush_turns=100, flush_interval=0.05)
+        writer.start()
+        writer.append('call-1', 1, 'assistant', 'Hello')
+        deadline = time.monotonic() + 5
+        while not writer.written and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.stored(), [('call-1', 1)])
+
+        writer.append('call-1', 2, 'user', 'Bye')
+        writer.close()
+        self.assertEqual(self.stored(), [('call-1', 1), ('call-1', 2)])
+
+
+class TestTranscriptRoutes(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite://', 'OUTBOX_AUTOSTART': False, 'TESTING': True})
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            agent = User(email='agent@example.com', password_hash='x', full_name='Agent')
+            physio = User(email='physio@example.com', password_hash='x', full_name='Physio')
+            caller = User(email='caller@example.com', password_hash='x', full_name='Caller')
+            db.session.add_all([
+                ServiceProvider(user=agent, service_type='dentist'),
+                ServiceProvider(user=physio, service_type='physio'),
+                caller
+            ])
+            db.session.commit()
+            self.headers = {'Authorization': f'Bearer {create_access_token(identity=agent.id)}'}
+            self.physio_headers = {'Authorization': f'Bearer {create_access_token(identity=physio.id)}'}
+            self.caller_headers = {'Authorization': f'Bearer {create_access_token(identity=caller.id)}'}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.drop_all()
+
+    def export(self, headers=None, **params):
+        response = self.client.get('/api/call/transcripts', headers=headers or self.headers, query_string=params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        return [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    def call(self, *messages):
+        call_id = self.client.post('/api/call/start', json={
+            'phone_number': '555-0100', 'department': 'dentist'
+        }).get_json()['call_id']
+        for message in messages:
+            self.client.post(f'/api/call/{call_id}/interact', json={'message': message})
+        return call_id
+
+    def test_transcript_written_once_on_end(self):
+        call_id = self.call('what are your hours', 'goodbye')
+        with self.app.app_context():
+            self.assertEqual(CallTranscript.query.count(), 0)
+
+        self.client.post(f'/api/call/{call_id}/end')
+        turns = self.export(call_id=call_id)
+        self.assertEqual([turn['seq'] for turn in turns], [1, 2, 3, 4, 5])
+        self.assertEqual([turn['role'] for turn in turns], ['assistant', 'user', 'assistant', 'user', 'assistant'])
+        self.assertEqual(turns[1]['content'], 'what are your hours')
+        self.assertEqual(self.app.extensions['transcripts'].flushes, 1)
+
+    def test_export_resumes_after_id_and_includes_calls_in_progress(self):
+        finished = self.call('help')
+        self.client.post(f'/api/call/{finished}/end')
+        ongoing = self.call('hello')
+
+        turns = self.export()
+        self.assertEqual([turn['call_id'] for turn in turns], [finished] * 3 + [ongoing] * 3)
+        rest = self.export(after_id=turns[2]['id'])
+        self.assertEqual(rest, turns[3:])
+
+    def test_end_call_survives_a_failed_flush(self):
+        call_id = self.call('hello')
+        with self.app.app_context():
+            CallTranscript.__table__.drop(db.engine)
+        with self.assertLogs(self.app.logger, 'ERROR'):
+            response = self.client.post(f'/api/call/{call_id}/end')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.app.extensions['transcripts'].pending(), 3)
+        with self.app.app_context():
+            CallTranscript.__table__.create(db.engine)
+
+    def test_export_requires_authentication(self):
+        self.assertEqual(self.client.get('/api/call/transcripts').status_code, 401)
+        response = self.client.get('/api/call/transcripts', headers=self.headers, query_string={'after_id': 'x'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_export_is_limited_to_agents_of_the_department(self):
+        call_id = self.call('hello')
+        self.client.post(f'/api/call/{call_id}/end')
+
+        response = self.client.get('/api/call/transcripts', headers=self.caller_headers)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.export(headers=self.physio_headers), [])
+        self.assertEqual({turn['call_id'] for turn in self.export()}, {call_id})
+
+
+if __name__ == '__main__':
+    unittest.main()